@@ -1,5 +1,6 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
+from django.db.models import Exists, OuterRef
 from .models import CustomUser
 from eskul.models import Eskul
 
@@ -27,6 +28,13 @@ class CreateUserForm(UserCreationForm):
             user.save()
         return user
 
+def available_pelatih(eskul=None):
+    """Active pelatih without an eskul other than ``eskul``, as one anti-join."""
+    other_eskul = Eskul.objects.filter(pelatih=OuterRef('pk'))
+    if eskul is not None and eskul.pk:
+        other_eskul = other_eskul.exclude(pk=eskul.pk)
+    return CustomUser.objects.filter(role='pelatih', is_active=True).filter(~Exists(other_eskul))
+
 class EskulForm(forms.ModelForm):
     class Meta:
         model = Eskul
@@ -40,29 +48,13 @@ class EskulForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Filter pelatih yang tersedia (hanya yang role pelatih)
-        available_pelatih = CustomUser.objects.filter(role='pelatih', is_active=True)
-
-        # Exclude pelatih yang sudah punya eskul (kecuali untuk instance saat ini)
-        if self.instance and self.instance.pk and self.instance.pelatih:
-            # Get pelatih yang sudah punya eskul
-            used_pelatih_ids = Eskul.objects.filter(pelatih__isnull=False).exclude(pk=self.instance.pk).values_list('pelatih_id', flat=True)
-            # Exclude pelatih yang sudah punya eskul, tapi allow current pelatih
-            available_pelatih = available_pelatih.exclude(id__in=used_pelatih_ids)
-        else:
-            # Exclude pelatih yang sudah punya eskul
-            used_pelatih_ids = Eskul.objects.filter(pelatih__isnull=False).values_list('pelatih_id', flat=True)
-            available_pelatih = available_pelatih.exclude(id__in=used_pelatih_ids)
-
-        self.fields['pelatih'].queryset = available_pelatih.distinct()
+        # Pelatih yang belum punya eskul, plus pelatih eskul ini sendiri
+        self.fields['pelatih'].queryset = available_pelatih(self.instance)
         self.fields['pelatih'].empty_label = "Belum Ada Pelatih"
         self.fields['pelatih'].required = False
 
-    def clean_pelatih(self):
-        pelatih = self.cleaned_data.get('pelatih')
-        if pelatih:
-            # Check if pelatih already has an eskul
-            existing_eskul = Eskul.objects.filter(pelatih=pelatih).exclude(pk=self.instance.pk if self.instance and self.instance.pk else None)
-            if existing_eskul.exists():
-                raise forms.ValidationError(f"{pelatih.nama_lengkap} sudah menjadi pelatih untuk eskul {existing_eskul.first().nama_eskul}. Satu pelatih hanya bisa menangani satu eskul.")
-        return pelatih
\ No newline at end of file
+    def validate_unique(self):
+        # A pelatih outside the queryset above is already rejected as an
+        # invalid choice; a concurrent assignment is caught by the
+        # eskul_satu_eskul_per_pelatih constraint when saving (see save_eskul)
+        pass
@@ -0,0 +1,35 @@
+"""
+Password hashing in a process pool, for creating many accounts at once.
+
+Each hash deliberately costs a fraction of a second of CPU (PBKDF2 by
+default), so a few hundred accounts would block one core for minutes. The
+salts are generated here and the configured hasher is sent to the workers,
+which only need this module and the hasher class: no settings or models.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.contrib.auth.hashers import get_hasher
+
+# Fewer passwords than this are hashed in-process; starting workers costs more
+POOL_MIN_PASSWORDS = 4
+
+def encode_password(hasher, password, salt):
+    return hasher.encode(password, salt)
+
+def hash_passwords(passwords, workers=None):
+    """
+    Return the encoded form of each password, in order, as ``make_password``
+    would. ``workers`` defaults to the number of CPUs.
+    """
+    hasher = get_hasher('default')
+    salts = [hasher.salt() for _ in passwords]
+    workers = min(workers or os.cpu_count() or 1, len(passwords))
+    if workers <= 1 or len(passwords) < POOL_MIN_PASSWORDS:
+        return [encode_password(hasher, password, salt) for password, salt in zip(passwords, salts)]
+
+    # spawn, not fork: forking a multithreaded web worker can deadlock
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return list(pool.map(partial(encode_password, hasher), passwords, salts))
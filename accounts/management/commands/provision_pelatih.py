@@ -0,0 +1,70 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from accounts.provisioning import ProvisioningError, provision_accounts, read_accounts, validate_accounts
+
+class Command(BaseCommand):
+    help = (
+        'Membuat banyak akun pelatih sekaligus dari file CSV/Excel dengan kolom username, '
+        'nama_lengkap dan opsional email, no_telepon, password, eskul'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='File CSV atau Excel berisi data pelatih')
+        parser.add_argument(
+            '--workers', type=int,
+            help='Jumlah proses untuk hashing password (default: jumlah CPU)'
+        )
+        parser.add_argument(
+            '--output',
+            help='Simpan username dan password yang dibuat otomatis ke file CSV ini'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Hanya validasi, tidak membuat akun')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['file'], 'rb') as file:
+                rows = read_accounts(file, options['file'])
+        except OSError as e:
+            raise CommandError(f'File tidak bisa dibuka: {e}')
+        except ProvisioningError as e:
+            raise CommandError(str(e))
+
+        errors = validate_accounts(rows)
+        if errors:
+            for error in errors:
+                self.stderr.write(error)
+            raise CommandError(f'Tidak ada akun yang dibuat: {len(errors)} kesalahan dalam file.')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'{len(rows)} baris valid. Tidak ada akun yang dibuat (--dry-run).'))
+            return
+
+        started = time.perf_counter()
+        try:
+            users = provision_accounts(rows, workers=options['workers'])
+        except ProvisioningError as e:
+            raise CommandError(str(e))
+        except IntegrityError:
+            raise CommandError('Username sudah dipakai oleh akun yang dibuat bersamaan. Jalankan ulang perintah ini.')
+
+        generated = [row for row in rows if row.get('password_dibuat')]
+        if generated:
+            if options['output']:
+                with open(options['output'], 'w', newline='') as output:
+                    writer = csv.writer(output)
+                    writer.writerow(['username', 'password'])
+                    writer.writerows([row['username'], row['password']] for row in generated)
+                self.stdout.write(f'Password yang dibuat otomatis disimpan di {options["output"]}.')
+            else:
+                for row in generated:
+                    self.stdout.write(f'{row["username"]}\t{row["password"]}')
+
+        assigned = sum(1 for row in rows if row.get('eskul_obj'))
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(users)} akun pelatih dibuat ({assigned} langsung ditugaskan ke eskul) '
+            f'dalam {time.perf_counter() - started:.1f} detik.'
+        ))
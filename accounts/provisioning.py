@@ -0,0 +1,189 @@
+"""
+Bulk provisioning of pelatih accounts from a CSV or Excel file.
+
+Every row is validated before anything is written, with a handful of
+queries for the whole file. Valid files are created in one transaction:
+passwords hashed in a process pool (see hashing.py), users inserted in
+batches and, when the file names an eskul, the pelatih assigned to it.
+"""
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from eskul.models import Eskul
+from eskul.report_cache import bump_eskul
+from eskul.spreadsheets import UnsupportedFormat, read_rows
+from .hashing import hash_passwords
+
+User = get_user_model()
+
+COLUMNS = ('username', 'nama_lengkap', 'email', 'no_telepon', 'password', 'eskul')
+REQUIRED_COLUMNS = ('username', 'nama_lengkap')
+COLUMN_ALIASES = {
+    'nama': 'nama_lengkap',
+    'nama lengkap': 'nama_lengkap',
+    'name': 'nama_lengkap',
+    'telepon': 'no_telepon',
+    'no telepon': 'no_telepon',
+    'no. telepon': 'no_telepon',
+    'nama_eskul': 'eskul',
+    'nama eskul': 'eskul',
+}
+BATCH_SIZE = 500
+GENERATED_PASSWORD_LENGTH = 12
+
+class ProvisioningError(Exception):
+    """The file cannot be read or provisioned; the message is user-facing."""
+
+def read_accounts(file, filename):
+    """Rows of the file as dicts with every column of COLUMNS, stripped, plus
+    ``baris``, the spreadsheet row number used in error messages."""
+    try:
+        columns, records = read_rows(file, filename)
+    except UnsupportedFormat as e:
+        raise ProvisioningError(str(e))
+    except (ValueError, OSError) as e:
+        raise ProvisioningError(f'Error membaca file: {e}')
+
+    columns = [COLUMN_ALIASES.get(column, column) for column in columns]
+    if not all(column in columns for column in REQUIRED_COLUMNS):
+        raise ProvisioningError(f'File harus memiliki kolom: {", ".join(REQUIRED_COLUMNS)}')
+
+    rows = []
+    # Row 1 is the header
+    for number, record in enumerate(records, start=2):
+        record = {COLUMN_ALIASES.get(column, column): value for column, value in record.items()}
+        if any(record.values()):
+            rows.append({'baris': number, **{column: record.get(column, '') for column in COLUMNS}})
+    return rows
+
+def max_length(field_name):
+    return User._meta.get_field(field_name).max_length
+
+def validate_accounts(rows):
+    """
+    Check every row and return the list of error messages, empty when the
+    file can be provisioned. Rows with an eskul get it as ``eskul_obj``.
+    """
+    if not rows:
+        return ['File tidak berisi data pelatih.']
+
+    taken_usernames = set(
+        User.objects.filter(username__in=[row['username'] for row in rows]).values_list('username', flat=True)
+    )
+    eskul_by_name = defaultdict(list)
+    for eskul in Eskul.objects.annotate(nama_lower=Lower('nama_eskul')).filter(
+        nama_lower__in={row['eskul'].lower() for row in rows if row['eskul']}
+    ):
+        eskul_by_name[eskul.nama_lower].append(eskul)
+
+    username_validator = UnicodeUsernameValidator()
+    username_rows, eskul_rows = {}, {}
+    errors = []
+    for row in rows:
+        problems = []
+        username = row['username']
+        if not username:
+            problems.append('username kosong')
+        elif len(username) > max_length('username'):
+            problems.append(f'username lebih dari {max_length("username")} karakter')
+        else:
+            try:
+                username_validator(username)
+            except ValidationError:
+                problems.append('username hanya boleh berisi huruf, angka dan @/./+/-/_')
+        if username in taken_usernames:
+            problems.append(f'username {username} sudah dipakai')
+        elif username and username in username_rows:
+            problems.append(f'username {username} sama dengan baris {username_rows[username]}')
+        username_rows.setdefault(username, row['baris'])
+
+        if not row['nama_lengkap']:
+            problems.append('nama lengkap kosong')
+        elif len(row['nama_lengkap']) > max_length('nama_lengkap'):
+            problems.append(f'nama lengkap lebih dari {max_length("nama_lengkap")} karakter')
+        if len(row['no_telepon']) > max_length('no_telepon'):
+            problems.append(f'no. telepon lebih dari {max_length("no_telepon")} karakter')
+        if row['email']:
+            try:
+                validate_email(row['email'])
+            except ValidationError:
+                problems.append(f'email {row["email"]} tidak valid')
+
+        if row['password']:
+            user = User(username=username, nama_lengkap=row['nama_lengkap'], email=row['email'])
+            try:
+                validate_password(row['password'], user)
+            except ValidationError as e:
+                problems.extend(e.messages)
+
+        if row['eskul']:
+            key = row['eskul'].lower()
+            matches = eskul_by_name.get(key, [])
+            if not matches:
+                problems.append(f'eskul {row["eskul"]} tidak ditemukan')
+            elif len(matches) > 1:
+                problems.append(f'ada lebih dari satu eskul bernama {row["eskul"]}')
+            elif matches[0].pelatih_id:
+                problems.append(f'eskul {row["eskul"]} sudah memiliki pelatih')
+            elif key in eskul_rows:
+                problems.append(f'eskul {row["eskul"]} sudah diberikan ke pelatih di baris {eskul_rows[key]}')
+            else:
+                row['eskul_obj'] = matches[0]
+                eskul_rows[key] = row['baris']
+
+        errors.extend(f'Baris {row["baris"]}: {problem}' for problem in problems)
+    return errors
+
+def provision_accounts(rows, workers=None):
+    """
+    Create the pelatih accounts for rows that passed ``validate_accounts``
+    and return them. Rows without a password get a generated one, stored
+    back on the row as ``password`` with ``password_dibuat`` set.
+    """
+    for row in rows:
+        if not row['password']:
+            row['password'] = get_random_string(GENERATED_PASSWORD_LENGTH)
+            row['password_dibuat'] = True
+
+    # Hashed before the transaction so no locks are held meanwhile
+    hashes = hash_passwords([row['password'] for row in rows], workers=workers)
+    users = [
+        User(
+            username=row['username'],
+            nama_lengkap=row['nama_lengkap'],
+            email=row['email'],
+            no_telepon=row['no_telepon'] or None,
+            role='pelatih',
+            password=encoded,
+        )
+        for row, encoded in zip(rows, hashes)
+    ]
+
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+
+        assignments = {row['eskul_obj'].pk: user for row, user in zip(rows, users) if row.get('eskul_obj')}
+        # Locked, and checked again: a pelatih may have been assigned since validation
+        eskul_list = list(Eskul.objects.select_for_update().filter(pk__in=assignments).order_by('pk'))
+        already_assigned = [eskul.nama_eskul for eskul in eskul_list if eskul.pelatih_id]
+        if already_assigned:
+            raise ProvisioningError(f'Eskul sudah memiliki pelatih: {", ".join(already_assigned)}')
+
+        now = timezone.now()
+        for eskul in eskul_list:
+            eskul.pelatih = assignments[eskul.pk]
+            eskul.updated_at = now
+        Eskul.objects.bulk_update(eskul_list, ['pelatih', 'updated_at'], batch_size=BATCH_SIZE)
+        # bulk_create and bulk_update send no signals
+        bump_eskul(*assignments, lookups=True)
+
+    return users
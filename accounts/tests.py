@@ -1,3 +1,229 @@
-from django.test import TestCase
+import os
+import tempfile
 
-# Create your tests here.
+from django.contrib.auth.hashers import check_password
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+
+from eskul.loadtest import sample_photo
+from eskul.models import Eskul, Siswa
+from eskul.tests import SMALL_SIZE, QueryCountTestCase
+from .forms import available_pelatih
+from .hashing import hash_passwords
+from .views import LIST_PAGE_SIZE
+from .models import CustomUser
+
+
+class AccountManagementQueryCountTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def test_profile(self):
+        self.assertFlatQueries(lambda: self.client.get(reverse('profile')), 3)
+
+    def test_manage_users(self):
+        self.assertFlatQueries(lambda: self.client.get(reverse('manage_users')), 5)
+
+    def test_create_user_form(self):
+        self.assertFlatQueries(lambda: self.client.get(reverse('create_user')), 3)
+
+    def test_edit_user_form(self):
+        self.assertFlatQueries(lambda: self.client.get(reverse('edit_user', args=[self.pelatih.pk])), 4)
+
+    def test_manage_eskul(self):
+        self.assertFlatQueries(lambda: self.client.get(reverse('manage_eskul')), 5)
+
+    def test_create_eskul_form(self):
+        self.assertFlatQueries(lambda: self.client.get(reverse('create_eskul')), 3)
+
+    def test_edit_eskul_form(self):
+        self.assertFlatQueries(lambda: self.client.get(reverse('edit_eskul', args=[self.eskul.pk])), 8)
+
+    def test_assign_pelatih_form(self):
+        self.assertFlatQueries(lambda: self.client.get(reverse('assign_pelatih', args=[self.eskul.pk])), 6)
+
+
+class SatuPelatihSatuEskulTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+        self.pelatih_c = CustomUser.objects.create_user(
+            username='pelatih_c', role='pelatih', nama_lengkap='Pelatih C'
+        )
+
+    def test_database_rejects_second_eskul(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Eskul.objects.create(nama_eskul='Eskul C', deskripsi='Uji', pelatih=self.pelatih)
+        # Eskul without a pelatih are not limited
+        Eskul.objects.create(nama_eskul='Eskul D', deskripsi='Uji')
+        Eskul.objects.create(nama_eskul='Eskul E', deskripsi='Uji')
+
+    def test_available_pelatih(self):
+        self.assertEqual(list(available_pelatih()), [self.pelatih_c])
+        self.assertCountEqual(available_pelatih(self.eskul), [self.pelatih, self.pelatih_c])
+        with self.assertNumQueries(1):
+            list(available_pelatih(self.eskul))
+
+    def test_create_eskul_with_taken_pelatih(self):
+        response = self.client.post(reverse('create_eskul'), {
+            'nama_eskul': 'Eskul C', 'deskripsi': 'Uji', 'pelatih': self.pelatih.pk, 'is_active': 'on'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].has_error('pelatih'))
+        self.assertFalse(Eskul.objects.filter(nama_eskul='Eskul C').exists())
+
+    def test_assign_taken_pelatih(self):
+        url = reverse('assign_pelatih', args=[self.eskul.pk])
+        response = self.client.post(url, {'pelatih_id': self.pelatih_b.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'sudah menjadi pelatih untuk eskul Eskul B')
+        self.eskul.refresh_from_db()
+        self.assertEqual(self.eskul.pelatih, self.pelatih)
+
+        response = self.client.post(url, {'pelatih_id': self.pelatih_c.pk})
+        self.assertRedirects(response, reverse('manage_eskul'))
+        self.eskul.refresh_from_db()
+        self.assertEqual(self.eskul.pelatih, self.pelatih_c)
+
+
+class ManagementListTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+        self.seed(SMALL_SIZE)
+
+    def test_users_are_paginated(self):
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'massal_{i}', role='pelatih', nama_lengkap=f'Massal {i}')
+            for i in range(LIST_PAGE_SIZE)
+        ])
+        first = self.client.get(reverse('manage_users'))
+        self.assertEqual(len(first.context['page_obj']), LIST_PAGE_SIZE)
+        last = self.client.get(reverse('manage_users'), {'page': first.context['page_obj'].paginator.num_pages})
+        total = CustomUser.objects.filter(role='pelatih').count()
+        self.assertEqual(first.context['total_pelatih'], total)
+        self.assertEqual(len(last.context['page_obj']), total - LIST_PAGE_SIZE)
+
+    def test_users_annotations_and_search(self):
+        response = self.client.get(reverse('manage_users'), {'q': 'pelatih_a'})
+        [user] = response.context['page_obj']
+        self.assertEqual(user.nama_eskul, self.eskul.nama_eskul)
+        self.assertEqual(user.jumlah_siswa, self.eskul.siswa_list.count())
+        self.assertEqual(user.jumlah_pertemuan, self.eskul.pertemuan_list.count())
+        self.assertEqual(user.aktivitas_terakhir, self.eskul.pertemuan_list.latest('tanggal').tanggal)
+
+    def test_eskul_sorting(self):
+        Siswa.objects.bulk_create([Siswa(nama_siswa=f'Tambahan {i}', kelas='X-9', eskul=self.eskul_b) for i in range(50)])
+        response = self.client.get(reverse('manage_eskul'), {'sort': '-siswa'})
+        self.assertEqual(response.context['page_obj'][0], self.eskul_b)
+        counts = [eskul.jumlah_siswa for eskul in response.context['page_obj']]
+        self.assertEqual(counts, sorted(counts, reverse=True))
+
+        # Unknown sort keys fall back to the default instead of erroring
+        response = self.client.get(reverse('manage_eskul'), {'sort': 'deskripsi'})
+        self.assertEqual(response.context['sort'], '-dibuat')
+
+
+class ProfilePhotoTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings = self.settings(MEDIA_ROOT=media_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def upload(self, url):
+        photo = SimpleUploadedFile('foto.jpg', sample_photo(5), content_type='image/jpeg')
+        self.client.post(url, {'nama_lengkap': 'Pelatih A', 'email': 'pelatih@example.com', 'is_active': 'on', 'foto_profil': photo})
+        self.pelatih.refresh_from_db()
+        return self.pelatih.foto_profil
+
+    def test_replaced_photo_is_removed(self):
+        self.client.force_login(self.pelatih)
+        first = self.upload(reverse('profile'))
+        self.assertTrue(first.storage.exists(first.name))
+
+        second = self.upload(reverse('profile'))
+        self.assertNotEqual(second.name, first.name)
+        self.assertFalse(first.storage.exists(first.name))
+        self.assertTrue(second.storage.exists(second.name))
+
+    def test_admin_replacing_photo_removes_old_one(self):
+        self.client.force_login(self.admin)
+        url = reverse('edit_user', args=[self.pelatih.pk])
+        first = self.upload(url)
+        self.upload(url)
+        self.assertFalse(first.storage.exists(first.name))
+
+
+class ProvisionPelatihTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+        self.eskul_kosong = Eskul.objects.create(nama_eskul='Paduan Suara', deskripsi='Tanpa pelatih')
+
+    def upload(self, content):
+        csv_file = SimpleUploadedFile('pelatih.csv', content.encode(), content_type='text/csv')
+        return self.client.post(reverse('bulk_create_users'), {'file': csv_file})
+
+    def test_creates_accounts_and_assigns_eskul(self):
+        response = self.upload(
+            'username,nama,email,password,eskul\n'
+            'budi,Budi Santoso,budi@example.com,Rahasia-Kuat-123,paduan suara\n'
+            'sari,Sari Dewi,,,\n'
+        )
+        self.assertEqual(response.status_code, 200)
+        budi = CustomUser.objects.get(username='budi')
+        self.assertEqual(budi.role, 'pelatih')
+        self.assertTrue(budi.check_password('Rahasia-Kuat-123'))
+        self.eskul_kosong.refresh_from_db()
+        self.assertEqual(self.eskul_kosong.pelatih, budi)
+
+        # A generated password is shown once and works
+        sari_row = next(row for row in response.context['created'] if row['username'] == 'sari')
+        self.assertTrue(sari_row['password_dibuat'])
+        self.assertTrue(CustomUser.objects.get(username='sari').check_password(sari_row['password']))
+        self.assertIn('no-store', response['Cache-Control'])
+
+    def test_invalid_rows_create_nothing(self):
+        response = self.upload(
+            'username,nama_lengkap,eskul\n'
+            'baru,Pelatih Baru,Eskul A\n'
+            'pelatih_a,Sudah Ada,\n'
+            'kembar,Satu,Tidak Ada\n'
+            'kembar,Dua,\n'
+        )
+        errors = response.context['errors']
+        self.assertIn('Baris 2: eskul Eskul A sudah memiliki pelatih', errors)
+        self.assertIn('Baris 3: username pelatih_a sudah dipakai', errors)
+        self.assertIn('Baris 4: eskul Tidak Ada tidak ditemukan', errors)
+        self.assertIn('Baris 5: username kembar sama dengan baris 4', errors)
+        self.assertFalse(CustomUser.objects.filter(username__in=['baru', 'kembar']).exists())
+
+    def test_management_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'pelatih.csv')
+            output = os.path.join(directory, 'password.csv')
+            with open(source, 'w') as file:
+                file.write('username,nama_lengkap,eskul\n' + ''.join(f'massal_{i},Massal {i},\n' for i in range(5)))
+
+            call_command('provision_pelatih', source, '--dry-run', stdout=open(os.devnull, 'w'))
+            self.assertFalse(CustomUser.objects.filter(username__startswith='massal_').exists())
+
+            call_command('provision_pelatih', source, '--workers', '2', '--output', output, stdout=open(os.devnull, 'w'))
+            with open(output) as file:
+                passwords = dict(line.strip().split(',') for line in file.readlines()[1:])
+            self.assertEqual(len(passwords), 5)
+            self.assertTrue(CustomUser.objects.get(username='massal_3').check_password(passwords['massal_3']))
+
+            with self.assertRaises(CommandError):
+                call_command('provision_pelatih', source, stderr=open(os.devnull, 'w'))
+
+    def test_hash_passwords_in_pool(self):
+        passwords = ['satu', 'dua', 'tiga', 'empat']
+        for password, encoded in zip(passwords, hash_passwords(passwords, workers=2)):
+            self.assertTrue(check_password(password, encoded))
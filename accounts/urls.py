@@ -8,6 +8,7 @@ urlpatterns = [
     path('profile/', views.profile_view, name='profile'),
     # User Management
     path('create-user/', views.create_user, name='create_user'),
+    path('bulk-create-users/', views.bulk_create_users, name='bulk_create_users'),
     path('manage-users/', views.manage_users, name='manage_users'),
     path('edit-user/<int:user_id>/', views.edit_user, name='edit_user'),
     path('delete-user/<int:user_id>/', views.delete_user, name='delete_user'),
@@ -2,14 +2,56 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.contrib.auth import get_user_model
-from .forms import CreateUserForm, EskulForm
+from django.core.paginator import Paginator
+from django.views.decorators.cache import never_cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q
+from .forms import CreateUserForm, EskulForm, available_pelatih
+from .provisioning import ProvisioningError, provision_accounts, read_accounts, validate_accounts
+from eskul.metrics import JobTimer
 from eskul.models import Eskul
+from eskul.reports import eskul_list_queryset, pelatih_list_queryset
 
 User = get_user_model()
 
+LIST_PAGE_SIZE = 25
+
 def is_admin(user):
     return user.is_authenticated and user.role == 'admin'
 
+def list_page(request, queryset, search_fields, sort_fields, default_sort):
+    """
+    Search, sort and paginate an admin list from the ``q``, ``sort`` and
+    ``page`` GET parameters. ``sort_fields`` maps the allowed ``sort``
+    values to fields or annotations; a leading '-' sorts descending.
+    """
+    query = request.GET.get('q', '').strip()
+    if query:
+        condition = Q()
+        for field in search_fields:
+            condition |= Q(**{f'{field}__icontains': query})
+        queryset = queryset.filter(condition)
+
+    sort = request.GET.get('sort', default_sort)
+    if sort.lstrip('-') not in sort_fields:
+        sort = default_sort
+    field = F(sort_fields[sort.lstrip('-')])
+    # Rows without meetings go last either way; pk keeps pages stable
+    ordering = field.desc(nulls_last=True) if sort.startswith('-') else field.asc(nulls_last=True)
+    page_obj = Paginator(queryset.order_by(ordering, '-pk'), LIST_PAGE_SIZE).get_page(request.GET.get('page'))
+
+    return {
+        'page_obj': page_obj,
+        'page_range': page_obj.paginator.get_elided_page_range(page_obj.number),
+        'query': query,
+        'sort': sort,
+    }
+
+def remove_replaced_photo(user, old_name):
+    # Uploads always get a new name, so the old file is not used any more
+    if old_name and old_name != user.foto_profil.name:
+        user.foto_profil.storage.delete(old_name)
+
 @login_required
 def profile_view(request):
     if request.method == 'POST':
@@ -28,11 +70,13 @@ def profile_view(request):
             update_session_auth_hash(request, user)
 
         # Handle profile photo upload
+        old_foto = user.foto_profil.name
         if 'foto_profil' in request.FILES:
             user.foto_profil = request.FILES['foto_profil']
 
         try:
             user.save()
+            remove_replaced_photo(user, old_foto)
             messages.success(request, 'Profil berhasil diperbarui!')
             return redirect('profile')
         except Exception as e:
@@ -55,10 +99,54 @@ def create_user(request):
     
     return render(request, 'admin/create_user.html', {'form': form})
 
+@user_passes_test(is_admin)
+@never_cache  # The result lists generated passwords
+def bulk_create_users(request):
+    context = {}
+    if request.method == 'POST':
+        file = request.FILES.get('file')
+        if not file:
+            messages.error(request, 'File tidak ditemukan. Silakan pilih file.')
+            return redirect('bulk_create_users')
+        try:
+            timer = JobTimer('import', 'pelatih')
+            rows = read_accounts(file, file.name)
+            errors = validate_accounts(rows)
+            if errors:
+                # Nothing is created until the whole file is valid
+                context['errors'] = errors
+            else:
+                users = provision_accounts(rows)
+                timer.finish(len(users))
+                context['created'] = rows
+                messages.success(request, f'{len(users)} akun pelatih berhasil dibuat!')
+        except ProvisioningError as e:
+            messages.error(request, str(e))
+            return redirect('bulk_create_users')
+        except IntegrityError:
+            messages.error(request, 'Ada username yang baru saja dipakai akun lain. Silakan upload ulang.')
+            return redirect('bulk_create_users')
+
+    return render(request, 'admin/bulk_create_users.html', context)
+
 @user_passes_test(is_admin)
 def manage_users(request):
-    users = User.objects.filter(role='pelatih').order_by('-created_at')
-    return render(request, 'admin/manage_users.html', {'users': users})
+    context = list_page(
+        request, pelatih_list_queryset(),
+        search_fields=['nama_lengkap', 'username', 'email', 'eskul__nama_eskul'],
+        sort_fields={
+            'nama': 'nama_lengkap', 'username': 'username', 'eskul': 'nama_eskul',
+            'siswa': 'jumlah_siswa', 'pertemuan': 'jumlah_pertemuan',
+            'aktivitas': 'aktivitas_terakhir', 'dibuat': 'created_at',
+        },
+        default_sort='-dibuat'
+    )
+    context.update(User.objects.filter(role='pelatih').aggregate(
+        total_pelatih=Count('pk'),
+        pelatih_aktif=Count('pk', filter=Q(is_active=True)),
+        akun_terbaru=Max('created_at'),
+    ))
+    return render(request, 'admin/manage_users.html', context)
 
 @user_passes_test(is_admin)
 def edit_user(request, user_id):
@@ -81,6 +169,7 @@ def edit_user(request, user_id):
             user.set_password(password)
 
         # Handle profile photo upload
+        old_foto = user.foto_profil.name
         if 'foto_profil' in request.FILES:
             user.foto_profil = request.FILES['foto_profil']
 
@@ -89,6 +178,7 @@ def edit_user(request, user_id):
 
         try:
             user.save()
+            remove_replaced_photo(user, old_foto)
             messages.success(request, f'Data pelatih {user.nama_lengkap} berhasil diperbarui!')
             return redirect('manage_users')
         except Exception as e:
@@ -111,18 +201,40 @@ def delete_user(request, user_id):
 # === ESKUL MANAGEMENT VIEWS ===
 @user_passes_test(is_admin)
 def manage_eskul(request):
-    eskul_list = Eskul.objects.all().order_by('-created_at')
-    return render(request, 'admin/manage_eskul.html', {'eskul_list': eskul_list})
+    context = list_page(
+        request, eskul_list_queryset(),
+        search_fields=['nama_eskul', 'deskripsi', 'pelatih__nama_lengkap'],
+        sort_fields={
+            'nama': 'nama_eskul', 'pelatih': 'pelatih__nama_lengkap',
+            'siswa': 'jumlah_siswa', 'pertemuan': 'jumlah_pertemuan',
+            'aktivitas': 'aktivitas_terakhir', 'dibuat': 'created_at',
+        },
+        default_sort='-dibuat'
+    )
+    context.update(Eskul.objects.aggregate(
+        total_eskul=Count('pk', distinct=True),
+        eskul_aktif=Count('pk', distinct=True, filter=Q(is_active=True)),
+        total_siswa_eskul=Count('siswa_list'),
+    ))
+    return render(request, 'admin/manage_eskul.html', context)
+
+def save_eskul(form):
+    """Save a valid EskulForm; a pelatih taken by another eskul in the
+    meantime becomes a form error instead of an IntegrityError."""
+    try:
+        with transaction.atomic():
+            form.save()
+    except IntegrityError:
+        form.add_error('pelatih', Eskul.pelatih_taken_message(form.cleaned_data['pelatih']))
+        return False
+    return True
 
 @user_passes_test(is_admin)
 def create_eskul(request):
     if request.method == 'POST':
         form = EskulForm(request.POST)
-        if form.is_valid():
-            eskul = form.save(commit=False)
-            eskul.full_clean()  # Run model validation
-            eskul.save()
-            messages.success(request, f'Eskul {eskul.nama_eskul} berhasil dibuat!')
+        if form.is_valid() and save_eskul(form):
+            messages.success(request, f'Eskul {form.instance.nama_eskul} berhasil dibuat!')
             return redirect('manage_eskul')
     else:
         form = EskulForm()
@@ -134,11 +246,8 @@ def edit_eskul(request, eskul_id):
     eskul = get_object_or_404(Eskul, id=eskul_id)
     if request.method == 'POST':
         form = EskulForm(request.POST, instance=eskul)
-        if form.is_valid():
-            eskul = form.save(commit=False)
-            eskul.full_clean()  # Run model validation
-            eskul.save()
-            messages.success(request, f'Eskul {eskul.nama_eskul} berhasil diupdate!')
+        if form.is_valid() and save_eskul(form):
+            messages.success(request, f'Eskul {form.instance.nama_eskul} berhasil diupdate!')
             return redirect('manage_eskul')
     else:
         form = EskulForm(instance=eskul)
@@ -166,40 +275,23 @@ def assign_pelatih(request, eskul_id):
         if pelatih_id:
             try:
                 pelatih = User.objects.get(id=pelatih_id, role='pelatih')
-
-                # Check if pelatih already has another eskul
-                existing_eskul = Eskul.objects.filter(pelatih=pelatih).exclude(pk=eskul.pk)
-                if existing_eskul.exists():
-                    existing_eskul_name = existing_eskul.first().nama_eskul
-                    messages.error(request, f'{pelatih.nama_lengkap} sudah menjadi pelatih untuk eskul {existing_eskul_name}. Satu pelatih hanya bisa menangani satu eskul.')
-                    return render(request, 'admin/assign_pelatih.html', {
-                        'eskul': eskul,
-                        'available_pelatih': User.objects.filter(role='pelatih', is_active=True)
-                    })
-
                 eskul.pelatih = pelatih
-                eskul.save()
+                with transaction.atomic():
+                    eskul.save()
                 messages.success(request, f'Pelatih {pelatih.nama_lengkap} berhasil ditugaskan ke eskul {eskul.nama_eskul}!')
+            except IntegrityError:
+                # Pelatih sudah menangani eskul lain (constraint eskul_satu_eskul_per_pelatih)
+                messages.error(request, Eskul.pelatih_taken_message(pelatih))
+                eskul.refresh_from_db(fields=['pelatih'])
+                return render(request, 'admin/assign_pelatih.html', {
+                    'eskul': eskul,
+                    'available_pelatih': available_pelatih(eskul)
+                })
             except User.DoesNotExist:
                 messages.error(request, 'Pelatih tidak ditemukan!')
         return redirect('manage_eskul')
 
-    # Filter pelatih yang belum memiliki eskul atau sedang menjadi pelatih eskul ini
-    # Get all active pelatih
-    base_pelatih = User.objects.filter(role='pelatih', is_active=True)
-
-    # Get pelatih yang sudah punya eskul
-    used_pelatih_ids = Eskul.objects.filter(pelatih__isnull=False).exclude(pk=eskul.pk).values_list('pelatih_id', flat=True)
-
-    if eskul.pelatih:
-        # If current eskul has a pelatih, show all pelatih including current one
-        # but exclude those who are assigned to other eskuls (not current one)
-        available_pelatih = base_pelatih.exclude(id__in=used_pelatih_ids)
-    else:
-        # If no current pelatih, only show pelatih without eskul
-        available_pelatih = base_pelatih.exclude(id__in=used_pelatih_ids)
-
     return render(request, 'admin/assign_pelatih.html', {
         'eskul': eskul,
-        'available_pelatih': available_pelatih
+        'available_pelatih': available_pelatih(eskul)
     })
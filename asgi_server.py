@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+Production ASGI server: daphne workers forked from one preloaded master.
+
+The master loads and warms the project (eskul_project/prefork.py), binds
+the listening socket and forks the workers, each running daphne on the
+shared socket. Workers that die are replaced; SIGTERM or SIGINT stops them
+all.
+
+    python asgi_server.py --bind 127.0.0.1:8000 --workers 5
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+logger = logging.getLogger('asgi_server')
+
+RESPAWN_DELAY = 1
+BACKLOG = 2048
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Menjalankan aplikasi ASGI dengan beberapa worker daphne.')
+    parser.add_argument(
+        '--bind', default='127.0.0.1:8000',
+        help='Alamat IPv4 HOST:PORT yang didengarkan (default 127.0.0.1:8000)'
+    )
+    parser.add_argument('--workers', type=int, help='Jumlah proses worker (default: 2 x jumlah CPU + 1)')
+    parser.add_argument(
+        '--threads', type=int,
+        help='Thread per worker untuk query paralel dan view sync (default: jumlah CPU + 4)'
+    )
+    parser.add_argument(
+        '--proxy-headers', action='store_true',
+        help='Percayai header X-Forwarded-For/-Proto dari reverse proxy'
+    )
+    return parser.parse_args(argv)
+
+
+def bind_socket(address):
+    # IPv4 only: daphne adopts the socket through its `fd:` endpoint, which
+    # takes no address family
+    host, _, port = address.rpartition(':')
+    return socket.create_server((host or '127.0.0.1', int(port)), backlog=BACKLOG)
+
+
+def run_worker(application, sock, threads, proxy_headers):
+    # The master's handlers only stop workers; daphne installs its own
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    os.environ['ASGI_THREADS'] = str(threads)
+
+    # Imported only here: it creates Twisted's event loop, which must not be
+    # shared with the other workers
+    from daphne.access import AccessLogGenerator
+    from daphne.server import Server
+
+    server = Server(
+        application=application,
+        endpoints=[f'fd:fileno={sock.fileno()}'],
+        action_logger=AccessLogGenerator(sys.stdout),
+        proxy_forwarded_address_header='X-Forwarded-For' if proxy_headers else None,
+        proxy_forwarded_port_header='X-Forwarded-Port' if proxy_headers else None,
+        proxy_forwarded_proto_header='X-Forwarded-Proto' if proxy_headers else None,
+    )
+    server.run()
+    return 1 if server.abort_start else 0
+
+
+def spawn(start_worker):
+    pid = os.fork()
+    if pid:
+        return pid
+    status = 1
+    try:
+        status = start_worker()
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        os._exit(status)
+
+
+def supervise(start_worker, count):
+    workers = {spawn(start_worker) for _ in range(count)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        workers.discard(pid)
+        if not stopping:
+            logger.warning('Worker %s berhenti (status %s), menjalankan pengganti', pid, status)
+            time.sleep(RESPAWN_DELAY)
+            if not stopping:
+                workers.add(spawn(start_worker))
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(process)d] %(levelname)s %(message)s')
+    # See gunicorn.conf.py: no collections until the loaded project is frozen
+    gc.disable()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eskul_project.settings')
+    from django.conf import settings
+
+    # daphne is installed for its `runserver`; as an app it would import
+    # daphne.server, and with it create the event loop, in the master
+    settings.INSTALLED_APPS = [app for app in settings.INSTALLED_APPS if app != 'daphne']
+
+    from asgiref.compatibility import guarantee_single_callable
+
+    from eskul_project.prefork import cpu_count, default_workers, freeze, prepare_metrics_dir, warm_up
+
+    # Before the project, and with it prometheus_client, is loaded
+    prepare_metrics_dir()
+    from eskul_project.asgi import application
+
+    warm_up()
+    sock = bind_socket(args.bind)
+    workers = args.workers or default_workers()
+    threads = args.threads or cpu_count() + 4
+    freeze()
+
+    logger.info('Melayani %s dengan %s worker, %s thread per worker', args.bind, workers, threads)
+    application = guarantee_single_callable(application)
+    supervise(lambda: run_worker(application, sock, threads, args.proxy_headers), workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,33 +1,100 @@
+import json
+
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
 from .models import Eskul, Siswa, Pertemuan, Absensi, FotoKegiatan
+from .report_cache import bump_eskul
+
+# Up to this many rows the changelist shows an exact count
+EXACT_COUNT_LIMIT = 10000
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator whose count stops at EXACT_COUNT_LIMIT rows and above that
+    takes the PostgreSQL planner's estimate, so the page cost does not grow
+    with the table. Page numbers past the limit are approximate.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list.order_by()
+        # COUNT(*) over a LIMIT subquery reads at most EXACT_COUNT_LIMIT + 1 rows
+        exact = queryset[:EXACT_COUNT_LIMIT + 1].count()
+        if exact <= EXACT_COUNT_LIMIT:
+            return exact
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return super().count
+
+        sql, params = queryset.values('pk').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return max(int(plan[0]['Plan']['Plan Rows']), exact)
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # Skip the unfiltered COUNT(*) shown next to filtered results
+    show_full_result_count = False
 
 @admin.register(Eskul)
 class EskulAdmin(admin.ModelAdmin):
     list_display = ('nama_eskul', 'pelatih', 'is_active', 'created_at')
     list_filter = ('is_active', 'created_at')
+    list_select_related = ('pelatih',)
     search_fields = ('nama_eskul', 'pelatih__nama_lengkap')
+    autocomplete_fields = ('pelatih',)
 
 @admin.register(Siswa)
-class SiswaAdmin(admin.ModelAdmin):
+class SiswaAdmin(LargeTableAdmin):
     list_display = ('nama_siswa', 'kelas', 'eskul', 'is_active', 'created_at')
     list_filter = ('kelas', 'eskul', 'is_active')
+    list_select_related = ('eskul',)
     search_fields = ('nama_siswa', 'kelas')
+    autocomplete_fields = ('eskul',)
 
 @admin.register(Pertemuan)
-class PertemuanAdmin(admin.ModelAdmin):
+class PertemuanAdmin(LargeTableAdmin):
     list_display = ('eskul', 'tanggal', 'pelatih', 'created_at')
     list_filter = ('tanggal', 'eskul', 'pelatih')
+    list_select_related = ('eskul', 'pelatih')
     search_fields = ('eskul__nama_eskul', 'materi_kegiatan')
+    autocomplete_fields = ('eskul', 'pelatih')
     date_hierarchy = 'tanggal'
 
 @admin.register(FotoKegiatan)
-class FotoKegiatanAdmin(admin.ModelAdmin):
+class FotoKegiatanAdmin(LargeTableAdmin):
     list_display = ('pertemuan', 'caption', 'uploaded_at')
     list_filter = ('uploaded_at', 'pertemuan__eskul')
+    # Pertemuan.__str__ shows the eskul name
+    list_select_related = ('pertemuan__eskul',)
     search_fields = ('caption', 'pertemuan__eskul__nama_eskul')
+    autocomplete_fields = ('pertemuan',)
+    date_hierarchy = 'uploaded_at'
 
 @admin.register(Absensi)
-class AbsensiAdmin(admin.ModelAdmin):
-    list_display = ('siswa', 'pertemuan', 'keterangan', 'hadir')
-    list_filter = ('keterangan', 'hadir', 'pertemuan__tanggal')
+class AbsensiAdmin(LargeTableAdmin):
+    list_display = ('siswa', 'pertemuan', 'status')
+    list_filter = ('status', 'tanggal')
+    list_select_related = ('siswa', 'pertemuan__eskul')
     search_fields = ('siswa__nama_siswa', 'pertemuan__eskul__nama_eskul')
+    autocomplete_fields = ('siswa', 'pertemuan')
+    # No date_hierarchy: its top level is a DISTINCT over every row. The
+    # date filter on the denormalized tanggal needs no query to render and
+    # its ranges use absensi_tanggal_siswa_idx (and prune partitions).
+
+    # Deleting attendance rows sends no signal (see signals.py)
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_eskul(obj.pertemuan.eskul_id, obj.siswa.eskul_id)
+
+    def delete_queryset(self, request, queryset):
+        eskul_ids = set(queryset.values_list('pertemuan__eskul_id', flat=True))
+        eskul_ids.update(queryset.values_list('siswa__eskul_id', flat=True))
+        super().delete_queryset(request, queryset)
+        bump_eskul(*eskul_ids)
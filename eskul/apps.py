@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import pre_migrate
 
 
 class EskulConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'eskul'
+    
+    def ready(self):
+        import eskul.signals
+        # Their receivers instrument every database connection
+        import eskul.metrics
+        import eskul.profiling
+        # Keeps migrate from altering a partitioned attendance table
+        from eskul.partitioning import refuse_absensi_changes
+        pre_migrate.connect(refuse_absensi_changes, sender=self)
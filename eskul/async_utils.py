@@ -0,0 +1,47 @@
+"""
+Helpers for async views: resolve the user and run independent ORM queries
+concurrently without blocking the event loop.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+async def request_user(request):
+    """Load the user with ``auser()`` and keep it on the request, so the
+    template context processors do not load it again."""
+    user = await request.auser()
+    request.user = user
+    return user
+
+def run_query(query):
+    try:
+        return query()
+    finally:
+        # Worker threads keep their own connection; honour CONN_MAX_AGE for it
+        close_old_connections()
+
+def run_sequentially(queries):
+    return {name: query() for name, query in queries.items()}
+
+def in_transaction():
+    return connection.in_atomic_block
+
+async def gather_queries(**queries):
+    """
+    Evaluate each ``name=callable`` in its own worker thread, and so on its
+    own database connection, and return the results by name. The callables
+    must return evaluated data (lists, counts), not lazy querysets.
+
+    Falls back to running them one after another on the request's connection
+    when CONCURRENT_VIEW_QUERIES is off or the request is inside a
+    transaction, because other connections cannot see uncommitted rows.
+    """
+    if not settings.CONCURRENT_VIEW_QUERIES or await sync_to_async(in_transaction)():
+        return await sync_to_async(run_sequentially)(queries)
+
+    results = await asyncio.gather(*(
+        sync_to_async(run_query, thread_sensitive=False)(query) for query in queries.values()
+    ))
+    return dict(zip(queries, results))
@@ -0,0 +1,122 @@
+"""
+Conditional GET (ETag / Last-Modified) for report pages.
+
+A page's data version is the newest change timestamp and the row count of
+each queryset it is built from, fetched in one query. The count catches
+deletions, which leave no timestamp behind. A matching If-None-Match or
+If-Modified-Since gets a 304 before any report query runs.
+"""
+import hashlib
+from functools import cache, wraps
+from inspect import iscoroutinefunction
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.db import connections
+from django.db.models import F
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .async_utils import request_user
+
+VERSION_ALIAS = 'version_ts'
+
+@cache
+def release_marker():
+    """Newest modification time of the templates and app code, so a deploy
+    that changes the markup does not keep serving old pages as fresh."""
+    paths = [Path(settings.BASE_DIR) / 'templates', Path(__file__).parent]
+    return max(
+        (path.stat().st_mtime_ns for root in paths for path in root.rglob('*') if path.suffix in ('.html', '.py')),
+        default=0
+    )
+
+def data_version(scopes):
+    """
+    ``scopes`` is a list of (queryset, timestamp field). Returns the newest
+    timestamp across them and the (timestamp, count) pair of each.
+    """
+    parts, params = [], []
+    for queryset, field in scopes:
+        sql, inner_params = queryset.order_by().values(**{VERSION_ALIAS: F(field)}).query.sql_with_params()
+        parts.append(f'SELECT MAX(v.{VERSION_ALIAS}), COUNT(*) FROM ({sql}) v')
+        params.extend(inner_params)
+
+    # The database the page's own queries are routed to
+    with connections[scopes[0][0].db].cursor() as cursor:
+        cursor.execute(' UNION ALL '.join(parts), params)
+        rows = cursor.fetchall()
+
+    timestamps = [timestamp for timestamp, _ in rows if timestamp is not None]
+    return (max(timestamps) if timestamps else None), rows
+
+def timestamp(value):
+    return int(value.timestamp()) if value else None
+
+def page_etag(request, rows):
+    parts = [
+        str(release_marker()),
+        str(request.user.pk),
+        # Cached pages carry a CSRF token; a new token needs a new page
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        request.get_full_path(),
+    ]
+    parts.extend(f'{changed.isoformat() if changed else "-"}:{count}' for changed, count in rows)
+    return '"' + hashlib.sha1('|'.join(parts).encode()).hexdigest() + '"'
+
+def conditional_report(scopes_func):
+    """
+    Answer GET requests with a 304 when the data behind the page is
+    unchanged. ``scopes_func(request, *args, **kwargs)`` returns the scopes
+    for ``data_version``, or None to always render (e.g. for users the view
+    will turn away).
+    """
+    def decorator(view):
+        def precondition(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return None
+            # A flash message waiting to be shown needs a fresh render
+            if len(messages.get_messages(request)):
+                return None
+            scopes = scopes_func(request, *args, **kwargs)
+            if scopes is None:
+                return None
+            last_modified, rows = data_version(scopes)
+            return page_etag(request, rows), last_modified
+
+        def not_modified(request, version):
+            etag, last_modified = version
+            return get_conditional_response(request, etag=etag, last_modified=timestamp(last_modified))
+
+        def add_headers(response, version):
+            if version is None or response.status_code not in (200, 304):
+                return response
+            etag, last_modified = version
+            response.headers.setdefault('ETag', etag)
+            if last_modified:
+                response.headers.setdefault('Last-Modified', http_date(timestamp(last_modified)))
+            # Per-user pages: browsers may keep them but must revalidate
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def inner(request, *args, **kwargs):
+                await request_user(request)
+                version = await sync_to_async(precondition)(request, *args, **kwargs)
+                response = not_modified(request, version) if version else None
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return add_headers(response, version)
+        else:
+            @wraps(view)
+            def inner(request, *args, **kwargs):
+                version = precondition(request, *args, **kwargs)
+                response = not_modified(request, version) if version else None
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                return add_headers(response, version)
+        return inner
+    return decorator
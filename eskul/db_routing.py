@@ -0,0 +1,103 @@
+"""
+Read replica routing for reports, exports and history.
+
+Views decorated with ``replica_reads`` send the queries for this project's
+own models to the 'replica' database when READ_REPLICA is on. Writes,
+sessions and every other view stay on 'default'.
+
+The replica lags the primary a little. So replica_pin_middleware pins a
+browser that sent a write request (POST, PUT, PATCH, DELETE) to the primary
+for REPLICA_PIN_SECONDS with a cookie. The page it is redirected to then
+shows its own changes.
+"""
+import time
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.decorators import sync_and_async_middleware
+
+from .async_utils import request_user
+
+REPLICA = 'replica'
+PIN_COOKIE = 'eskul_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+# Sessions and messages stay on the primary, so a fresh login or flash
+# message is never looked for on a replica that has not caught up
+ROUTED_APPS = {'eskul', 'accounts'}
+
+# Copied into the threads sync_to_async runs queries in
+use_replica = ContextVar('use_replica', default=False)
+
+def pinned(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+def replica_allowed(request):
+    return settings.READ_REPLICA and REPLICA in settings.DATABASES and not pinned(request)
+
+def replica_reads(view):
+    """Run ``view``'s queries on the replica. Outermost after login_required,
+    so the ETag check of conditional_report reads the replica as well.
+    Bind streamed querysets with ``.using(queryset.db)`` inside the view, as
+    they are read after it returns."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            await request_user(request)
+            token = use_replica.set(replica_allowed(request))
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                use_replica.reset(token)
+    else:
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            # Load the user from the primary first
+            request.user.pk
+            token = use_replica.set(replica_allowed(request))
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                use_replica.reset(token)
+    return inner
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # Objects fetch their relations from the database they came from
+        if 'instance' in hints or not use_replica.get() or model._meta.app_label not in ROUTED_APPS:
+            return None
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both databases hold the same rows
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica copies the primary's schema
+        return db != REPLICA
+
+def pin_to_primary(request, response):
+    if request.method not in SAFE_METHODS and settings.READ_REPLICA:
+        seconds = settings.REPLICA_PIN_SECONDS
+        response.set_cookie(
+            PIN_COOKIE, f'{time.time() + seconds:.3f}', max_age=seconds, httponly=True, samesite='Lax'
+        )
+    return response
+
+@sync_and_async_middleware
+def replica_pin_middleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            return pin_to_primary(request, await get_response(request))
+    else:
+        def middleware(request):
+            return pin_to_primary(request, get_response(request))
+    return middleware
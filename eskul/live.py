@@ -0,0 +1,176 @@
+"""
+Live counter updates for the admin dashboard over WebSocket.
+
+Writes publish counter deltas with PostgreSQL NOTIFY, which is delivered
+only when the writing transaction commits, so every web process (WSGI or
+ASGI) can publish. Each ASGI process keeps one LISTEN connection while it
+has dashboards connected and fans the payloads out to their sockets.
+"""
+import asyncio
+import json
+import logging
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+import psycopg2
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections, connection, connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'eskul_dashboard'
+SOCKET_PATH = '/ws/dashboard/'
+RECONNECT_DELAY = 5
+QUEUE_SIZE = 100
+
+# Close codes sent to the browser
+CLOSE_FORBIDDEN = 4403
+CLOSE_NOT_FOUND = 4404
+
+def today():
+    # Same day boundary as dashboard_view
+    return timezone.now().date()
+
+def notify_dashboard(tanggal, **deltas):
+    """Publish counter deltas for ``tanggal``; only today's counters are shown."""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if str(tanggal) != today().isoformat() or not deltas or connection.vendor != 'postgresql':
+        return
+    payload = json.dumps({'tanggal': str(tanggal), 'deltas': deltas})
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, payload])
+
+def notify_absensi_created(absensi_list):
+    """Publish the attendance counters for rows saved with ``bulk_create``."""
+    tanggal = today().isoformat()
+    created = [absensi for absensi in absensi_list if str(absensi.tanggal) == tanggal]
+    notify_dashboard(
+        tanggal,
+        absensi_hari_ini=len(created),
+        hadir_hari_ini=sum(1 for absensi in created if absensi.hadir)
+    )
+
+class Broadcaster:
+    """Per-process LISTEN connection shared by all connected dashboards."""
+
+    def __init__(self):
+        self.queues = set()
+        self.task = None
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.queues.add(queue)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.listen())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.queues.discard(queue)
+        if not self.queues and self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def publish(self, payload):
+        for queue in self.queues:
+            if queue.full():
+                # A stalled client loses its oldest update rather than blocking the rest
+                queue.get_nowait()
+            queue.put_nowait(payload)
+
+    def connect(self):
+        params = connections['default'].get_connection_params()
+        listener = psycopg2.connect(**params)
+        listener.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with listener.cursor() as cursor:
+            cursor.execute(f'LISTEN {CHANNEL}')
+        return listener
+
+    async def listen(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                listener = await loop.run_in_executor(None, self.connect)
+            except psycopg2.Error:
+                logger.exception('Gagal membuka koneksi LISTEN dashboard')
+                await asyncio.sleep(RECONNECT_DELAY)
+                continue
+
+            readable = asyncio.Event()
+            loop.add_reader(listener.fileno(), readable.set)
+            try:
+                while True:
+                    await readable.wait()
+                    readable.clear()
+                    listener.poll()
+                    while listener.notifies:
+                        self.publish(listener.notifies.pop(0).payload)
+            except psycopg2.Error:
+                logger.exception('Koneksi LISTEN dashboard terputus')
+            finally:
+                loop.remove_reader(listener.fileno())
+                listener.close()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+broadcaster = Broadcaster()
+
+def header(scope, name):
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return ''
+
+def same_origin(scope):
+    # Browsers always send Origin on WebSocket handshakes; reject other sites
+    origin = header(scope, b'origin')
+    return bool(origin) and urlsplit(origin).netloc == header(scope, b'host')
+
+def scope_user(scope):
+    cookies = SimpleCookie(header(scope, b'cookie'))
+    morsel = cookies.get(settings.SESSION_COOKIE_NAME)
+    session = import_module(settings.SESSION_ENGINE).SessionStore(morsel.value if morsel else None)
+    try:
+        return get_user(SimpleNamespace(session=session))
+    finally:
+        # No request_finished signal here to close the connection for us
+        if not connection.in_atomic_block:
+            close_old_connections()
+
+async def dashboard_socket(scope, receive, send):
+    """ASGI app for SOCKET_PATH: admins receive JSON counter deltas."""
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+
+    user = await sync_to_async(scope_user)(scope)
+    if not same_origin(scope) or not user.is_authenticated or user.role != 'admin':
+        await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+        return
+
+    await send({'type': 'websocket.accept'})
+    queue = broadcaster.subscribe()
+    receiving = asyncio.ensure_future(receive())
+    try:
+        while True:
+            sending = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({receiving, sending}, return_when=asyncio.FIRST_COMPLETED)
+            if sending in done:
+                await send({'type': 'websocket.send', 'text': sending.result()})
+            else:
+                sending.cancel()
+            if receiving in done:
+                if receiving.result()['type'] == 'websocket.disconnect':
+                    break
+                # Messages from the browser are ignored
+                receiving = asyncio.ensure_future(receive())
+    finally:
+        receiving.cancel()
+        broadcaster.unsubscribe(queue)
+
+async def reject_socket(scope, receive, send):
+    await receive()
+    await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
@@ -0,0 +1,339 @@
+"""
+Load test of the attendance-day peak: every coach logs in, opens the
+create page, saves a meeting with a photo and checks the history within the
+same half hour after school, while admins keep pulling reports.
+
+``seed_load_test_data`` creates the accounts in the database the server
+uses; ``run_load_test`` then drives the server over HTTP with one thread
+per simulated user and returns the timings per endpoint. Run both with
+``manage.py load_test``.
+"""
+import io
+import statistics
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode, urljoin
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Count
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Absensi, Eskul, FotoKegiatan, Pertemuan, Siswa
+from .report_cache import bump_eskul
+
+User = get_user_model()
+
+PREFIX = 'loadtest'
+ESKUL_PREFIX = 'LOADTEST'
+# Seeded history ends this many days ago, clear of the dates the run uses
+HISTORY_OFFSET = 60
+MAX_ROUNDS = HISTORY_OFFSET
+KELAS = [f'{tingkat}{rombel}' for tingkat in range(1, 7) for rombel in 'ABCDE']
+STATUS_CYCLE = list(Absensi.Status)
+TIMEOUT = 60
+
+def coach_username(number):
+    return f'{PREFIX}_pelatih_{number}'
+
+def admin_username(number):
+    return f'{PREFIX}_admin_{number}'
+
+def remove_load_test_meetings():
+    """Delete the meetings of the load-test eskul, with their photo files."""
+    pertemuan = Pertemuan.objects.filter(eskul__nama_eskul__startswith=ESKUL_PREFIX)
+    for foto in FotoKegiatan.objects.filter(pertemuan__in=pertemuan).exclude(foto=''):
+        foto.foto.delete(save=False)
+    pertemuan.delete()
+
+@transaction.atomic
+def seed_load_test_data(coaches, admins, students, history, password):
+    """
+    Create, or reset, ``coaches`` pelatih with an eskul of ``students``
+    students and ``history`` past meetings each, and ``admins`` admins, all
+    with ``password``. Meetings saved by an earlier run are removed, so the
+    run can use the same dates again.
+    """
+    remove_load_test_meetings()
+
+    password_hash = make_password(password)
+    accounts = [(coach_username(i), 'pelatih') for i in range(1, coaches + 1)]
+    accounts += [(admin_username(i), 'admin') for i in range(1, admins + 1)]
+    existing = set(User.objects.filter(username__in=[name for name, _ in accounts]).values_list('username', flat=True))
+    User.objects.bulk_create([
+        User(username=name, role=role, nama_lengkap=name.replace('_', ' ').upper(), password=password_hash)
+        for name, role in accounts if name not in existing
+    ])
+    User.objects.filter(username__in=existing).update(password=password_hash, is_active=True)
+
+    pelatih = {user.username: user for user in User.objects.filter(username__in=[name for name, _ in accounts[:coaches]])}
+    eskul_by_pelatih = {eskul.pelatih_id: eskul for eskul in Eskul.objects.filter(pelatih__in=pelatih.values())}
+    Eskul.objects.bulk_create([
+        Eskul(nama_eskul=f'{ESKUL_PREFIX} {i}', deskripsi='Data uji beban', pelatih=pelatih[coach_username(i)])
+        for i in range(1, coaches + 1) if pelatih[coach_username(i)].pk not in eskul_by_pelatih
+    ])
+    eskul_list = list(Eskul.objects.filter(pelatih__in=pelatih.values()).order_by('pk'))
+
+    have = dict(
+        Siswa.objects.filter(eskul__in=eskul_list).values('eskul').annotate(n=Count('pk')).values_list('eskul', 'n')
+    )
+    Siswa.objects.bulk_create([
+        Siswa(nama_siswa=f'{eskul.nama_eskul} SISWA {j}', kelas=KELAS[j % len(KELAS)], eskul=eskul)
+        for eskul in eskul_list
+        for j in range(have.get(eskul.pk, 0) + 1, students + 1)
+    ])
+
+    today = timezone.localdate()
+    pertemuan_list = Pertemuan.objects.bulk_create([
+        Pertemuan(
+            eskul=eskul, pelatih_id=eskul.pelatih_id, materi_kegiatan='Latihan rutin',
+            tanggal=today - timedelta(days=HISTORY_OFFSET + k)
+        )
+        for eskul in eskul_list
+        for k in range(history)
+    ])
+    roster = defaultdict(list)
+    for siswa in Siswa.objects.filter(eskul__in=eskul_list, is_active=True):
+        roster[siswa.eskul_id].append(siswa)
+    Absensi.objects.bulk_create([
+        Absensi(pertemuan=pertemuan, siswa=siswa, tanggal=pertemuan.tanggal, status=STATUS_CYCLE[(siswa.pk + k) % 4])
+        for k, pertemuan in enumerate(pertemuan_list)
+        for siswa in roster[pertemuan.eskul_id]
+    ], batch_size=5000)
+    # bulk_create sends no signals
+    bump_eskul(*(eskul.pk for eskul in eskul_list), lookups=True)
+    return [name for name, _ in accounts]
+
+def sample_photo(size_kb):
+    """A JPEG of roughly ``size_kb`` KB, like a phone photo after resizing."""
+    from PIL import Image
+
+    side = max(16, int((size_kb * 1024 / 0.4) ** 0.5))
+    image = Image.effect_noise((side, side), 64).convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+def multipart_body(fields, files):
+    """Encode form fields and ``(name, filename, content_type, data)`` files."""
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, value in fields.items():
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, filename, content_type, data in files:
+        body.write(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode()
+        )
+        body.write(data)
+        body.write(b'\r\n')
+    body.write(f'--{boundary}--\r\n'.encode())
+    return body.getvalue(), f'multipart/form-data; boundary={boundary}'
+
+class NoRedirect(HTTPRedirectHandler):
+    # Each request is timed on its own; a redirect is a result, not a step
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+class Results:
+    """Timings and errors per endpoint, shared by all user threads."""
+
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.error_samples = {}
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, seconds, error=None):
+        with self.lock:
+            self.timings[endpoint].append(seconds)
+            if error:
+                self.errors[endpoint] += 1
+                self.error_samples.setdefault(endpoint, error)
+
+    def summary(self, elapsed):
+        """One row per endpoint: count, errors, throughput and latency in ms."""
+        rows = []
+        for endpoint in sorted(self.timings):
+            timings = sorted(self.timings[endpoint])
+            rows.append({
+                'endpoint': endpoint,
+                'requests': len(timings),
+                'errors': self.errors[endpoint],
+                'error_rate': self.errors[endpoint] / len(timings),
+                'per_second': len(timings) / elapsed,
+                'p50': percentile(timings, 50) * 1000,
+                'p95': percentile(timings, 95) * 1000,
+                'p99': percentile(timings, 99) * 1000,
+                'max': timings[-1] * 1000,
+                'mean': statistics.fmean(timings) * 1000,
+            })
+        return rows
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+class UserSession:
+    """One simulated user: a cookie jar and timed requests."""
+
+    def __init__(self, base_url, results):
+        self.base_url = base_url
+        self.results = results
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies), NoRedirect)
+
+    def csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == settings.CSRF_COOKIE_NAME), '')
+
+    def request(self, endpoint, path, data=None, content_type=None, expect=None):
+        """
+        Send one request and record it under ``endpoint``. Errors are
+        statuses of 400 and up, failed connections, and responses other
+        than ``expect``: a status, or a path the redirect must lead to.
+        """
+        headers = {}
+        if data is not None:
+            headers = {'Content-Type': content_type, 'X-CSRFToken': self.csrf_token()}
+        request = Request(urljoin(self.base_url, path), data=data, headers=headers)
+        started = time.perf_counter()
+        error = None
+        try:
+            with self.opener.open(request, timeout=TIMEOUT) as response:
+                response.read()
+                status, location = response.status, None
+        except HTTPError as e:
+            e.read()
+            status, location = e.code, e.headers.get('Location')
+        except (URLError, OSError) as e:
+            status, location, error = None, None, str(e)
+        seconds = time.perf_counter() - started
+
+        if error is None:
+            if status >= 400:
+                error = f'HTTP {status}'
+            elif isinstance(expect, int) and status != expect:
+                error = f'HTTP {status}, diharapkan {expect}'
+            elif isinstance(expect, str) and not (location or '').endswith(expect):
+                error = f'Dialihkan ke {location or "-"}, diharapkan {expect}'
+        self.results.record(endpoint, seconds, error)
+        return error is None
+
+    def login(self, username, password):
+        login_path = reverse('login')
+        self.request('login_form', login_path, expect=200)
+        data = urlencode({
+            'username': username, 'password': password, 'csrfmiddlewaretoken': self.csrf_token()
+        }).encode()
+        return self.request(
+            'login', login_path, data, 'application/x-www-form-urlencoded', expect=settings.LOGIN_REDIRECT_URL
+        )
+
+def coach_rosters(coaches):
+    """Active student ids per load-test coach, for the attendance they post."""
+    rosters = defaultdict(list)
+    for username, siswa_id in Siswa.objects.filter(
+        eskul__pelatih__username__in=[coach_username(i) for i in range(1, coaches + 1)], is_active=True
+    ).values_list('eskul__pelatih__username', 'pk'):
+        rosters[username].append(siswa_id)
+    return rosters
+
+def coach_scenario(session, username, password, siswa_ids, rounds, photo, think):
+    """Log in, then per round: open the create page, save a meeting dated
+    one day earlier than the last, with photo, and open the history."""
+    if not session.login(username, password):
+        return
+    today = timezone.localdate()
+    create_path = reverse('pelatih_create_pertemuan')
+    history_path = reverse('pelatih_history_pertemuan')
+
+    for round_number in range(rounds):
+        session.request('pelatih_create_pertemuan', create_path, expect=200)
+        time.sleep(think)
+        fields = {
+            'csrfmiddlewaretoken': session.csrf_token(),
+            'tanggal': (today - timedelta(days=round_number)).isoformat(),
+            'materi_kegiatan': f'Latihan uji beban {round_number + 1}',
+            **{
+                f'absensi_{siswa_id}': STATUS_CYCLE[(siswa_id + round_number) % 4].kode
+                for siswa_id in siswa_ids
+            },
+        }
+        body, content_type = multipart_body(fields, [('foto_kegiatan', 'kegiatan.jpg', 'image/jpeg', photo)])
+        # Saved meetings redirect to the history; rejected ones back to the form
+        session.request('pelatih_create_pertemuan POST', create_path, body, content_type, expect=history_path)
+        session.request('pelatih_history_pertemuan', history_path, expect=200)
+        time.sleep(think)
+
+def admin_scenario(session, username, password, think, stop):
+    """Log in and pull the dashboard, reports and an export until ``stop``."""
+    if not session.login(username, password):
+        return
+    pages = [
+        ('dashboard', reverse('dashboard')),
+        ('admin_attendance_report', reverse('admin_attendance_report')),
+        ('admin_pertemuan_report', reverse('admin_pertemuan_report')),
+        ('export_attendance_excel', reverse('export_attendance_excel') + '?format=csv'),
+    ]
+    while not stop.is_set():
+        for endpoint, path in pages:
+            session.request(endpoint, path, expect=200)
+            if stop.wait(think):
+                return
+
+def run_load_test(base_url, coaches, admins, password, rounds=1, photo_kb=300, ramp=0.0, think=0.0):
+    """
+    Run ``coaches`` coach threads (started evenly over ``ramp`` seconds) and
+    ``admins`` admin threads against ``base_url`` until every coach has
+    finished. Returns the Results and the elapsed seconds.
+    """
+    results = Results()
+    photo = sample_photo(photo_kb)
+    rosters = coach_rosters(coaches)
+    stop = threading.Event()
+
+    def guarded(target, *args):
+        def run():
+            try:
+                target(*args)
+            except Exception as e:
+                results.record('harness', 0, f'{type(e).__name__}: {e}')
+        return run
+
+    admin_threads = [
+        threading.Thread(target=guarded(
+            admin_scenario, UserSession(base_url, results), admin_username(i), password, think, stop
+        ))
+        for i in range(1, admins + 1)
+    ]
+    coach_threads = [
+        threading.Thread(target=guarded(
+            coach_scenario, UserSession(base_url, results), coach_username(i), password,
+            rosters[coach_username(i)], rounds, photo, think
+        ))
+        for i in range(1, coaches + 1)
+    ]
+
+    started = time.perf_counter()
+    for thread in admin_threads:
+        thread.start()
+    for i, thread in enumerate(coach_threads):
+        thread.start()
+        if ramp and i < len(coach_threads) - 1:
+            time.sleep(ramp / len(coach_threads))
+    for thread in coach_threads:
+        thread.join()
+    stop.set()
+    for thread in admin_threads:
+        thread.join()
+    return results, time.perf_counter() - started
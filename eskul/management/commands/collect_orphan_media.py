@@ -0,0 +1,56 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from eskul.media_gc import CHUNK_SIZE, MIN_AGE_HOURS, MediaSweep
+
+class Command(BaseCommand):
+    help = (
+        'Menghapus file upload (foto kegiatan, foto profil) yang tidak lagi dipakai data mana pun, '
+        'misalnya setelah pertemuan, eskul atau pelatih dihapus.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Hanya tampilkan file yang akan dihapus')
+        parser.add_argument(
+            '--quarantine', metavar='DIR',
+            help='Pindahkan file ke direktori ini, dengan struktur folder yang sama, alih-alih menghapusnya'
+        )
+        parser.add_argument(
+            '--min-age', type=float, default=MIN_AGE_HOURS,
+            help=f'Hanya file yang lebih tua dari sekian jam (default {MIN_AGE_HOURS}); '
+                 'upload baru bisa saja belum tersimpan datanya'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help=f'Jumlah file yang dicek ke database sekaligus (default {CHUNK_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1 or options['min_age'] < 0:
+            raise CommandError('--chunk-size minimal 1 dan --min-age tidak boleh negatif.')
+        quarantine = options['quarantine']
+        if quarantine:
+            quarantine = Path(quarantine).resolve()
+            if quarantine.is_relative_to(Path(settings.MEDIA_ROOT).resolve()):
+                raise CommandError('Direktori karantina tidak boleh berada di dalam MEDIA_ROOT.')
+
+        sweep = MediaSweep(
+            min_age_hours=options['min_age'], chunk_size=options['chunk_size'],
+            quarantine=quarantine, dry_run=options['dry_run']
+        )
+        for orphan in sweep.run():
+            if options['verbosity'] >= 2 or options['dry_run']:
+                self.stdout.write(orphan.name)
+
+        if options['dry_run']:
+            action = 'akan dihapus'
+        elif quarantine:
+            action = f'dipindahkan ke {quarantine}'
+        else:
+            action = 'dihapus'
+        size_mb = sweep.removed_bytes / (1024 * 1024)
+        self.stdout.write(self.style.SUCCESS(
+            f'{sweep.removed} dari {sweep.checked} file tidak dipakai ({size_mb:.1f} MB) {action}.'
+        ))
@@ -0,0 +1,86 @@
+import asyncio
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+User = get_user_model()
+
+URL_NAMES = ['dashboard', 'admin_attendance_report', 'admin_pertemuan_report']
+
+class Command(BaseCommand):
+    help = (
+        'Membandingkan latensi dashboard dan laporan: jalur WSGI (query berurutan) '
+        'dan jalur ASGI (query berjalan bersamaan)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='Admin yang dipakai untuk login (default: admin pertama)')
+        parser.add_argument(
+            '--requests', type=int, default=20,
+            help='Jumlah request per URL per jalur (default 20)'
+        )
+
+    def handle(self, *args, **options):
+        if options['username']:
+            user = User.objects.filter(username=options['username'], role='admin').first()
+        else:
+            user = User.objects.filter(role='admin').order_by('pk').first()
+        if user is None:
+            raise CommandError('Admin tidak ditemukan.')
+
+        total = options['requests']
+        client = Client()
+        client.force_login(user)
+        async_client = AsyncClient()
+        async_client.cookies = client.cookies
+
+        self.stdout.write(f'{"URL":<28} {"WSGI p50":>10} {"WSGI p95":>10} {"ASGI p50":>10} {"ASGI p95":>10}')
+        try:
+            for name in URL_NAMES:
+                url = reverse(name)
+                with override_settings(CONCURRENT_VIEW_QUERIES=False):
+                    wsgi = self.measure_wsgi(client, url, total)
+                with override_settings(CONCURRENT_VIEW_QUERIES=True):
+                    asgi = asyncio.run(self.measure_asgi(async_client, url, total))
+                self.stdout.write(
+                    f'{name:<28} {self.p50(wsgi):>8.1f}ms {self.p95(wsgi):>8.1f}ms '
+                    f'{self.p50(asgi):>8.1f}ms {self.p95(asgi):>8.1f}ms'
+                )
+        finally:
+            client.logout()
+
+        self.stdout.write(self.style.SUCCESS(f'Selesai, {total} request per URL per jalur.'))
+
+    def measure_wsgi(self, client, url, total):
+        client.get(url)  # warm up
+        timings = []
+        for _ in range(total):
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+            self.check_response(url, response)
+        return timings
+
+    async def measure_asgi(self, client, url, total):
+        await client.get(url)  # warm up
+        timings = []
+        for _ in range(total):
+            started = time.perf_counter()
+            response = await client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+            self.check_response(url, response)
+        return timings
+
+    def check_response(self, url, response):
+        if response.status_code != 200:
+            raise CommandError(f'{url} mengembalikan status {response.status_code}.')
+
+    def p50(self, timings):
+        return statistics.median(timings)
+
+    def p95(self, timings):
+        return statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
@@ -0,0 +1,38 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from eskul.partitioning import (
+    ensure_partitions, is_partitioned, next_period_start, partition_interval, period_start,
+)
+
+class Command(BaseCommand):
+    help = 'Membuat partisi tabel absensi untuk periode berjalan dan beberapa periode berikutnya'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead', type=int, default=2,
+            help='Jumlah periode setelah periode berjalan yang disiapkan (default 2)'
+        )
+
+    def handle(self, *args, **options):
+        interval = partition_interval()
+        if not interval:
+            raise CommandError('ABSENSI_PARTITION_INTERVAL belum diatur.')
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partisi absensi membutuhkan database PostgreSQL.')
+
+        first = period_start(date.today(), interval)
+        last = first
+        for _ in range(options['ahead']):
+            last = next_period_start(last, interval)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            if not is_partitioned(cursor):
+                raise CommandError('Tabel absensi belum dipartisi. Jalankan partition_absensi terlebih dahulu.')
+            created = ensure_partitions(cursor, first, last, interval)
+
+        for name in created:
+            self.stdout.write(f'Partisi dibuat: {name}')
+        self.stdout.write(self.style.SUCCESS(f'{len(created)} partisi baru dibuat.'))
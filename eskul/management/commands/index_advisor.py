@@ -0,0 +1,150 @@
+import json
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+
+from eskul.models import Eskul, Siswa, Pertemuan, Absensi
+from eskul.reports import attendance_report_queryset, pertemuan_report_queryset, pelatih_students_queryset
+
+User = get_user_model()
+
+STATUS_CYCLE = [
+    Absensi.Status.HADIR, Absensi.Status.HADIR, Absensi.Status.HADIR,
+    Absensi.Status.SAKIT, Absensi.Status.IZIN, Absensi.Status.ALPHA,
+]
+
+class Command(BaseCommand):
+    help = (
+        'Menjalankan EXPLAIN (ANALYZE, BUFFERS) pada query laporan dan export, '
+        'lalu menandai sequential scan pada tabel besar dan plan yang lambat'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Isi data contoh sebanyak N siswa per eskul sebelum analisis (di-rollback setelah selesai)'
+        )
+        parser.add_argument(
+            '--pertemuan', type=int, default=60,
+            help='Jumlah pertemuan per eskul untuk data contoh (default 60)'
+        )
+        parser.add_argument(
+            '--slow-ms', type=float, default=50.0,
+            help='Batas waktu eksekusi (ms) sebelum plan dianggap lambat (default 50)'
+        )
+        parser.add_argument(
+            '--min-rows', type=int, default=1000,
+            help='Sequential scan hanya ditandai jika tabel punya minimal N baris (default 1000)'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('index_advisor membutuhkan database PostgreSQL.')
+
+        with transaction.atomic():
+            if options['seed']:
+                self.seed(options['seed'], options['pertemuan'])
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+            flagged = 0
+            for label, queryset in self.report_queries():
+                flagged += self.explain(label, queryset, options['slow_ms'], options['min_rows'])
+
+            # Seeded rows never leave this transaction
+            transaction.set_rollback(True)
+
+        if flagged:
+            self.stdout.write(self.style.WARNING(f'{flagged} query perlu diperhatikan.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Semua query memakai index dan di bawah batas waktu.'))
+
+    def report_queries(self):
+        eskul = Eskul.objects.order_by('pk').first()
+        siswa = Siswa.objects.order_by('pk').first()
+        pelatih_id = eskul.pelatih_id if eskul else None
+        today = date.today()
+        semester_start = today - timedelta(days=180)
+
+        return [
+            ('Laporan kehadiran', attendance_report_queryset()),
+            ('Laporan kehadiran per eskul & kelas', attendance_report_queryset(
+                eskul_id=eskul and eskul.pk, kelas='1A')),
+            ('Export kehadiran per rentang tanggal', attendance_report_queryset(
+                start_date=semester_start, end_date=today)),
+            ('Laporan pertemuan', pertemuan_report_queryset()),
+            ('Laporan pertemuan per pelatih & tanggal', pertemuan_report_queryset(
+                pelatih_id=pelatih_id, start_date=semester_start, end_date=today)),
+            ('Daftar siswa pelatih', pelatih_students_queryset(eskul)),
+            ('Riwayat pertemuan pelatih', Pertemuan.objects.filter(pelatih_id=pelatih_id)),
+            ('Daftar kelas', Siswa.objects.filter(kelas='1A', is_active=True)),
+            ('Rekap absensi siswa per status', Absensi.objects.filter(
+                siswa=siswa, status=Absensi.Status.ALPHA).values('siswa').annotate(total=Count('id'))),
+            ('Absensi per rentang tanggal', Absensi.objects.filter(
+                tanggal__range=(semester_start, today)).values('status').annotate(total=Count('id'))),
+        ]
+
+    def explain(self, label, queryset, slow_ms, min_rows):
+        result = json.loads(queryset.explain(format='json', analyze=True, buffers=True))[0]
+        execution_ms = result['Execution Time']
+        seq_scans = [
+            node['Relation Name'] for node in self.walk(result['Plan'])
+            if node['Node Type'] == 'Seq Scan' and self.table_rows(node['Relation Name']) >= min_rows
+        ]
+
+        self.stdout.write(f'{label}: {execution_ms:.2f} ms')
+        for relation in sorted(set(seq_scans)):
+            self.stdout.write(self.style.WARNING(f'  Seq Scan pada {relation}'))
+        if execution_ms > slow_ms:
+            self.stdout.write(self.style.WARNING(f'  Plan lambat (> {slow_ms:g} ms)'))
+
+        return 1 if seq_scans or execution_ms > slow_ms else 0
+
+    def walk(self, node):
+        yield node
+        for child in node.get('Plans', []):
+            yield from self.walk(child)
+
+    def table_rows(self, relation):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', [relation])
+            row = cursor.fetchone()
+        return row[0] if row else 0
+
+    def seed(self, jumlah_siswa, jumlah_pertemuan):
+        eskul_list = list(Eskul.objects.all())
+        start = date.today() - timedelta(days=jumlah_pertemuan * 7)
+
+        for index, eskul in enumerate(eskul_list):
+            if not eskul.pelatih_id:
+                eskul.pelatih = User.objects.create(
+                    username=f'advisor_pelatih_{eskul.pk}', nama_lengkap=f'Pelatih {eskul.nama_eskul}', role='pelatih'
+                )
+                eskul.save(update_fields=['pelatih'])
+
+            siswa_list = Siswa.objects.bulk_create([
+                Siswa(nama_siswa=f'ADVISOR {eskul.pk}-{i}', kelas=f'{i % 6 + 1}{"ABCDE"[i % 5]}', eskul=eskul)
+                for i in range(jumlah_siswa)
+            ])
+            pertemuan_list = Pertemuan.objects.bulk_create([
+                Pertemuan(eskul=eskul, tanggal=start + timedelta(days=7 * i), materi_kegiatan='Latihan', pelatih_id=eskul.pelatih_id)
+                for i in range(jumlah_pertemuan)
+            ])
+            Absensi.objects.bulk_create([
+                Absensi(
+                    pertemuan=pertemuan,
+                    siswa=siswa,
+                    tanggal=pertemuan.tanggal,
+                    status=STATUS_CYCLE[(i + j + index) % len(STATUS_CYCLE)]
+                )
+                for i, pertemuan in enumerate(pertemuan_list)
+                for j, siswa in enumerate(siswa_list)
+            ], batch_size=5000)
+
+        self.stdout.write(
+            f'Data contoh: {len(eskul_list) * jumlah_siswa} siswa, '
+            f'{len(eskul_list) * jumlah_pertemuan} pertemuan.'
+        )
@@ -0,0 +1,124 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from eskul.loadtest import MAX_ROUNDS, run_load_test, seed_load_test_data
+
+SERVER_COMMANDS = {
+    'gunicorn': lambda bind: [sys.executable, '-m', 'gunicorn', '--bind', bind],
+    'asgi': lambda bind: [sys.executable, 'asgi_server.py', '--bind', bind],
+    'runserver': lambda bind: [sys.executable, 'manage.py', 'runserver', '--noreload', bind],
+}
+SERVER_START_TIMEOUT = 60
+
+class Command(BaseCommand):
+    help = (
+        'Uji beban jam absensi: N pelatih login, membuka form pertemuan, menyimpan absensi dengan foto '
+        'dan membuka riwayat secara bersamaan, sementara admin membuka laporan. Menampilkan throughput, '
+        'latensi p50/p95/p99 dan persentase error per endpoint. Jangan jalankan di database produksi.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--coaches', type=int, default=20, help='Jumlah pelatih bersamaan (default 20)')
+        parser.add_argument('--admins', type=int, default=2, help='Jumlah admin yang membuka laporan (default 2)')
+        parser.add_argument(
+            '--rounds', type=int, default=1,
+            help=f'Pertemuan yang disimpan tiap pelatih, satu per hari mundur dari hari ini (default 1, maks {MAX_ROUNDS})'
+        )
+        parser.add_argument('--students', type=int, default=30, help='Siswa per eskul uji (default 30)')
+        parser.add_argument('--history', type=int, default=20, help='Pertemuan lama per eskul uji (default 20)')
+        parser.add_argument('--photo-kb', type=int, default=300, help='Ukuran foto kegiatan dalam KB (default 300)')
+        parser.add_argument('--ramp', type=float, default=0, help='Detik untuk memulai semua pelatih (default 0)')
+        parser.add_argument('--think', type=float, default=0, help='Jeda antar langkah tiap pengguna dalam detik')
+        parser.add_argument('--password', default='uji-beban-eskul', help='Password akun uji')
+        parser.add_argument('--no-seed', action='store_true', help='Pakai data uji yang sudah ada')
+        target = parser.add_mutually_exclusive_group()
+        target.add_argument('--url', default='http://127.0.0.1:8000/', help='Server yang sudah berjalan')
+        target.add_argument(
+            '--server', choices=sorted(SERVER_COMMANDS),
+            help='Jalankan server lokal sendiri untuk pengujian (di --bind)'
+        )
+        parser.add_argument('--bind', default='127.0.0.1:8765', help='Alamat server lokal (default 127.0.0.1:8765)')
+        parser.add_argument('--json', dest='json_path', help='Simpan hasil ke file JSON ini')
+
+    def handle(self, *args, **options):
+        if not 1 <= options['rounds'] <= MAX_ROUNDS:
+            raise CommandError(f'--rounds harus antara 1 dan {MAX_ROUNDS}.')
+        if options['coaches'] < 1 or options['admins'] < 0:
+            raise CommandError('--coaches minimal 1 dan --admins tidak boleh negatif.')
+
+        if not options['no_seed']:
+            self.stdout.write('Menyiapkan data uji...')
+            seed_load_test_data(
+                options['coaches'], options['admins'], options['students'], options['history'], options['password']
+            )
+
+        server = None
+        base_url = options['url']
+        if options['server']:
+            server = self.start_server(options['server'], options['bind'])
+            base_url = f'http://{options["bind"]}/'
+        try:
+            self.stdout.write(
+                f'Menjalankan {options["coaches"]} pelatih dan {options["admins"]} admin terhadap {base_url}...'
+            )
+            results, elapsed = run_load_test(
+                base_url, options['coaches'], options['admins'], options['password'],
+                rounds=options['rounds'], photo_kb=options['photo_kb'], ramp=options['ramp'], think=options['think']
+            )
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+
+        rows = results.summary(elapsed)
+        self.report(rows, results.error_samples, elapsed)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({'elapsed': elapsed, 'endpoints': rows, 'error_samples': results.error_samples}, f, indent=2)
+            self.stdout.write(f'Hasil disimpan ke {options["json_path"]}')
+
+    def start_server(self, kind, bind):
+        host, _, port = bind.rpartition(':')
+        self.stdout.write(f'Menjalankan server {kind} di {bind}...')
+        server = subprocess.Popen(
+            SERVER_COMMANDS[kind](bind), cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'eskul_project.settings')}
+        )
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'Server {kind} berhenti saat start (status {server.returncode}).')
+            try:
+                socket.create_connection((host, int(port)), timeout=1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f'Server {kind} tidak siap dalam {SERVER_START_TIMEOUT} detik.')
+
+    def report(self, rows, error_samples, elapsed):
+        self.stdout.write('')
+        self.stdout.write(
+            f'{"Endpoint":<32} {"Request":>8} {"Error":>7} {"req/s":>7} '
+            f'{"p50":>9} {"p95":>9} {"p99":>9} {"maks":>9}'
+        )
+        for row in rows:
+            self.stdout.write(
+                f'{row["endpoint"]:<32} {row["requests"]:>8} {row["error_rate"]:>6.1%} {row["per_second"]:>7.2f} '
+                f'{row["p50"]:>7.1f}ms {row["p95"]:>7.1f}ms {row["p99"]:>7.1f}ms {row["max"]:>7.1f}ms'
+            )
+
+        total = sum(row['requests'] for row in rows)
+        errors = sum(row['errors'] for row in rows)
+        self.stdout.write('')
+        for endpoint, sample in error_samples.items():
+            self.stdout.write(self.style.WARNING(f'Contoh error {endpoint}: {sample}'))
+        summary = f'{total} request dalam {elapsed:.1f} detik ({total / elapsed:.1f} req/s), {errors} error.'
+        self.stdout.write(self.style.WARNING(summary) if errors else self.style.SUCCESS(summary))
@@ -0,0 +1,59 @@
+import json
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter: what a web worker does before its first request
+BOOT_SCRIPT = '''
+import json, os, resource, sys, time
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', {settings_module!r})
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+for module in {extra_modules!r}:
+    __import__(module)
+print(json.dumps({{
+    'ms': (time.perf_counter() - started) * 1000,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'pandas': 'pandas' in sys.modules,
+    'numpy': 'numpy' in sys.modules,
+}}))
+'''
+
+class Command(BaseCommand):
+    help = (
+        'Mengukur waktu start dan memori worker (setup Django + memuat semua URL), '
+        'dibandingkan dengan worker yang juga memuat pandas saat start'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Jumlah pengukuran per varian (default 5)')
+
+    def handle(self, *args, **options):
+        variants = [
+            ('Worker (pandas lazy)', []),
+            ('Worker + import pandas', ['pandas']),
+        ]
+        self.stdout.write(f'{"Varian":<26} {"Start p50":>10} {"RSS maks":>10}  pandas/numpy dimuat')
+        for label, extra_modules in variants:
+            results = [self.boot(extra_modules) for _ in range(options['runs'])]
+            loaded = 'ya' if results[0]['pandas'] else ('numpy saja' if results[0]['numpy'] else 'tidak')
+            self.stdout.write(
+                f'{label:<26} {statistics.median(r["ms"] for r in results):>8.0f}ms '
+                f'{max(r["rss_mb"] for r in results):>7.1f} MB  {loaded}'
+            )
+        self.stdout.write(self.style.SUCCESS(f'Selesai, {options["runs"]} pengukuran per varian.'))
+
+    def boot(self, extra_modules):
+        script = BOOT_SCRIPT.format(settings_module=settings.SETTINGS_MODULE, extra_modules=extra_modules)
+        result = subprocess.run(
+            [sys.executable, '-c', script], capture_output=True, text=True, cwd=settings.BASE_DIR
+        )
+        if result.returncode != 0:
+            raise CommandError(f'Worker gagal start:\n{result.stderr}')
+        return json.loads(result.stdout.strip().splitlines()[-1])
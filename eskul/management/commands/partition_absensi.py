@@ -0,0 +1,42 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from eskul.partitioning import is_partitioned, partition_absensi, partition_interval, unpartition_absensi
+
+class Command(BaseCommand):
+    help = (
+        'Mengubah tabel absensi menjadi tabel berpartisi per ABSENSI_PARTITION_INTERVAL, '
+        'atau kembali menjadi tabel biasa dengan --undo. Untuk database yang sudah dimigrasi '
+        'sebelum pengaturan itu diaktifkan atau dihapus.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--undo', action='store_true', help='Kembalikan menjadi tabel biasa')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partisi absensi membutuhkan database PostgreSQL.')
+        interval = partition_interval()
+        if not options['undo'] and not interval:
+            raise CommandError('ABSENSI_PARTITION_INTERVAL belum diatur.')
+
+        with connection.cursor() as cursor:
+            partitioned = is_partitioned(cursor)
+        if partitioned != options['undo']:
+            state = 'sudah' if partitioned else 'belum'
+            self.stdout.write(f'Tabel absensi {state} dipartisi, tidak ada yang diubah.')
+            return
+
+        model = apps.get_model('eskul', 'Absensi')
+        # The whole rebuild is one transaction; the table is locked until it commits
+        with connection.schema_editor() as schema_editor:
+            if options['undo']:
+                unpartition_absensi(schema_editor, model)
+            else:
+                partition_absensi(schema_editor, model, interval)
+
+        done = 'dikembalikan menjadi tabel biasa' if options['undo'] else f'dipartisi per {interval}'
+        self.stdout.write(self.style.SUCCESS(
+            f'Tabel absensi {done}. Mulai ulang proses web agar koneksi yang terbuka membaca susunan tabel baru.'
+        ))
@@ -0,0 +1,28 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from eskul.snapshot import export_snapshot
+
+class Command(BaseCommand):
+    help = 'Mengekspor seluruh data (user, eskul, siswa, pertemuan, absensi, foto) ke arsip snapshot lewat COPY'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Lokasi file arsip, misalnya snapshot.tar.gz')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Snapshot membutuhkan database PostgreSQL.')
+
+        started = time.perf_counter()
+        manifest = export_snapshot(options['path'])
+        elapsed = time.perf_counter() - started
+
+        for table in manifest['tables']:
+            self.stdout.write(f'{table["table"]}: {table["rows"]} baris')
+        size_mb = os.path.getsize(options['path']) / (1024 * 1024)
+        self.stdout.write(self.style.SUCCESS(
+            f'Snapshot disimpan ke {options["path"]} ({size_mb:.1f} MB) dalam {elapsed:.1f} detik.'
+        ))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from eskul.snapshot import SnapshotError, import_snapshot
+
+class Command(BaseCommand):
+    help = 'Memulihkan seluruh data dari arsip snapshot lewat COPY (data yang ada akan diganti)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Lokasi file arsip hasil snapshot_export')
+        parser.add_argument(
+            '--noinput', '--no-input', action='store_false', dest='interactive',
+            help='Jangan minta konfirmasi sebelum mengganti data'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Snapshot membutuhkan database PostgreSQL.')
+
+        if options['interactive']:
+            confirm = input(
+                f'Semua data di database "{connection.settings_dict["NAME"]}" akan diganti. '
+                'Ketik "ya" untuk melanjutkan: '
+            )
+            if confirm != 'ya':
+                raise CommandError('Import dibatalkan.')
+
+        started = time.perf_counter()
+        try:
+            manifest = import_snapshot(options['path'])
+        except SnapshotError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        for table in manifest['tables']:
+            self.stdout.write(f'{table["table"]}: {table["rows"]} baris')
+        self.stdout.write(self.style.SUCCESS(
+            f'Snapshot dari {manifest["created_at"]} dipulihkan dalam {elapsed:.1f} detik.'
+        ))
@@ -0,0 +1,126 @@
+"""
+Students x meetings attendance grid for one eskul.
+
+All attendance rows are fetched with a single ``values_list`` into a NumPy
+array; totals, alpha streaks and trends are computed on the whole grid at
+once instead of per student or per cell.
+"""
+from itertools import chain
+
+import numpy as np
+from django.db.models import Q
+
+from .models import Siswa, Pertemuan, Absensi
+
+# 0 marks a meeting without an attendance record for the student
+KOSONG = 0
+STATUS_LIST = list(Absensi.Status)
+KODE_SINGKAT = np.array([''] + [status.label[0] for status in STATUS_LIST])
+
+def index_of(sorted_ids, sorter, ids):
+    """Positions of ``ids`` in the unsorted id array described by ``sorter``."""
+    return sorter[np.searchsorted(sorted_ids, ids, sorter=sorter)]
+
+def longest_streak(mask):
+    """Longest run of True values along each row of a 2D boolean array."""
+    if mask.shape[1] == 0:
+        return np.zeros(mask.shape[0], dtype=np.int64)
+    running = np.cumsum(mask, axis=1)
+    # Running total at the last False cell, carried forward along the row
+    at_reset = np.maximum.accumulate(np.where(mask, 0, running), axis=1)
+    return (running - at_reset).max(axis=1)
+
+def attendance_trend(hadir, recorded):
+    """
+    Least-squares slope of attendance (1 = hadir) over the meeting index for
+    each row, counting only recorded meetings. Returned in percentage points
+    per meeting; rows with fewer than two recorded meetings get 0.
+    """
+    x = np.arange(hadir.shape[1], dtype=np.float64)
+    weight = recorded.astype(np.float64)
+    count = weight.sum(axis=1)
+    safe_count = np.where(count > 0, count, 1)
+
+    x_mean = (weight * x).sum(axis=1) / safe_count
+    y_mean = (weight * hadir).sum(axis=1) / safe_count
+    dx = (x - x_mean[:, None]) * weight
+    numerator = (dx * (hadir - y_mean[:, None])).sum(axis=1)
+    denominator = (dx * (x - x_mean[:, None])).sum(axis=1)
+
+    slope = np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+    return slope * 100
+
+def build_attendance_matrix(eskul):
+    """Build the attendance grid and its statistics for ``eskul``."""
+    absensi = Absensi.objects.filter(pertemuan__eskul=eskul)
+    # Active roster plus students who have since left but still have records here
+    siswa_list = list(
+        Siswa.objects.filter(Q(eskul=eskul, is_active=True) | Q(id__in=absensi.values('siswa_id')))
+        .order_by('nama_siswa')
+        .values_list('id', 'nama_siswa', 'kelas')
+    )
+    pertemuan_list = list(
+        Pertemuan.objects.filter(eskul=eskul).order_by('tanggal').values_list('id', 'tanggal')
+    )
+
+    rows = np.fromiter(
+        chain.from_iterable(absensi.values_list('siswa_id', 'pertemuan_id', 'status')),
+        dtype=np.int64
+    ).reshape(-1, 3)
+
+    siswa_ids = np.array([siswa[0] for siswa in siswa_list], dtype=np.int64)
+    pertemuan_ids = np.array([pertemuan[0] for pertemuan in pertemuan_list], dtype=np.int64)
+    grid = np.full((len(siswa_ids), len(pertemuan_ids)), KOSONG, dtype=np.int8)
+
+    if len(rows):
+        siswa_sorter = np.argsort(siswa_ids)
+        pertemuan_sorter = np.argsort(pertemuan_ids)
+        grid[
+            index_of(siswa_ids, siswa_sorter, rows[:, 0]),
+            index_of(pertemuan_ids, pertemuan_sorter, rows[:, 1])
+        ] = rows[:, 2]
+
+    # Counts per status: axis 0 = status, then students or meetings
+    per_status = grid[None, :, :] == np.array(STATUS_LIST, dtype=np.int8)[:, None, None]
+    siswa_totals = per_status.sum(axis=2).T
+    pertemuan_totals = per_status.sum(axis=1).T
+
+    recorded = grid != KOSONG
+    hadir = grid == Absensi.Status.HADIR
+    siswa_recorded = recorded.sum(axis=1)
+    pertemuan_recorded = recorded.sum(axis=0)
+
+    return {
+        'siswa': siswa_list,
+        'pertemuan': pertemuan_list,
+        'grid': grid,
+        'siswa_totals': siswa_totals,
+        'pertemuan_totals': pertemuan_totals,
+        'siswa_persentase': np.round(
+            np.divide(hadir.sum(axis=1) * 100, siswa_recorded,
+                      out=np.zeros(len(siswa_list)), where=siswa_recorded > 0), 2),
+        'pertemuan_persentase': np.round(
+            np.divide(hadir.sum(axis=0) * 100, pertemuan_recorded,
+                      out=np.zeros(len(pertemuan_list)), where=pertemuan_recorded > 0), 2),
+        'alpha_beruntun': longest_streak(grid == Absensi.Status.ALPHA),
+        'tren': np.round(attendance_trend(hadir.astype(np.float64), recorded), 2),
+    }
+
+def matrix_rows(matrix):
+    """Plain Python rows for templates and spreadsheets."""
+    kode = KODE_SINGKAT[matrix['grid']].tolist()
+    return [
+        {
+            'nama_siswa': nama,
+            'kelas': kelas,
+            'cells': cells,
+            'totals': dict(zip((status.kode for status in STATUS_LIST), totals)),
+            'persentase': persentase,
+            'alpha_beruntun': streak,
+            'tren': tren,
+        }
+        for (_, nama, kelas), cells, totals, persentase, streak, tren in zip(
+            matrix['siswa'], kode, matrix['siswa_totals'].tolist(), matrix['siswa_persentase'].tolist(),
+            matrix['alpha_beruntun'].tolist(), matrix['tren'].tolist()
+        )
+    ]
@@ -0,0 +1,116 @@
+"""
+Removal of uploaded files that no row refers to any more.
+
+Deleting a meeting, eskul or coach deletes its rows, but the photos stay
+in MEDIA_ROOT. MediaSweep walks the upload directory of every FileField
+and looks the file names up in the database a chunk at a time (mark). It
+then deletes each file no row names, or moves it to a quarantine
+directory (sweep). Neither the file list nor the referenced names are ever
+held whole, so memory is bounded by the chunk size however large the tree.
+
+Files younger than the minimum age are left alone, because an upload is
+written to disk before the transaction saving its row commits.
+"""
+import os
+import shutil
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models
+
+CHUNK_SIZE = 1000
+MIN_AGE_HOURS = 24
+
+def upload_directories():
+    """``{directory: [(model, field name)]}`` for the FileFields with a
+    fixed ``upload_to``, directories relative to MEDIA_ROOT."""
+    directories = defaultdict(list)
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, models.FileField) and isinstance(field.upload_to, str):
+                directory = field.upload_to.strip('/')
+                if directory:
+                    directories[directory].append((model, field.name))
+    return dict(directories)
+
+def walk_files(path):
+    """Files below ``path``; only the listings of one branch are open at a time."""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk_files(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+def referenced_names(names, fields):
+    found = set()
+    for model, field_name in fields:
+        found.update(
+            model._base_manager.filter(**{f'{field_name}__in': names}).values_list(field_name, flat=True)
+        )
+    return found
+
+@dataclass
+class Orphan:
+    name: str
+    path: str
+    size: int
+
+class MediaSweep:
+    """Iterating ``run()`` removes the orphaned files one chunk at a time and
+    yields each of them; the counters hold the totals so far."""
+
+    def __init__(self, min_age_hours=MIN_AGE_HOURS, chunk_size=CHUNK_SIZE, quarantine=None, dry_run=False):
+        self.media_root = Path(settings.MEDIA_ROOT)
+        self.cutoff = time.time() - min_age_hours * 60 * 60
+        self.chunk_size = chunk_size
+        self.quarantine = Path(quarantine) if quarantine else None
+        self.dry_run = dry_run
+        self.checked = 0
+        self.removed = 0
+        self.removed_bytes = 0
+
+    def candidates(self, directory):
+        for entry in walk_files(directory):
+            self.checked += 1
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime < self.cutoff:
+                name = Path(entry.path).relative_to(self.media_root).as_posix()
+                yield Orphan(name, entry.path, stat.st_size)
+
+    def run(self):
+        for directory, fields in upload_directories().items():
+            path = self.media_root / directory
+            if not path.is_dir():
+                continue
+            for chunk in chunked(self.candidates(path), self.chunk_size):
+                used = referenced_names([orphan.name for orphan in chunk], fields)
+                for orphan in chunk:
+                    if orphan.name not in used and self.remove(orphan):
+                        yield orphan
+
+    def remove(self, orphan):
+        if not self.dry_run:
+            try:
+                if self.quarantine is None:
+                    os.remove(orphan.path)
+                else:
+                    target = self.quarantine / orphan.name
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.move(orphan.path, target)
+            except FileNotFoundError:
+                # Removed by someone else meanwhile
+                return False
+        self.removed += 1
+        self.removed_bytes += orphan.size
+        return True
@@ -0,0 +1,167 @@
+"""
+Prometheus metrics, served at /metrics.
+
+Every request is timed per URL name, with the number and total time of its
+database queries; exports and imports record their duration and row count
+through JobTimer, multipart requests their upload size.
+
+gunicorn.conf.py and asgi_server.py point PROMETHEUS_MULTIPROC_DIR at an
+empty directory before loading the project. Each worker process then keeps
+its metrics in files there and /metrics adds up the files of all workers.
+Without that variable (runserver, tests) the metrics live in the process.
+"""
+import hmac
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.decorators import sync_and_async_middleware
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 500)
+ROW_BUCKETS = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+UPLOAD_BUCKETS = tuple(size * 1024 * 1024 for size in (0.1, 0.5, 1, 2, 5, 10, 25, 50))
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+# Label of requests that matched no URL pattern
+UNRESOLVED = 'tidak_ditemukan'
+
+REQUEST_DURATION = Histogram(
+    'eskul_http_request_duration_seconds', 'Durasi request sampai header respons, per nama URL',
+    ['view', 'method'], buckets=LATENCY_BUCKETS
+)
+REQUESTS = Counter('eskul_http_requests', 'Jumlah request per nama URL dan status', ['view', 'method', 'status'])
+DB_QUERIES = Histogram(
+    'eskul_db_queries_per_request', 'Jumlah query database per request', ['view'], buckets=QUERY_BUCKETS
+)
+DB_DURATION = Histogram(
+    'eskul_db_duration_seconds_per_request', 'Total waktu query database per request',
+    ['view'], buckets=LATENCY_BUCKETS
+)
+JOB_DURATION = Histogram(
+    'eskul_job_duration_seconds', 'Durasi export dan import', ['kind', 'name'], buckets=LATENCY_BUCKETS
+)
+JOB_ROWS = Histogram('eskul_job_rows', 'Jumlah baris per export dan import', ['kind', 'name'], buckets=ROW_BUCKETS)
+UPLOAD_SIZE = Histogram('eskul_upload_bytes', 'Ukuran body request multipart', ['view'], buckets=UPLOAD_BUCKETS)
+
+class QueryStats:
+    """Queries of one request. Async views run queries in several threads at once."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, seconds, sql, params, context):
+        with self.lock:
+            self.count += 1
+            self.seconds += seconds
+
+# Objects whose ``add(seconds, sql, params, context)`` is called after each
+# query: QueryStats here, QueryLog of eskul.profiling. Copied into the
+# threads sync_to_async runs queries in.
+query_observers = ContextVar('query_observers', default=())
+
+def observe_queries(observer):
+    """Pass the queries of the current context to ``observer`` as well;
+    returns the token for ``query_observers.reset()``."""
+    return query_observers.set((*query_observers.get(), observer))
+
+def record_query(execute, sql, params, many, context):
+    observers = query_observers.get()
+    if not observers:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        for observer in observers:
+            observer.add(elapsed, sql, params, context)
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    # Sent on every reconnect of the same connection object as well
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+class JobTimer:
+    """Started when an export or import begins; ``finish(rows)`` records it,
+    or ``track(rows)`` once a streamed export has sent its last row."""
+
+    def __init__(self, kind, name):
+        self.labels = (kind, name)
+        self.started = time.perf_counter()
+
+    def finish(self, rows):
+        JOB_DURATION.labels(*self.labels).observe(time.perf_counter() - self.started)
+        JOB_ROWS.labels(*self.labels).observe(rows)
+
+    def track(self, rows):
+        count = 0
+        for row in rows:
+            count += 1
+            yield row
+        self.finish(count)
+
+def observe_request(request, response, started, stats):
+    match = request.resolver_match
+    view = match.view_name if match else UNRESOLVED
+    method = request.method if request.method in METHODS else 'lain'
+    REQUEST_DURATION.labels(view, method).observe(time.perf_counter() - started)
+    REQUESTS.labels(view, method, str(response.status_code)).inc()
+    DB_QUERIES.labels(view).observe(stats.count)
+    DB_DURATION.labels(view).observe(stats.seconds)
+    if request.content_type == 'multipart/form-data':
+        UPLOAD_SIZE.labels(view).observe(int(request.META.get('CONTENT_LENGTH') or 0))
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """Outermost middleware, so the other middleware is timed as well.
+    Streaming responses are timed until their headers."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            started, stats = time.perf_counter(), QueryStats()
+            token = observe_queries(stats)
+            try:
+                response = await get_response(request)
+            finally:
+                query_observers.reset(token)
+            observe_request(request, response, started, stats)
+            return response
+    else:
+        def middleware(request):
+            started, stats = time.perf_counter(), QueryStats()
+            token = observe_queries(stats)
+            try:
+                response = get_response(request)
+            finally:
+                query_observers.reset(token)
+            observe_request(request, response, started, stats)
+            return response
+    return middleware
+
+def scrape_allowed(request):
+    if settings.METRICS_TOKEN:
+        expected = f'Bearer {settings.METRICS_TOKEN}'
+        return hmac.compare_digest(request.headers.get('Authorization', ''), expected)
+    # Without a token only a scraper on this machine, not through the reverse proxy
+    return request.META.get('REMOTE_ADDR') in ('127.0.0.1', '::1') and 'X-Forwarded-For' not in request.headers
+
+def metrics_view(request):
+    if not scrape_allowed(request):
+        return HttpResponseForbidden('Akses ditolak')
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
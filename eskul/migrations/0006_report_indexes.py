@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eskul', '0005_create_default_eskul'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='absensi',
+            index=models.Index(fields=['siswa', 'keterangan'], include=('pertemuan',), name='absensi_siswa_ket_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='absensi',
+            index=models.Index(fields=['pertemuan', 'keterangan'], name='absensi_pertemuan_ket_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pertemuan',
+            index=models.Index(fields=['tanggal'], include=('eskul',), name='pertemuan_tanggal_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pertemuan',
+            index=models.Index(fields=['pelatih', '-tanggal'], name='pertemuan_pelatih_tgl_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='siswa',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['eskul', 'nama_siswa'], name='siswa_aktif_eskul_nama_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='siswa',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['kelas'], name='siswa_aktif_kelas_idx'),
+        ),
+    ]
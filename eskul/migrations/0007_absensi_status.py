@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eskul', '0006_report_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='absensi',
+            name='status',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Hadir'), (2, 'Sakit'), (3, 'Izin'), (4, 'Alpha')], default=4),
+        ),
+    ]
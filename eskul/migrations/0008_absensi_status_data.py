@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:39
+
+from django.db import migrations, transaction
+from django.db.models import Max, Min
+
+BATCH_SIZE = 20000
+
+STATUS_BY_KETERANGAN = {
+    'hadir': 1,
+    'sakit': 2,
+    'izin': 3,
+    'alpha': 4,
+}
+
+
+def pk_batches(Absensi):
+    bounds = Absensi.objects.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return
+    for start in range(bounds['low'], bounds['high'] + 1, BATCH_SIZE):
+        yield start, start + BATCH_SIZE - 1
+
+
+def keterangan_to_status(apps, schema_editor):
+    Absensi = apps.get_model('eskul', 'Absensi')
+
+    # Each batch commits on its own so the table is never locked as a whole
+    for start, end in pk_batches(Absensi):
+        with transaction.atomic():
+            batch = Absensi.objects.filter(pk__range=(start, end))
+            for keterangan, status in STATUS_BY_KETERANGAN.items():
+                batch.filter(keterangan=keterangan).update(status=status)
+
+
+def status_to_keterangan(apps, schema_editor):
+    Absensi = apps.get_model('eskul', 'Absensi')
+
+    for start, end in pk_batches(Absensi):
+        with transaction.atomic():
+            batch = Absensi.objects.filter(pk__range=(start, end))
+            for keterangan, status in STATUS_BY_KETERANGAN.items():
+                batch.filter(status=status).update(keterangan=keterangan, hadir=keterangan == 'hadir')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('eskul', '0007_absensi_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(keterangan_to_status, status_to_keterangan),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eskul', '0008_absensi_status_data'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='absensi',
+            name='absensi_siswa_ket_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='absensi',
+            name='absensi_pertemuan_ket_idx',
+        ),
+        migrations.RemoveField(
+            model_name='absensi',
+            name='hadir',
+        ),
+        migrations.RemoveField(
+            model_name='absensi',
+            name='keterangan',
+        ),
+        migrations.AddIndex(
+            model_name='absensi',
+            index=models.Index(fields=['siswa', 'status'], include=('pertemuan',), name='absensi_siswa_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='absensi',
+            index=models.Index(fields=['pertemuan', 'status'], name='absensi_pertemuan_status_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='absensi',
+            constraint=models.CheckConstraint(condition=models.Q(('status__in', [1, 2, 3, 4])), name='absensi_status_valid'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eskul', '0009_remove_absensi_keterangan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='absensi',
+            name='tanggal',
+            field=models.DateField(editable=False, null=True),
+        ),
+    ]
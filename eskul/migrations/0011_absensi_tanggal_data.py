@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:20
+
+from django.db import migrations, transaction
+from django.db.models import Max, Min, OuterRef, Subquery
+
+BATCH_SIZE = 20000
+
+
+def copy_pertemuan_tanggal(apps, schema_editor):
+    Absensi = apps.get_model('eskul', 'Absensi')
+    Pertemuan = apps.get_model('eskul', 'Pertemuan')
+
+    bounds = Absensi.objects.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return
+
+    tanggal = Subquery(Pertemuan.objects.filter(pk=OuterRef('pertemuan_id')).values('tanggal')[:1])
+
+    # Each batch commits on its own so the table is never locked as a whole
+    for start in range(bounds['low'], bounds['high'] + 1, BATCH_SIZE):
+        with transaction.atomic():
+            Absensi.objects.filter(
+                pk__range=(start, start + BATCH_SIZE - 1), tanggal__isnull=True
+            ).update(tanggal=tanggal)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('eskul', '0010_absensi_tanggal'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_pertemuan_tanggal, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eskul', '0011_absensi_tanggal_data'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='absensi',
+            name='tanggal',
+            field=models.DateField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='absensi',
+            index=models.Index(fields=['tanggal', 'siswa'], include=('status',), name='absensi_tanggal_siswa_idx'),
+        ),
+    ]
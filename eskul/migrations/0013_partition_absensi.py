@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from eskul.partitioning import partition_absensi, partition_interval, unpartition_absensi
+
+
+def partition(apps, schema_editor):
+    interval = partition_interval()
+    if interval and schema_editor.connection.vendor == 'postgresql':
+        partition_absensi(schema_editor, apps.get_model('eskul', 'Absensi'), interval)
+
+
+def unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        unpartition_absensi(schema_editor, apps.get_model('eskul', 'Absensi'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eskul', '0012_absensi_tanggal_not_null'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eskul', '0013_partition_absensi'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='absensi',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='eskul',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='siswa',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eskul', '0014_change_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportVersion',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('counter', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_pelatih(apps, schema_editor):
+    Eskul = apps.get_model('eskul', 'Eskul')
+
+    duplicates = (
+        Eskul.objects.filter(pelatih__isnull=False)
+        .values('pelatih_id', 'pelatih__username')
+        .annotate(jumlah=Count('pk'))
+        .filter(jumlah__gt=1)
+        .order_by('pelatih__username')
+    )
+    if not duplicates:
+        return
+
+    lines = []
+    for duplicate in duplicates:
+        names = Eskul.objects.filter(pelatih_id=duplicate['pelatih_id']).order_by('pk').values_list('nama_eskul', flat=True)
+        lines.append(f"- {duplicate['pelatih__username']}: {', '.join(names)}")
+    raise RuntimeError(
+        'Ada pelatih yang menangani lebih dari satu eskul. Lepaskan pelatih dari eskul '
+        'lain lalu jalankan migrate lagi:\n' + '\n'.join(lines)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eskul', '0015_report_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_pelatih, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='eskul',
+            constraint=models.UniqueConstraint(fields=('pelatih',), name='eskul_satu_eskul_per_pelatih', violation_error_message='Pelatih ini sudah menangani eskul lain. Satu pelatih hanya bisa menangani satu eskul.'),
+        ),
+        # The constraint's unique index now serves lookups by pelatih
+        migrations.AlterField(
+            model_name='eskul',
+            name='pelatih',
+            field=models.ForeignKey(blank=True, db_index=False, limit_choices_to={'role': 'pelatih'}, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eskul', '0016_eskul_unique_pelatih'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fotokegiatan',
+            index=models.Index(fields=['uploaded_at'], name='foto_uploaded_at_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eskul', '0017_foto_uploaded_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pertemuan',
+            name='client_id',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
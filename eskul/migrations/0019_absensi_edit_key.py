@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eskul', '0018_pertemuan_client_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AbsensiEditKey',
+            fields=[
+                ('key', models.UUIDField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('pertemuan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='eskul.pertemuan')),
+            ],
+        ),
+    ]
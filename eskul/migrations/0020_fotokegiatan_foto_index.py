@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eskul', '0019_absensi_edit_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='fotokegiatan',
+            name='foto',
+            field=models.ImageField(db_index=True, upload_to='kegiatan/'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eskul', '0020_fotokegiatan_foto_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='absensieditkey',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
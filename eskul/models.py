@@ -1,25 +1,34 @@
 from django.db import models
 from django.conf import settings
-from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 class Eskul(models.Model):
     nama_eskul = models.CharField(max_length=100)
     deskripsi = models.TextField()
-    pelatih = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, limit_choices_to={'role': 'pelatih'}, null=True, blank=True)
+    pelatih = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, limit_choices_to={'role': 'pelatih'}, null=True, blank=True, db_index=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # One coach handles at most one eskul; also serves pelatih lookups
+            models.UniqueConstraint(
+                fields=['pelatih'], name='eskul_satu_eskul_per_pelatih',
+                violation_error_message='Pelatih ini sudah menangani eskul lain. Satu pelatih hanya bisa menangani satu eskul.'
+            ),
+        ]
 
     def __str__(self):
         return self.nama_eskul
 
-    def clean(self):
-        # Validate that one pelatih can only have one eskul
-        if self.pelatih:
-            existing_eskul = Eskul.objects.filter(pelatih=self.pelatih).exclude(pk=self.pk)
-            if existing_eskul.exists():
-                raise ValidationError({
-                    'pelatih': f'{self.pelatih.nama_lengkap} sudah menjadi pelatih untuk eskul {existing_eskul.first().nama_eskul}. Satu pelatih hanya bisa menangani satu eskul.'
-                })
+    @staticmethod
+    def pelatih_taken_message(pelatih):
+        other = Eskul.objects.filter(pelatih=pelatih).first()
+        return (
+            f'{pelatih.nama_lengkap} sudah menjadi pelatih untuk eskul {other.nama_eskul if other else "lain"}. '
+            'Satu pelatih hanya bisa menangani satu eskul.'
+        )
 
 class Siswa(models.Model):
     nama_siswa = models.CharField(max_length=100)
@@ -27,9 +36,15 @@ class Siswa(models.Model):
     eskul = models.ForeignKey(Eskul, on_delete=models.CASCADE, related_name='siswa_list')
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         unique_together = ['nama_siswa', 'kelas']
+        indexes = [
+            # Active roster per eskul, already in display order
+            models.Index(fields=['eskul', 'nama_siswa'], condition=models.Q(is_active=True), name='siswa_aktif_eskul_nama_idx'),
+            models.Index(fields=['kelas'], condition=models.Q(is_active=True), name='siswa_aktif_kelas_idx'),
+        ]
         
     def __str__(self):
         return f"{self.nama_siswa} - {self.kelas}"
@@ -39,38 +54,115 @@ class Pertemuan(models.Model):
     tanggal = models.DateField()
     materi_kegiatan = models.TextField()
     pelatih = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Generated by the coach's browser for meetings recorded offline, so a
+    # sync that is sent again does not create the meeting twice
+    client_id = models.UUIDField(null=True, blank=True, unique=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-tanggal']
         unique_together = ['eskul', 'tanggal']
+        indexes = [
+            models.Index(fields=['tanggal'], include=['eskul'], name='pertemuan_tanggal_idx'),
+            models.Index(fields=['pelatih', '-tanggal'], name='pertemuan_pelatih_tgl_idx'),
+        ]
     
     def __str__(self):
         return f"{self.eskul.nama_eskul} - {self.tanggal}"
 
+    def save(self, *args, **kwargs):
+        is_new = self._state.adding
+        super().save(*args, **kwargs)
+        if not is_new:
+            # Keep the date copied onto attendance rows in step
+            self.absensi_list.exclude(tanggal=self.tanggal).update(tanggal=self.tanggal, updated_at=timezone.now())
+
 class FotoKegiatan(models.Model):
     pertemuan = models.ForeignKey(Pertemuan, on_delete=models.CASCADE, related_name='foto_list')
-    foto = models.ImageField(upload_to='kegiatan/')
+    # Indexed for the chunked name lookups of collect_orphan_media
+    foto = models.ImageField(upload_to='kegiatan/', db_index=True)
     caption = models.CharField(max_length=255, blank=True, null=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Admin date hierarchy and upload-date filter
+            models.Index(fields=['uploaded_at'], name='foto_uploaded_at_idx'),
+        ]
     
     def __str__(self):
         return f"Foto {self.pertemuan} - {self.uploaded_at.strftime('%H:%M')}"
 
 class Absensi(models.Model):
+    class Status(models.IntegerChoices):
+        HADIR = 1, 'Hadir'
+        SAKIT = 2, 'Sakit'
+        IZIN = 3, 'Izin'
+        ALPHA = 4, 'Alpha'
+
+        @property
+        def kode(self):
+            """Public lowercase code used in forms, templates and exports, e.g. 'hadir'."""
+            return self.name.lower()
+
+        @classmethod
+        def from_kode(cls, kode):
+            try:
+                return cls[kode.upper()]
+            except (KeyError, AttributeError):
+                raise ValueError(f'Keterangan tidak valid: {kode}')
+
     pertemuan = models.ForeignKey(Pertemuan, on_delete=models.CASCADE, related_name='absensi_list')
     siswa = models.ForeignKey(Siswa, on_delete=models.CASCADE)
-    hadir = models.BooleanField(default=False)
-    keterangan = models.CharField(max_length=20, choices=[
-        ('hadir', 'Hadir'),
-        ('sakit', 'Sakit'),
-        ('izin', 'Izin'),
-        ('alpha', 'Alpha'),
-    ], default='alpha')
+    status = models.PositiveSmallIntegerField(choices=Status.choices, default=Status.ALPHA)
+    # Copy of pertemuan.tanggal, the partition key when the table is partitioned
+    tanggal = models.DateField(editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         unique_together = ['pertemuan', 'siswa']
+        indexes = [
+            # Covering indexes for per-student and per-meeting status counts
+            models.Index(fields=['siswa', 'status'], include=['pertemuan'], name='absensi_siswa_status_idx'),
+            models.Index(fields=['pertemuan', 'status'], name='absensi_pertemuan_status_idx'),
+            models.Index(fields=['tanggal', 'siswa'], include=['status'], name='absensi_tanggal_siswa_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(status__in=[1, 2, 3, 4]), name='absensi_status_valid'),
+        ]
+    
+    @property
+    def keterangan(self):
+        return self.Status(self.status).kode
+    
+    @property
+    def hadir(self):
+        return self.status == self.Status.HADIR
     
+    def save(self, *args, **kwargs):
+        if self.tanggal is None:
+            self.tanggal = self.pertemuan.tanggal
+        super().save(*args, **kwargs)
+    
+    def __str__(self):
+        return f"{self.siswa.nama_siswa} - {self.tanggal} - {self.keterangan}"
+
+class AbsensiEditKey(models.Model):
+    """Idempotency key of an attendance submission for a meeting, so a form
+    sent twice (a double tap, a retried request) is applied once. Kept for
+    EDIT_KEY_DAYS (eskul/pertemuan_sync.py), then pruned by later writes."""
+    key = models.UUIDField(primary_key=True)
+    pertemuan = models.ForeignKey(Pertemuan, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.key} - {self.pertemuan_id}"
+
+class ReportVersion(models.Model):
+    """Change counter per report scope (see eskul/report_cache.py)."""
+    name = models.CharField(max_length=50, primary_key=True)
+    counter = models.BigIntegerField(default=0)
+
     def __str__(self):
-        return f"{self.siswa.nama_siswa} - {self.pertemuan.tanggal} - {self.keterangan}"
+        return f"{self.name} #{self.counter}"
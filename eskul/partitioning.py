@@ -0,0 +1,248 @@
+"""
+Optional PostgreSQL range partitioning of the Absensi table by date.
+
+Enabled with ``ABSENSI_PARTITION_INTERVAL`` in settings: ``'tahun_ajaran'``
+(academic year, 1 July - 30 June) or ``'semester'`` (July - December and
+January - June). Migration 0013 converts the table when the setting is on
+at migrate time; a database migrated without it is converted later with
+``partition_absensi`` (and back with ``partition_absensi --undo``).
+``create_absensi_partitions`` adds upcoming partitions ahead of time.
+Rows outside every partition land in a default partition and are moved
+out when their partition is created.
+
+The partitioned table keeps its own primary key (id, tanggal) and unique
+constraint (pertemuan_id, siswa_id, tanggal), which Django's migration state
+does not know. Schema changes to Absensi must therefore be made on the
+plain table: ``partition_absensi --undo``, migrate, ``partition_absensi``.
+migrate refuses them while the table is partitioned (refuse_absensi_changes).
+
+Pertemuan is not partitioned: Absensi and FotoKegiatan reference it by id,
+and PostgreSQL only allows foreign keys into a partitioned table when the
+partition key is part of the referenced key.
+"""
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import connections
+
+TABLE = 'eskul_absensi'
+DEFAULT_PARTITION = f'{TABLE}_default'
+SEQUENCE = f'{TABLE}_partitioned_id_seq'
+INTERVALS = ('tahun_ajaran', 'semester')
+
+def partition_interval():
+    interval = getattr(settings, 'ABSENSI_PARTITION_INTERVAL', None)
+    if interval not in (None, *INTERVALS):
+        raise ValueError(f'ABSENSI_PARTITION_INTERVAL harus salah satu dari {INTERVALS} atau None.')
+    return interval
+
+def period_start(tanggal, interval):
+    """First day of the academic year or semester that contains ``tanggal``."""
+    if interval == 'semester':
+        return date(tanggal.year, 7 if tanggal.month >= 7 else 1, 1)
+    return date(tanggal.year if tanggal.month >= 7 else tanggal.year - 1, 7, 1)
+
+def next_period_start(start, interval):
+    month = start.month - 1 + (6 if interval == 'semester' else 12)
+    return date(start.year + month // 12, month % 12 + 1, 1)
+
+def periods(first, last, interval):
+    """(start, end) bounds of every period from ``first`` up to and including ``last``."""
+    start = period_start(first, interval)
+    while start <= last:
+        end = next_period_start(start, interval)
+        yield start, end
+        start = end
+
+def partition_name(start, interval):
+    academic_year = start.year if start.month >= 7 else start.year - 1
+    name = f'{TABLE}_{academic_year}_{academic_year + 1}'
+    if interval == 'semester':
+        name += '_s1' if start.month >= 7 else '_s2'
+    return name
+
+def is_partitioned(cursor):
+    cursor.execute(
+        'SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid '
+        'WHERE c.relname = %s AND pg_table_is_visible(c.oid)',
+        [TABLE]
+    )
+    return cursor.fetchone() is not None
+
+def absensi_partitioned(connection):
+    """``is_partitioned`` for ``connection``, asked once per database session
+    rather than trusting the setting, which may disagree with the table."""
+    connection.ensure_connection()
+    known = getattr(connection, 'absensi_partitioned', None)
+    if known is None or known[0] is not connection.connection:
+        with connection.cursor() as cursor:
+            known = connection.absensi_partitioned = (connection.connection, is_partitioned(cursor))
+    return known[1]
+
+def forget_layout(connection):
+    connection.absensi_partitioned = None
+
+def existing_partitions(cursor):
+    cursor.execute(
+        'SELECT child.relname FROM pg_inherits i '
+        'JOIN pg_class parent ON parent.oid = i.inhparent '
+        'JOIN pg_class child ON child.oid = i.inhrelid '
+        'WHERE parent.relname = %s AND pg_table_is_visible(parent.oid)',
+        [TABLE]
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+def create_partition(cursor, start, end, interval):
+    """
+    Create and attach the partition for [start, end) unless it exists.
+    Matching rows already in the default partition are moved into it first,
+    otherwise attaching would fail. Returns the partition name, or None.
+    """
+    name = partition_name(start, interval)
+    if name in existing_partitions(cursor):
+        return None
+
+    cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    cursor.execute(
+        # LIKE keeps the column order, so whole rows can be moved as they are
+        f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE tanggal >= %s AND tanggal < %s RETURNING *) '
+        f'INSERT INTO {name} SELECT * FROM moved',
+        [start, end]
+    )
+    cursor.execute(f'ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)', [start, end])
+    return name
+
+def ensure_partitions(cursor, first, last, interval):
+    """Create every missing partition between ``first`` and ``last``."""
+    return [
+        name for name in (create_partition(cursor, start, end, interval) for start, end in periods(first, last, interval))
+        if name
+    ]
+
+def model_columns(model):
+    return ', '.join(field.column for field in model._meta.concrete_fields)
+
+def reset_sequence(cursor):
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM {TABLE}"
+    )
+
+def column_definitions(schema_editor, model):
+    """Columns of ``model``, with the id drawn from SEQUENCE: partitioned
+    tables cannot have identity columns before PostgreSQL 17."""
+    quote = schema_editor.quote_name
+    definitions = []
+    for field in model._meta.local_concrete_fields:
+        if field.primary_key:
+            definitions.append(f"{quote(field.column)} bigint NOT NULL DEFAULT nextval('{SEQUENCE}')")
+            continue
+        definition, _ = schema_editor.column_sql(model, field)
+        check = field.db_parameters(connection=schema_editor.connection)['check']
+        if check:
+            definition += f' CHECK ({check})'
+        if field.remote_field:
+            target = field.target_field
+            definition += (
+                f' REFERENCES {quote(target.model._meta.db_table)} ({quote(target.column)})'
+                ' DEFERRABLE INITIALLY DEFERRED'
+            )
+        definitions.append(f'{quote(field.column)} {definition}')
+    return definitions
+
+def partition_absensi(schema_editor, model, interval):
+    """Rebuild ``eskul_absensi`` as a table partitioned by ``tanggal``."""
+    with schema_editor.connection.cursor() as cursor:
+        if is_partitioned(cursor):
+            return
+
+        cursor.execute(f'SELECT MIN(tanggal), MAX(tanggal) FROM {TABLE}')
+        first, last = cursor.fetchone()
+        today = date.today()
+        first = min(first or today, today)
+        # One period past the latest date so the next term is ready
+        last = next_period_start(period_start(max(last or today, today), interval), interval)
+
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {TABLE}_old')
+        cursor.execute(f'CREATE SEQUENCE {SEQUENCE}')
+        # The partition key has to be part of every unique constraint; tanggal
+        # follows from pertemuan_id, so (pertemuan, siswa, tanggal) is as strict
+        # as the original (pertemuan, siswa).
+        columns = ',\n'.join(column_definitions(schema_editor, model))
+        cursor.execute(f'''
+            CREATE TABLE {TABLE} (
+                {columns},
+                CONSTRAINT {TABLE}_partitioned_pkey PRIMARY KEY (id, tanggal),
+                CONSTRAINT {TABLE}_partitioned_uniq UNIQUE (pertemuan_id, siswa_id, tanggal)
+            ) PARTITION BY RANGE (tanggal)
+        ''')
+        cursor.execute(f'ALTER SEQUENCE {SEQUENCE} OWNED BY {TABLE}.id')
+        cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT')
+        for start, end in periods(first, last, interval):
+            cursor.execute(
+                f'CREATE TABLE {partition_name(start, interval)} PARTITION OF {TABLE} FOR VALUES FROM (%s) TO (%s)',
+                [start, end]
+            )
+
+        columns = model_columns(model)
+        cursor.execute(f'INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM {TABLE}_old')
+        # Run the deferred foreign key checks now; indexes cannot be built
+        # while they are pending
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        reset_sequence(cursor)
+        cursor.execute(f'DROP TABLE {TABLE}_old')
+    forget_layout(schema_editor.connection)
+
+    # Same index and constraint names as the unpartitioned table
+    for index in model._meta.indexes:
+        schema_editor.add_index(model, index)
+    for constraint in model._meta.constraints:
+        schema_editor.add_constraint(model, constraint)
+
+def unpartition_absensi(schema_editor, model):
+    """Turn a partitioned ``eskul_absensi`` back into a plain table."""
+    with schema_editor.connection.cursor() as cursor:
+        if not is_partitioned(cursor):
+            return
+
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {TABLE}_partitioned')
+        for index in model._meta.indexes:
+            cursor.execute(f'DROP INDEX IF EXISTS {index.name}')
+
+    schema_editor.create_model(model)
+
+    with schema_editor.connection.cursor() as cursor:
+        columns = model_columns(model)
+        cursor.execute(f'INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM {TABLE}_partitioned')
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        reset_sequence(cursor)
+        cursor.execute(f'DROP TABLE {TABLE}_partitioned')
+    forget_layout(schema_editor.connection)
+
+def absensi_operations(plan):
+    for migration, _ in plan:
+        if migration.app_label != 'eskul':
+            continue
+        for operation in migration.operations:
+            # Field and index operations name the model in model_name, model operations in name
+            model_name = getattr(operation, 'model_name_lower', None) or getattr(operation, 'name_lower', None)
+            if model_name == 'absensi':
+                yield migration, operation
+
+def refuse_absensi_changes(plan=None, using=None, **kwargs):
+    """pre_migrate receiver: stop before a migration alters the partitioned
+    table, whose constraints the migration would look for and not find."""
+    connection = connections[using]
+    if not plan or connection.vendor != 'postgresql':
+        return
+    changes = list(absensi_operations(plan))
+    if not changes:
+        return
+    with connection.cursor() as cursor:
+        if not is_partitioned(cursor):
+            return
+    migration, operation = changes[0]
+    raise CommandError(
+        f'Migrasi {migration.name} mengubah tabel absensi ({operation.describe()}), tetapi tabel itu '
+        'sedang dipartisi. Jalankan partition_absensi --undo, migrate, lalu partition_absensi lagi.'
+    )
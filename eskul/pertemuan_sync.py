@@ -0,0 +1,271 @@
+"""
+Creating meetings, from the form and from the offline queue, and
+correcting their attendance.
+
+On the create page the coach's browser queues each meeting in IndexedDB
+with a UUID it generates (static/js/pertemuan-queue.js) and sends the
+queue in batches whenever it is online. The UUID is stored on the
+Pertemuan, so a batch sent again, because the response was lost or a tab
+and the service worker synced at once, reports those meetings as already
+saved instead of creating them twice.
+
+Corrections go through ``upsert_absensi``: one statement that inserts or
+updates attendance on (pertemuan, siswa), writes only rows whose status
+changed and records the submission's idempotency key, so a form sent twice
+is applied once. Only keys a client sent are stored; keys older than
+EDIT_KEY_DAYS are deleted whenever a new one is written.
+"""
+import json
+import uuid
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .live import notify_absensi_created, notify_dashboard
+from .models import Absensi, AbsensiEditKey, FotoKegiatan, Pertemuan
+from .partitioning import absensi_partitioned
+from .report_cache import bump_eskul
+
+MAX_BATCH = 20
+# A retry arrives within minutes; older keys only take up space
+EDIT_KEY_DAYS = 7
+
+# Result status of each meeting in a batch
+TERSIMPAN = 'tersimpan'
+SUDAH_TERSIMPAN = 'sudah_tersimpan'
+DITOLAK = 'ditolak'
+
+class BatchError(ValueError):
+    """The request is not a valid batch; the message is user-facing."""
+
+def parse_key(value):
+    """The submission's idempotency key, or None when it is missing or invalid."""
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+def key_cutoff():
+    return timezone.now() - timedelta(days=EDIT_KEY_DAYS)
+
+def key_used(key, pertemuan):
+    return key is not None and AbsensiEditKey.objects.filter(key=key, pertemuan=pertemuan).exists()
+
+def create_pertemuan(eskul, pelatih, tanggal, materi, statuses, siswa_list, foto=None, client_id=None, key=None):
+    """
+    Create a meeting with its photo and one attendance row per student in
+    ``siswa_list``. ``statuses`` maps siswa ids (as strings) to a status;
+    students without one are absent (alpha).
+    """
+    pertemuan = Pertemuan.objects.create(
+        eskul=eskul, tanggal=tanggal, materi_kegiatan=materi, pelatih=pelatih, client_id=client_id
+    )
+    if key is not None:
+        AbsensiEditKey.objects.filter(created_at__lt=key_cutoff()).delete()
+        AbsensiEditKey.objects.create(key=key, pertemuan=pertemuan)
+    if foto:
+        FotoKegiatan.objects.create(pertemuan=pertemuan, foto=foto)
+
+    absensi_list = [
+        Absensi(
+            pertemuan=pertemuan,
+            siswa=siswa,
+            tanggal=pertemuan.tanggal,
+            status=statuses.get(str(siswa.pk), Absensi.Status.ALPHA)
+        )
+        for siswa in siswa_list
+    ]
+    Absensi.objects.bulk_create(absensi_list)
+    notify_absensi_created(absensi_list)
+    return pertemuan, absensi_list
+
+@dataclass
+class UpsertResult:
+    duplikat: bool = False
+    ditambah: int = 0
+    diubah: int = 0
+
+def upsert_statement(with_key):
+    quote = connection.ops.quote_name
+    absensi = quote(Absensi._meta.db_table)
+    keys = quote(AbsensiEditKey._meta.db_table)
+    # A partitioned table's unique constraint includes the partition key
+    conflict = 'pertemuan_id, siswa_id, tanggal' if absensi_partitioned(connection) else 'pertemuan_id, siswa_id'
+    if with_key:
+        kunci = f'''
+            usang AS (
+                DELETE FROM {keys} WHERE created_at < %(cutoff)s
+            ), kunci AS (
+                INSERT INTO {keys} (key, pertemuan_id, created_at)
+                VALUES (%(key)s, %(pertemuan)s, %(now)s)
+                ON CONFLICT (key) DO NOTHING
+                RETURNING key
+            )'''
+    else:
+        # Without a key the write always applies
+        kunci = 'kunci AS (SELECT NULL)'
+    # Sub-statements all see the table as it was, so ``sebelum`` holds the
+    # statuses before this write
+    return f'''
+        WITH {kunci}, sebelum AS (
+            SELECT siswa_id, status FROM {absensi} WHERE pertemuan_id = %(pertemuan)s
+        ), ditulis AS (
+            INSERT INTO {absensi} AS absensi (pertemuan_id, siswa_id, tanggal, status, updated_at)
+            SELECT %(pertemuan)s, siswa_id, %(tanggal)s, status, %(now)s
+            FROM unnest(%(siswa)s::bigint[], %(status)s::smallint[]) AS baru (siswa_id, status)
+            WHERE EXISTS (SELECT FROM kunci)
+            ON CONFLICT ({conflict}) DO UPDATE
+                SET status = EXCLUDED.status, updated_at = EXCLUDED.updated_at
+                WHERE absensi.status <> EXCLUDED.status
+            RETURNING siswa_id, status
+        )
+        SELECT
+            EXISTS (SELECT FROM kunci),
+            (SELECT json_agg(json_build_array(siswa_id, ditulis.status, sebelum.status))
+             FROM ditulis LEFT JOIN sebelum USING (siswa_id))
+    '''
+
+@transaction.atomic
+def upsert_absensi(pertemuan, statuses, siswa_list, key=None):
+    """
+    Set the attendance of the students in ``siswa_list`` who have a status
+    in ``statuses`` (keyed by siswa id as a string): rows are inserted for
+    students without one and updated where the status changed, in a single
+    statement. A ``key`` that was already used for this meeting writes
+    nothing and returns ``duplikat``.
+    """
+    siswa_by_id = {siswa.pk: siswa for siswa in siswa_list if str(siswa.pk) in statuses}
+    with connection.cursor() as cursor:
+        cursor.execute(upsert_statement(key is not None), {
+            'key': key,
+            'cutoff': key_cutoff(),
+            'pertemuan': pertemuan.pk,
+            'tanggal': pertemuan.tanggal,
+            'now': timezone.now(),
+            'siswa': list(siswa_by_id),
+            'status': [int(statuses[str(siswa_id)]) for siswa_id in siswa_by_id],
+        })
+        key_saved, written = cursor.fetchone()
+    if not key_saved:
+        return UpsertResult(duplikat=True)
+
+    written = written or []
+    result = UpsertResult(
+        ditambah=sum(1 for _, _, previous in written if previous is None),
+        diubah=sum(1 for _, _, previous in written if previous is not None),
+    )
+    if written:
+        # Raw SQL sends no signals
+        bump_eskul(pertemuan.eskul_id, *{siswa_by_id[siswa_id].eskul_id for siswa_id, _, _ in written})
+        hadir = Absensi.Status.HADIR
+        notify_dashboard(
+            pertemuan.tanggal,
+            absensi_hari_ini=result.ditambah,
+            hadir_hari_ini=sum((status == hadir) - (previous == hadir) for _, status, previous in written),
+        )
+    return result
+
+def parse_batch(request):
+    """The meetings of a sync request: a JSON body, or a multipart body
+    whose ``batch`` field holds the JSON and whose files are the photos."""
+    try:
+        if request.content_type == 'application/json':
+            payload = json.loads(request.body)
+        else:
+            payload = json.loads(request.POST.get('batch', ''))
+    except (ValueError, UnicodeDecodeError):
+        raise BatchError('Data sinkronisasi bukan JSON yang valid.')
+
+    items = payload.get('pertemuan') if isinstance(payload, dict) else None
+    if not isinstance(items, list) or not items:
+        raise BatchError('Data sinkronisasi harus berisi daftar pertemuan.')
+    if len(items) > MAX_BATCH:
+        raise BatchError(f'Maksimal {MAX_BATCH} pertemuan per sinkronisasi.')
+    return items
+
+def clean_item(item):
+    """Client id, date, materi and attendance statuses of one queued
+    meeting. Raises ValueError with a user-facing message."""
+    if not isinstance(item, dict):
+        raise ValueError('Format pertemuan tidak valid.')
+    try:
+        client_id = uuid.UUID(str(item.get('client_id')))
+    except ValueError:
+        raise ValueError('client_id tidak valid.')
+    try:
+        tanggal = date.fromisoformat(str(item.get('tanggal')))
+    except ValueError:
+        raise ValueError('Tanggal tidak valid.')
+    materi = str(item.get('materi_kegiatan') or '').strip()
+    if not materi:
+        raise ValueError('Materi kegiatan harus diisi.')
+    absensi = item.get('absensi') or {}
+    if not isinstance(absensi, dict):
+        raise ValueError('Format absensi tidak valid.')
+    statuses = {str(siswa_id): Absensi.Status.from_kode(kode) for siswa_id, kode in absensi.items()}
+    return client_id, tanggal, materi, statuses
+
+def date_taken_message(tanggal):
+    return f'Pertemuan untuk tanggal {tanggal} sudah ada. Satu eskul hanya bisa satu pertemuan per hari.'
+
+def save_batch(items, files, eskul, pelatih, siswa_list):
+    """
+    Save the queued meetings of ``eskul``, each in its own transaction, and
+    return one result per meeting with its ``client_id`` and ``status``.
+
+    Attendance is recorded for the current roster: students who left since
+    the page was cached offline are skipped, students added since are alpha.
+    A rejected meeting would be rejected again, so the client stops
+    retrying it and shows ``pesan`` instead.
+    """
+    siswa_list = list(siswa_list)
+    results, pending = [], []
+    for item in items:
+        result = {'client_id': str(item.get('client_id')) if isinstance(item, dict) else None}
+        results.append(result)
+        try:
+            pending.append((result, *clean_item(item)))
+        except ValueError as e:
+            result.update(status=DITOLAK, pesan=str(e))
+
+    saved = dict(Pertemuan.objects.filter(
+        eskul=eskul, client_id__in=[client_id for _, client_id, *_ in pending]
+    ).values_list('client_id', 'pk'))
+    taken_dates = set(Pertemuan.objects.filter(
+        eskul=eskul, tanggal__in=[tanggal for _, _, tanggal, *_ in pending]
+    ).values_list('tanggal', flat=True))
+
+    for result, client_id, tanggal, materi, statuses in pending:
+        if client_id in saved:
+            result.update(status=SUDAH_TERSIMPAN, pertemuan_id=saved[client_id])
+            continue
+        if tanggal in taken_dates:
+            result.update(status=DITOLAK, pesan=date_taken_message(tanggal))
+            continue
+
+        try:
+            with transaction.atomic():
+                pertemuan, absensi_list = create_pertemuan(
+                    eskul, pelatih, tanggal, materi, statuses, siswa_list,
+                    foto=files.get(f'foto_{client_id}'), client_id=client_id
+                )
+        except IntegrityError:
+            # Saved meanwhile by a concurrent sync of the same queue, or the date was taken
+            pk = Pertemuan.objects.filter(eskul=eskul, client_id=client_id).values_list('pk', flat=True).first()
+            if pk:
+                result.update(status=SUDAH_TERSIMPAN, pertemuan_id=pk)
+            else:
+                result.update(status=DITOLAK, pesan=date_taken_message(tanggal))
+            continue
+
+        saved[client_id] = pertemuan.pk
+        taken_dates.add(tanggal)
+        result.update(
+            status=TERSIMPAN,
+            pertemuan_id=pertemuan.pk,
+            hadir=sum(1 for absensi in absensi_list if absensi.hadir),
+            total=len(absensi_list),
+        )
+    return results
@@ -0,0 +1,262 @@
+"""
+On-demand profiling of single requests in production, for admins only.
+
+An admin turns it on for one request with ``?profil=<token>`` (the token is
+shown on the profiles page and signed for that admin), or for their
+browser for a few minutes with a signed cookie set from the same page. The
+request then runs under cProfile while a sampler thread records its stacks
+and every database query is captured. Saved under PROFILE_ROOT:
+
+    <id>.prof       pstats dump, for snakeviz or ``python -m pstats``
+    <id>.collapsed  folded stacks, for flamegraph.pl or speedscope
+    <id>.json       request, timings and captured SQL
+
+PROFILE_ROOT is kept out of MEDIA_ROOT, which is served without a login:
+the captured SQL includes session keys and password hashes. The profiles
+page serves the files to admins.
+"""
+import cProfile
+import json
+import os
+import pstats
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.decorators import sync_and_async_middleware
+
+from .async_utils import request_user
+from .metrics import observe_queries, query_observers
+
+PARAM = 'profil'
+COOKIE = 'eskul_profil'
+SALT = 'eskul.profiling'
+LINK_AGE = 60 * 60
+COOKIE_AGE = 10 * 60
+SAMPLE_INTERVAL = 0.005
+# Queries beyond this are counted but their SQL is not kept
+MAX_QUERIES = 2000
+KEEP = 50
+PROFILE_ID = re.compile(r'\d{8}-\d{12}-[0-9a-f]{16}')
+FILE_SUFFIXES = {'prof': '.prof', 'collapsed': '.collapsed'}
+
+def profile_dir():
+    return Path(settings.PROFILE_ROOT)
+
+def link_token(user):
+    return signing.dumps(user.pk, salt=SALT)
+
+def set_profiling_cookie(response, user):
+    response.set_signed_cookie(
+        COOKIE, str(user.pk), salt=SALT, max_age=COOKIE_AGE, httponly=True, samesite='Lax'
+    )
+
+def cookie_active(request, user):
+    return request.get_signed_cookie(COOKIE, default=None, salt=SALT, max_age=COOKIE_AGE) == str(user.pk)
+
+def profile_asked(request):
+    # Checked first so other requests never load the user for this
+    return (PARAM in request.GET or COOKIE in request.COOKIES) and not request.path.startswith(reverse('admin_profiles'))
+
+def profiling_allowed(request, user):
+    if not (user.is_authenticated and user.role == 'admin'):
+        return False
+    token = request.GET.get(PARAM)
+    if token:
+        try:
+            return signing.loads(token, salt=SALT, max_age=LINK_AGE) == user.pk
+        except signing.BadSignature:
+            return False
+    return cookie_active(request, user)
+
+class QueryLog:
+    """SQL of one profiled request, from every thread it runs queries in;
+    fed by the query recorder of eskul.metrics."""
+
+    def __init__(self):
+        self.queries = []
+        self.count = 0
+        self.seconds = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, seconds, sql, params, context):
+        try:
+            sql = context['connection'].ops.last_executed_query(context['cursor'], sql, params)
+        except Exception:
+            pass
+        with self.lock:
+            self.count += 1
+            self.seconds += seconds
+            if len(self.queries) < MAX_QUERIES:
+                self.queries.append({'sql': sql, 'ms': round(seconds * 1000, 3)})
+
+class StackSampler(threading.Thread):
+    """Counts the stacks of one thread every SAMPLE_INTERVAL seconds."""
+
+    def __init__(self, thread_id):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+# cProfile cannot run twice at once in a process, so concurrent requests
+# asking for a profile are served without one
+profile_lock = threading.Lock()
+
+class ProfiledRequest:
+    def __enter__(self):
+        self.log = QueryLog()
+        self.token = observe_queries(self.log)
+        self.sampler = StackSampler(threading.get_ident())
+        self.profile = cProfile.Profile()
+        self.started = time.perf_counter()
+        self.sampler.start()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profile.disable()
+        self.sampler.stop()
+        self.duration = time.perf_counter() - self.started
+        query_observers.reset(self.token)
+
+    def save(self, request, response):
+        directory = profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        now = timezone.localtime()
+        profile_id = f'{now:%Y%m%d-%H%M%S%f}-{secrets.token_hex(8)}'
+        self.profile.dump_stats(directory / f'{profile_id}.prof')
+        (directory / f'{profile_id}.collapsed').write_text(self.sampler.collapsed())
+        match = request.resolver_match
+        info = {
+            'id': profile_id,
+            'dibuat': now.isoformat(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'user': request.user.username,
+            'durasi_ms': round(self.duration * 1000, 1),
+            'jumlah_query': self.log.count,
+            'waktu_query_ms': round(self.log.seconds * 1000, 1),
+            'queries': self.log.queries,
+        }
+        (directory / f'{profile_id}.json').write_text(json.dumps(info))
+        remove_old_profiles(directory)
+        return profile_id
+
+def remove_old_profiles(directory):
+    for path in sorted(directory.glob('*.json'), reverse=True)[KEEP:]:
+        delete_profile(path.stem)
+
+def profile_path(profile_id, kind):
+    """Path of a profile file; None for an id that is not one."""
+    if not PROFILE_ID.fullmatch(profile_id):
+        return None
+    return profile_dir() / f'{profile_id}{FILE_SUFFIXES.get(kind, ".json")}'
+
+def list_profiles():
+    """Saved profiles, newest first, without their SQL."""
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for path in sorted(directory.glob('*.json'), reverse=True):
+        info = json.loads(path.read_text())
+        info.pop('queries')
+        info['dibuat'] = datetime.fromisoformat(info['dibuat'])
+        profiles.append(info)
+    return profiles
+
+def load_profile(profile_id):
+    path = profile_path(profile_id, 'json')
+    if path is None or not path.is_file():
+        return None
+    info = json.loads(path.read_text())
+    info['dibuat'] = datetime.fromisoformat(info['dibuat'])
+    return info
+
+def top_functions(profile_id, limit=30):
+    """The functions with the most cumulative time, as in pstats."""
+    stats = pstats.Stats(str(profile_path(profile_id, 'prof'))).stats
+    rows = [
+        {
+            'fungsi': f'{name} ({os.path.basename(filename)}:{line})' if line else name,
+            'file': filename,
+            'panggilan': total_calls,
+            'waktu_sendiri_ms': round(own * 1000, 2),
+            'waktu_kumulatif_ms': round(cumulative * 1000, 2),
+        }
+        for (filename, line, name), (_, total_calls, own, cumulative, _) in stats.items()
+    ]
+    rows.sort(key=lambda row: row['waktu_kumulatif_ms'], reverse=True)
+    return rows[:limit]
+
+def delete_profile(profile_id):
+    for kind in ('json', *FILE_SUFFIXES):
+        path = profile_path(profile_id, kind)
+        if path is not None:
+            path.unlink(missing_ok=True)
+
+@sync_and_async_middleware
+def profiling_middleware(get_response):
+    """Profiles the requests an admin asked for; after AuthenticationMiddleware.
+    For async views cProfile and the sampler see the event loop thread only,
+    not the code they run in worker threads, whose queries are still captured."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if not (
+                profile_asked(request) and profiling_allowed(request, await request_user(request))
+                and profile_lock.acquire(blocking=False)
+            ):
+                return await get_response(request)
+            try:
+                with ProfiledRequest() as profiled:
+                    response = await get_response(request)
+                profiled.save(request, response)
+            finally:
+                profile_lock.release()
+            return response
+    else:
+        def middleware(request):
+            if not (
+                profile_asked(request) and profiling_allowed(request, request.user)
+                and profile_lock.acquire(blocking=False)
+            ):
+                return get_response(request)
+            try:
+                with ProfiledRequest() as profiled:
+                    response = get_response(request)
+                profiled.save(request, response)
+            finally:
+                profile_lock.release()
+            return response
+    return middleware
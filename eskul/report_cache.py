@@ -0,0 +1,120 @@
+"""
+Cache for report rows and dropdown lists.
+
+Entries are keyed by report name, normalized filter parameters and the
+counters of the versions they depend on: one per eskul (``eskul:<id>``),
+``eskul:all`` for reports across every eskul, and ``lookups`` for the
+dropdown lists. Writes bump the affected counters (see signals.py) in the
+ReportVersion table once their transaction commits, all names of one
+transaction in a single statement. Bumping after the commit keeps the
+counter rows out of the writers' transactions, where every attendance
+write would queue on the ``eskul:all`` row lock; a reader can then only
+store newer rows under the old counter, never older rows under the new
+one. Stale entries are never read again and simply expire, which is why
+the default per-process cache is enough here.
+"""
+import hashlib
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .models import ReportVersion
+
+ALL = 'eskul:all'
+LOOKUPS = 'lookups'
+
+def eskul_version(eskul_id):
+    return f'eskul:{eskul_id}'
+
+def eskul_scope(eskul_id=None):
+    """Version a report filtered to ``eskul_id`` (or to no eskul) depends on."""
+    return eskul_version(eskul_id) if eskul_id else ALL
+
+def bump_versions(*names):
+    table = connection.ops.quote_name(ReportVersion._meta.db_table)
+    with connection.cursor() as cursor:
+        # Sorted so concurrent writers lock the rows in the same order
+        cursor.execute(
+            f'INSERT INTO {table} (name, counter) SELECT unnest(%s::varchar[]), 1 '
+            f'ON CONFLICT (name) DO UPDATE SET counter = {table}.counter + 1',
+            [sorted(set(names))]
+        )
+
+class PendingBumps:
+    """Versions to bump when the transaction commits, and the rows (model,
+    pk) whose eskul is looked up then, in one query per model."""
+
+    def __init__(self):
+        self.names = {ALL}
+        self.via = defaultdict(set)
+        self.flushed = False
+
+    def flush(self):
+        self.flushed = True
+        names = set(self.names)
+        for model, pks in self.via.items():
+            eskul_ids = model._base_manager.filter(pk__in=pks).values_list('eskul_id', flat=True).distinct()
+            names.update(eskul_version(eskul_id) for eskul_id in eskul_ids if eskul_id)
+        bump_versions(*names)
+
+_local = threading.local()
+
+def pending_bumps():
+    if not connection.in_atomic_block:
+        return None
+    pending = getattr(_local, 'pending', None)
+    # A rolled back transaction or savepoint drops its callbacks; then the
+    # names gathered with them are dropped too and a new set is started
+    if pending is None or pending.flushed or not any(func == pending.flush for _, func, _ in connection.run_on_commit):
+        pending = _local.pending = PendingBumps()
+        transaction.on_commit(pending.flush)
+    return pending
+
+def bump_eskul(*eskul_ids, lookups=False, via=()):
+    """Bump ``eskul:all``, the given eskul and, with ``lookups``, the dropdown
+    lists once the current transaction commits (at once outside one).
+    ``via`` holds (model, pk) pairs of rows whose ``eskul_id`` is read then,
+    for callers that do not have the eskul loaded."""
+    pending = pending_bumps()
+    immediate = pending is None
+    if immediate:
+        pending = PendingBumps()
+    pending.names.update(eskul_version(eskul_id) for eskul_id in eskul_ids if eskul_id)
+    if lookups:
+        pending.names.add(LOOKUPS)
+    for model, pk in via:
+        pending.via[model].add(pk)
+    if immediate:
+        pending.flush()
+
+def report_versions(*names):
+    """Current counters for ``names`` in one query, for ``cached_report``."""
+    counters = dict(ReportVersion.objects.filter(name__in=names).values_list('name', 'counter'))
+    return {name: counters.get(name, 0) for name in names}
+
+def normalized(params):
+    return json.dumps(
+        {name: str(value).strip() for name, value in params.items() if value not in (None, '')},
+        sort_keys=True
+    )
+
+def cached_report(name, params, versions, compute):
+    """
+    Return ``compute()`` from the cache, computing and storing it on a miss.
+    ``versions`` is the part of ``report_versions()`` the result depends on.
+    """
+    key_source = '|'.join([name, normalized(params), json.dumps(versions, sort_keys=True)])
+    key = f'report:{name}:{hashlib.sha1(key_source.encode()).hexdigest()}'
+
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, settings.REPORT_CACHE_TIMEOUT)
+    return result
+
+def cached_lookup(name, versions, compute):
+    return cached_report(name, {}, {LOOKUPS: versions[LOOKUPS]}, compute)
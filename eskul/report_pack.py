@@ -0,0 +1,162 @@
+"""
+Semester report pack: the attendance and meeting workbooks of every active
+eskul in one ZIP.
+
+Writing workbooks is CPU-bound (pandas and openpyxl), so each eskul's pair
+is built in a process pool. Each web worker process starts one pool of
+REPORT_PACK_WORKERS processes on its first download and keeps it; concurrent
+downloads share it and queue for its processes, so a burst of downloads
+never starts more than that many per web worker. The pool's workers are
+spawned rather than forked, so they open their own database connections
+instead of sharing the web worker's. The ZIP is written to the response as each eskul finishes: only
+the workbooks of the eskul being added are held in memory, never the
+archive.
+
+This module is imported by the pool workers before Django is set up, so it
+only imports models inside functions.
+"""
+import io
+import multiprocessing
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .spreadsheets import response_chunks, write_excel
+
+def init_worker(database_names):
+    import django
+    django.setup()
+    from django.db import connections
+    # The test runner renames the databases in the parent only
+    for alias, name in database_names.items():
+        connections[alias].settings_dict['NAME'] = name
+
+def eskul_workbooks(eskul_id, start_date=None, end_date=None, using=DEFAULT_DB_ALIAS):
+    """The two workbooks of one eskul as ``[(filename, bytes)]``, and their
+    total number of rows."""
+    from .reports import (
+        ATTENDANCE_EXPORT_COLUMNS, PERTEMUAN_EXPORT_COLUMNS, attendance_export_rows,
+        attendance_report_queryset, pertemuan_export_rows, pertemuan_report_queryset,
+    )
+
+    workbooks = (
+        (
+            'laporan_kehadiran.xlsx', 'Laporan Kehadiran', ATTENDANCE_EXPORT_COLUMNS, attendance_export_rows,
+            attendance_report_queryset(eskul_id=eskul_id, start_date=start_date, end_date=end_date),
+        ),
+        (
+            'laporan_pertemuan.xlsx', 'Laporan Pertemuan', PERTEMUAN_EXPORT_COLUMNS, pertemuan_export_rows,
+            pertemuan_report_queryset(eskul_id=eskul_id, start_date=start_date, end_date=end_date),
+        ),
+    )
+    files, total = [], 0
+    for filename, sheet_name, columns, make_rows, queryset in workbooks:
+        rows = list(make_rows(queryset.using(using)))
+        output = io.BytesIO()
+        write_excel(output, sheet_name, columns, rows)
+        files.append((filename, output.getvalue()))
+        total += len(rows)
+    return files, total
+
+pool = None
+pool_lock = threading.Lock()
+
+def worker_pool():
+    """The pool of this process, started on first use."""
+    global pool
+    with pool_lock:
+        if pool is None:
+            pool = ProcessPoolExecutor(
+                settings.REPORT_PACK_WORKERS, mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker,
+                initargs=({alias: connections[alias].settings_dict['NAME'] for alias in connections},)
+            )
+        return pool
+
+def discard_pool(executor=None):
+    """Shut down the pool (only if it is still ``executor``); the next
+    download starts a new one."""
+    global pool
+    with pool_lock:
+        if pool is None or executor not in (None, pool):
+            return
+        executor, pool = pool, None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def built_workbooks(eskul_list, start_date, end_date, using):
+    """Yield ``(eskul, files, rows)`` in the order the eskul finish.
+
+    Builds them one after another in this process when REPORT_PACK_WORKERS
+    is 0 or inside a transaction, whose rows the workers cannot see."""
+    if settings.REPORT_PACK_WORKERS < 1 or connection.in_atomic_block:
+        for eskul in eskul_list:
+            yield eskul, *eskul_workbooks(eskul.pk, start_date, end_date, using)
+        return
+
+    executor = worker_pool()
+    futures = {}
+    try:
+        for eskul in eskul_list:
+            futures[executor.submit(eskul_workbooks, eskul.pk, start_date, end_date, using)] = eskul
+        for future in as_completed(futures):
+            yield futures[future], *future.result()
+    except BrokenProcessPool:
+        # A worker died (killed, out of memory); the pool takes no more work
+        discard_pool(executor)
+        raise
+    finally:
+        # Also when the download is aborted: drop its eskul not started yet
+        for future in futures:
+            future.cancel()
+
+class ZipOutput:
+    """Write-only file for ZipFile that collects the bytes for the response.
+    Without tell() or seek(), ZipFile writes sizes after each file's data."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def folder_name(eskul):
+    return f'{slugify(eskul.nama_eskul) or "eskul"}-{eskul.pk}'
+
+def report_pack_chunks(eskul_list, start_date, end_date, timer, using):
+    output = ZipOutput()
+    rows = 0
+    # Workbooks are zip files already; deflating them again gains nothing
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for eskul, files, eskul_rows in built_workbooks(eskul_list, start_date, end_date, using):
+            for filename, data in files:
+                archive.writestr(f'{folder_name(eskul)}/{filename}', data)
+            rows += eskul_rows
+            yield output.take()
+    # The central directory, written on close
+    yield output.take()
+    timer.finish(rows)
+
+def report_pack_response(request, eskul_list, start_date, end_date, timer, using=DEFAULT_DB_ALIAS):
+    """``using`` is the database to read, as the pack is built after the
+    view returns."""
+    chunks = report_pack_chunks(eskul_list, start_date, end_date, timer, using)
+    response = StreamingHttpResponse(response_chunks(request, chunks), content_type='application/zip')
+    timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
+    response['Content-Disposition'] = f'attachment; filename="paket_laporan_{timestamp}.zip"'
+    return response
@@ -0,0 +1,193 @@
+from django.db.models import Count, F, Func, OuterRef, Q, Subquery
+
+from accounts.models import CustomUser
+from .models import Eskul, Siswa, Pertemuan, Absensi, FotoKegiatan
+
+def absensi_stats_annotations(relation, absensi_filter=None):
+    """Build Count annotations for the absensi reached through ``relation``,
+    so per-row statistics come from the same query as the rows themselves."""
+    base_filter = absensi_filter if absensi_filter is not None else Q()
+    annotations = {'total_absensi': Count(relation, filter=base_filter)}
+    for status in Absensi.Status:
+        annotations[f'jumlah_{status.kode}'] = Count(
+            relation,
+            filter=base_filter & Q(**{f'{relation}__status': status})
+        )
+    return annotations
+
+def attendance_report_queryset(eskul_id=None, kelas=None, start_date=None, end_date=None):
+    """Active students with their attendance counts, as used by the attendance
+    report and its export."""
+    siswa_list = Siswa.objects.filter(is_active=True).select_related('eskul__pelatih')
+    absensi_filter = Q()
+
+    if eskul_id:
+        siswa_list = siswa_list.filter(eskul_id=eskul_id)
+
+    if kelas:
+        siswa_list = siswa_list.filter(kelas=kelas)
+
+    if start_date:
+        absensi_filter &= Q(absensi__tanggal__gte=start_date)
+
+    if end_date:
+        absensi_filter &= Q(absensi__tanggal__lte=end_date)
+
+    return siswa_list.annotate(**absensi_stats_annotations('absensi', absensi_filter))
+
+def pertemuan_report_queryset(pelatih_id=None, eskul_id=None, start_date=None, end_date=None):
+    """Meetings with their attendance counts, as used by the meeting report
+    and its export."""
+    pertemuan_list = Pertemuan.objects.select_related('eskul', 'pelatih').prefetch_related('foto_list')
+
+    if pelatih_id:
+        pertemuan_list = pertemuan_list.filter(pelatih_id=pelatih_id)
+
+    if eskul_id:
+        pertemuan_list = pertemuan_list.filter(eskul_id=eskul_id)
+
+    if start_date:
+        pertemuan_list = pertemuan_list.filter(tanggal__gte=start_date)
+
+    if end_date:
+        pertemuan_list = pertemuan_list.filter(tanggal__lte=end_date)
+
+    return pertemuan_list.annotate(**absensi_stats_annotations('absensi_list')).order_by('-tanggal')
+
+ATTENDANCE_EXPORT_COLUMNS = [
+    'Nama Siswa', 'Kelas', 'Eskul', 'Pelatih', 'Total Pertemuan',
+    'Hadir', 'Sakit', 'Izin', 'Alpha', 'Persentase Kehadiran (%)',
+]
+PERTEMUAN_EXPORT_COLUMNS = [
+    'Tanggal', 'Eskul', 'Pelatih', 'Materi Kegiatan', 'Total Siswa',
+    'Hadir', 'Sakit', 'Izin', 'Alpha', 'Persentase Kehadiran (%)', 'Jumlah Foto',
+]
+
+def attendance_export_rows(siswa_list):
+    """Export rows of attendance_report_queryset, in ATTENDANCE_EXPORT_COLUMNS order."""
+    for siswa in siswa_list:
+        total_pertemuan = siswa.total_absensi
+        hadir = siswa.jumlah_hadir
+
+        persentase_hadir = (hadir / total_pertemuan * 100) if total_pertemuan > 0 else 0
+
+        yield [
+            siswa.nama_siswa,
+            siswa.kelas,
+            siswa.eskul.nama_eskul,
+            siswa.eskul.pelatih.nama_lengkap if siswa.eskul.pelatih else '-',
+            total_pertemuan,
+            hadir,
+            siswa.jumlah_sakit,
+            siswa.jumlah_izin,
+            siswa.jumlah_alpha,
+            round(persentase_hadir, 2)
+        ]
+
+def pertemuan_export_rows(pertemuan_list):
+    """Export rows of pertemuan_report_queryset, in PERTEMUAN_EXPORT_COLUMNS order."""
+    for pertemuan in pertemuan_list:
+        total = pertemuan.total_absensi
+        hadir = pertemuan.jumlah_hadir
+
+        persentase_hadir = (hadir / total * 100) if total > 0 else 0
+
+        yield [
+            pertemuan.tanggal.strftime('%Y-%m-%d'),
+            pertemuan.eskul.nama_eskul,
+            pertemuan.pelatih.nama_lengkap,
+            pertemuan.materi_kegiatan[:100] + '...' if len(pertemuan.materi_kegiatan) > 100 else pertemuan.materi_kegiatan,
+            total,
+            hadir,
+            pertemuan.jumlah_sakit,
+            pertemuan.jumlah_izin,
+            pertemuan.jumlah_alpha,
+            round(persentase_hadir, 2),
+            len(pertemuan.foto_list.all())
+        ]
+
+def pelatih_students_queryset(eskul, kelas=None, search_query=None):
+    """Active students of one eskul with their attendance counts."""
+    siswa_list = Siswa.objects.filter(eskul=eskul, is_active=True).order_by('nama_siswa')
+
+    if search_query:
+        siswa_list = siswa_list.filter(nama_siswa__icontains=search_query)
+
+    if kelas:
+        siswa_list = siswa_list.filter(kelas=kelas)
+
+    return siswa_list.annotate(**absensi_stats_annotations('absensi'))
+
+def count_subquery(queryset):
+    """Row count of a queryset filtered on OuterRef, as a correlated
+    subquery; unlike Count() over joins, several of them do not multiply."""
+    return Subquery(queryset.order_by().annotate(jumlah=Func(F('pk'), function='COUNT')).values('jumlah'))
+
+def latest_subquery(queryset, field):
+    return Subquery(queryset.order_by(f'-{field}').values(field)[:1])
+
+def pelatih_list_queryset():
+    """Coaches with their eskul and its student, meeting and last meeting
+    figures, for the paginated account list."""
+    pertemuan = Pertemuan.objects.filter(pelatih=OuterRef('pk'))
+    return CustomUser.objects.filter(role='pelatih').annotate(
+        # At most one eskul per pelatih (eskul_satu_eskul_per_pelatih)
+        nama_eskul=F('eskul__nama_eskul'),
+        jumlah_siswa=count_subquery(Siswa.objects.filter(eskul__pelatih=OuterRef('pk'))),
+        jumlah_pertemuan=count_subquery(pertemuan),
+        aktivitas_terakhir=latest_subquery(pertemuan, 'tanggal'),
+    )
+
+def eskul_list_queryset():
+    """Eskul with their student, meeting and last meeting figures, for the
+    paginated eskul list."""
+    pertemuan = Pertemuan.objects.filter(eskul=OuterRef('pk'))
+    return Eskul.objects.select_related('pelatih').annotate(
+        jumlah_siswa=count_subquery(Siswa.objects.filter(eskul=OuterRef('pk'))),
+        jumlah_pertemuan=count_subquery(pertemuan),
+        aktivitas_terakhir=latest_subquery(pertemuan, 'tanggal'),
+    )
+
+# Data scopes for conditional GET: (queryset, change timestamp field) pairs
+# covering everything the page shows, dropdowns included.
+
+def attendance_report_scopes(eskul_id=None, kelas=None):
+    absensi = Absensi.objects.filter(siswa__is_active=True)
+    if eskul_id:
+        absensi = absensi.filter(siswa__eskul_id=eskul_id)
+    if kelas:
+        absensi = absensi.filter(siswa__kelas=kelas)
+    return [
+        (Siswa.objects.all(), 'updated_at'),
+        (Eskul.objects.all(), 'updated_at'),
+        (absensi, 'updated_at'),
+    ]
+
+def pertemuan_report_scopes(pelatih_id=None, eskul_id=None, start_date=None, end_date=None):
+    pertemuan_list = Pertemuan.objects.all()
+    if pelatih_id:
+        pertemuan_list = pertemuan_list.filter(pelatih_id=pelatih_id)
+    if eskul_id:
+        pertemuan_list = pertemuan_list.filter(eskul_id=eskul_id)
+    if start_date:
+        pertemuan_list = pertemuan_list.filter(tanggal__gte=start_date)
+    if end_date:
+        pertemuan_list = pertemuan_list.filter(tanggal__lte=end_date)
+    return [
+        (pertemuan_list, 'updated_at'),
+        (Absensi.objects.filter(pertemuan__in=pertemuan_list), 'updated_at'),
+        (FotoKegiatan.objects.filter(pertemuan__in=pertemuan_list), 'uploaded_at'),
+        (Eskul.objects.all(), 'updated_at'),
+        (CustomUser.objects.filter(role='pelatih'), 'updated_at'),
+    ]
+
+def pelatih_history_scopes(pelatih):
+    return [
+        (Eskul.objects.filter(pelatih=pelatih), 'updated_at'),
+        (Pertemuan.objects.filter(eskul__pelatih=pelatih), 'updated_at'),
+        (Absensi.objects.filter(pertemuan__eskul__pelatih=pelatih), 'updated_at'),
+        (FotoKegiatan.objects.filter(pertemuan__eskul__pelatih=pelatih), 'uploaded_at'),
+        (Siswa.objects.filter(
+            id__in=Absensi.objects.filter(pertemuan__eskul__pelatih=pelatih).values('siswa_id')
+        ), 'updated_at'),
+    ]
@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.db.models import Count, Q
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .live import notify_absensi_created, notify_dashboard, today
+from .models import Eskul, Siswa, Pertemuan, Absensi, FotoKegiatan
+from .report_cache import bump_eskul
+
+@receiver(post_save, sender=Pertemuan)
+def pertemuan_saved(sender, instance, created, **kwargs):
+    if created:
+        notify_dashboard(instance.tanggal, pertemuan_hari_ini=1)
+
+@receiver(pre_delete, sender=Pertemuan)
+def pertemuan_deleted(sender, instance, **kwargs):
+    if str(instance.tanggal) != today().isoformat():
+        return
+    # Its attendance goes with it through the cascade
+    counts = instance.absensi_list.aggregate(
+        total=Count('id'), hadir=Count('id', filter=Q(status=Absensi.Status.HADIR))
+    )
+    notify_dashboard(
+        instance.tanggal,
+        pertemuan_hari_ini=-1, absensi_hari_ini=-counts['total'], hadir_hari_ini=-counts['hadir']
+    )
+
+@receiver(post_save, sender=Absensi)
+def absensi_saved(sender, instance, created, **kwargs):
+    # bulk_create skips this signal; those callers use notify_absensi_created
+    if created:
+        notify_absensi_created([instance])
+
+# Report cache versions. Absensi has no delete receiver on purpose: that
+# would stop cascades from Pertemuan and Siswa deleting it in bulk, and
+# those parents already bump the version.
+
+@receiver(pre_save, sender=Siswa)
+@receiver(pre_save, sender=Pertemuan)
+def remember_previous_eskul(sender, instance, **kwargs):
+    # Moving a student or meeting changes the reports of both eskul
+    instance._previous_eskul_id = (
+        sender.objects.filter(pk=instance.pk).values_list('eskul_id', flat=True).first()
+        if instance.pk else None
+    )
+
+@receiver(post_save, sender=Siswa)
+@receiver(post_delete, sender=Siswa)
+def siswa_changed(sender, instance, **kwargs):
+    # The kelas dropdown is built from students
+    bump_eskul(instance.eskul_id, getattr(instance, '_previous_eskul_id', None), lookups=True)
+
+@receiver(post_save, sender=Pertemuan)
+@receiver(post_delete, sender=Pertemuan)
+def pertemuan_changed(sender, instance, **kwargs):
+    bump_eskul(instance.eskul_id, getattr(instance, '_previous_eskul_id', None))
+
+def bump_related_eskul(instance, *relations):
+    """Bump the eskul of ``instance``'s related meeting or student, read from
+    the relation when it is loaded and looked up at commit otherwise."""
+    eskul_ids, via = [], []
+    for name in relations:
+        field = instance._meta.get_field(name)
+        if field.is_cached(instance):
+            eskul_ids.append(getattr(instance, name).eskul_id)
+        else:
+            via.append((field.related_model, getattr(instance, field.attname)))
+    bump_eskul(*eskul_ids, via=via)
+
+@receiver(post_save, sender=Absensi)
+def absensi_changed(sender, instance, **kwargs):
+    bump_related_eskul(instance, 'pertemuan', 'siswa')
+
+@receiver(post_save, sender=FotoKegiatan)
+@receiver(post_delete, sender=FotoKegiatan)
+def foto_changed(sender, instance, **kwargs):
+    bump_related_eskul(instance, 'pertemuan')
+
+@receiver(post_save, sender=Eskul)
+@receiver(post_delete, sender=Eskul)
+def eskul_changed(sender, instance, **kwargs):
+    bump_eskul(instance.pk, lookups=True)
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    # Logging in only touches last_login
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    if instance.role == 'pelatih':
+        # Coach names appear in the coach dropdown and next to their eskul
+        bump_eskul(*Eskul.objects.filter(pelatih_id=instance.pk).values_list('pk', flat=True), lookups=True)
@@ -0,0 +1,234 @@
+"""
+Full-dataset snapshots streamed through PostgreSQL COPY.
+
+An archive is a gzip-compressed tar holding ``manifest.json`` followed by one
+``<table>.copy`` member per table in COPY text format. The manifest lists the
+tables in dependency order with their columns, row counts and SHA-256
+checksums, plus the migrations the data was taken at. Uploaded files under
+MEDIA_ROOT are not included, only the rows that point at them.
+"""
+import hashlib
+import json
+import tarfile
+import tempfile
+from datetime import datetime, timezone
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import F
+
+from .models import Eskul, ReportVersion
+from .report_cache import bump_eskul
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+SNAPSHOT_APPS = ('accounts', 'eskul')
+# Cache bookkeeping, not data; kept across imports (see import_snapshot)
+EXCLUDED_MODELS = ('eskul.ReportVersion',)
+CHUNK_SIZE = 1024 * 1024
+
+class SnapshotError(Exception):
+    pass
+
+class HashingWriter:
+    """File-like target for COPY TO that hashes and counts rows on the way."""
+
+    def __init__(self, file):
+        self.file = file
+        self.sha256 = hashlib.sha256()
+        self.rows = 0
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self.sha256.update(data)
+        # COPY text format escapes embedded newlines, so one line is one row
+        self.rows += data.count(b'\n')
+        self.file.write(data)
+
+class HashingReader:
+    """File-like source for COPY FROM that hashes what it hands over."""
+
+    def __init__(self, file):
+        self.file = file
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.sha256.update(data)
+        return data
+
+    def readline(self, size=-1):
+        data = self.file.readline(size)
+        self.sha256.update(data)
+        return data
+
+def snapshot_models():
+    """Concrete models of the snapshot apps, with the auto-created many-to-many
+    tables (user groups and permissions), parents before children."""
+    models = [
+        model
+        for label in SNAPSHOT_APPS
+        for model in apps.get_app_config(label).get_models(include_auto_created=True)
+        if not model._meta.proxy and model._meta.label not in EXCLUDED_MODELS
+    ]
+    ordered = []
+    pending = list(models)
+    while pending:
+        progressed = False
+        for model in list(pending):
+            parents = {
+                field.related_model for field in model._meta.concrete_fields
+                if field.is_relation and field.related_model in models and field.related_model is not model
+            }
+            if parents.issubset(ordered):
+                ordered.append(model)
+                pending.remove(model)
+                progressed = True
+        if not progressed:
+            raise SnapshotError('Relasi antar tabel melingkar: ' + ', '.join(m._meta.label for m in pending))
+    return ordered
+
+def table_columns(model):
+    return [field.column for field in model._meta.concrete_fields]
+
+def quoted(names):
+    return ', '.join(connection.ops.quote_name(name) for name in names)
+
+def outside_references(cursor, tables):
+    """Tables outside ``tables`` with a foreign key into them."""
+    # Constraints copied onto partitions (conparentid set) follow their parent
+    cursor.execute(
+        "SELECT DISTINCT conrelid::regclass::text FROM pg_constraint "
+        "WHERE contype = 'f' AND conparentid = 0 "
+        "AND confrelid = ANY(%s::regclass[]) AND NOT conrelid = ANY(%s::regclass[])",
+        [tables, tables]
+    )
+    return sorted(table for table, in cursor.fetchall())
+
+def applied_migrations():
+    """Latest applied migration per snapshot app."""
+    latest = {}
+    for app, name in MigrationRecorder(connection).applied_migrations():
+        if app in SNAPSHOT_APPS:
+            latest[app] = max(latest.get(app, name), name)
+    return latest
+
+def export_snapshot(path):
+    """Write every snapshot table to the archive at ``path``; returns the manifest."""
+    tables = []
+    in_transaction = connection.in_atomic_block
+    with tempfile.TemporaryDirectory() as workdir:
+        with transaction.atomic(), connection.cursor() as cursor:
+            if not in_transaction:
+                # One snapshot for every table so they are taken at the same moment
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY')
+            for model in snapshot_models():
+                table = model._meta.db_table
+                columns = table_columns(model)
+                member = f'{table}.copy'
+                with open(f'{workdir}/{member}', 'wb') as file:
+                    writer = HashingWriter(file)
+                    # SELECT form also works for partitioned tables
+                    cursor.copy_expert(
+                        f'COPY (SELECT {quoted(columns)} FROM {connection.ops.quote_name(table)}) TO STDOUT',
+                        writer
+                    )
+                tables.append({
+                    'model': model._meta.label,
+                    'table': table,
+                    'file': member,
+                    'columns': columns,
+                    'rows': writer.rows,
+                    'sha256': writer.sha256.hexdigest(),
+                })
+
+        manifest = {
+            'format': FORMAT_VERSION,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'migrations': applied_migrations(),
+            'tables': tables,
+        }
+        manifest_path = f'{workdir}/{MANIFEST_NAME}'
+        with open(manifest_path, 'w') as file:
+            json.dump(manifest, file, indent=2)
+
+        with tarfile.open(path, 'w:gz') as archive:
+            archive.add(manifest_path, arcname=MANIFEST_NAME)
+            for table in tables:
+                archive.add(f'{workdir}/{table["file"]}', arcname=table['file'])
+
+    return manifest
+
+def read_manifest(archive):
+    member = archive.next()
+    if member is None or member.name != MANIFEST_NAME:
+        raise SnapshotError('Arsip tidak valid: manifest.json tidak ditemukan di awal arsip.')
+    manifest = json.load(archive.extractfile(member))
+    if manifest.get('format') != FORMAT_VERSION:
+        raise SnapshotError(f'Versi format snapshot tidak didukung: {manifest.get("format")}')
+    return manifest
+
+def import_snapshot(path):
+    """
+    Replace the snapshot tables with the contents of the archive at ``path``.
+    Everything runs in one transaction, so a checksum mismatch part way
+    through leaves the old data in place.
+    """
+    models = {model._meta.label: model for model in snapshot_models()}
+
+    # Stream mode reads the archive front to back without seeking
+    with tarfile.open(path, 'r|gz') as archive:
+        manifest = read_manifest(archive)
+
+        current = applied_migrations()
+        if manifest['migrations'] != current:
+            raise SnapshotError(
+                f'Skema database berbeda dengan snapshot (snapshot: {manifest["migrations"]}, database: {current}). '
+                'Jalankan migrate ke versi yang sama terlebih dahulu.'
+            )
+
+        tables = manifest['tables']
+        unknown = [table['model'] for table in tables if table['model'] not in models]
+        if unknown:
+            raise SnapshotError('Model tidak dikenal di snapshot: ' + ', '.join(unknown))
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            # TRUNCATE refuses to run while deferred foreign key checks are pending
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            # Without CASCADE, so rows of other tables (the admin log) are never
+            # emptied along; such tables must be empty to be truncated with them
+            names = [table['table'] for table in tables]
+            referencing = outside_references(cursor, names)
+            for table in referencing:
+                cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {table})')
+                if cursor.fetchone()[0]:
+                    raise SnapshotError(
+                        f'Tabel {table} di luar snapshot masih merujuk data yang akan diganti. '
+                        'Kosongkan tabel itu terlebih dahulu.'
+                    )
+            cursor.execute('TRUNCATE ' + ', '.join([quoted(names), *referencing]))
+
+            for table in tables:
+                member = archive.next()
+                if member is None or member.name != table['file']:
+                    raise SnapshotError(f'Arsip tidak lengkap: {table["file"]} tidak ditemukan.')
+                reader = HashingReader(archive.extractfile(member))
+                cursor.copy_expert(
+                    f'COPY {connection.ops.quote_name(table["table"])} ({quoted(table["columns"])}) FROM STDIN',
+                    reader,
+                    CHUNK_SIZE
+                )
+                if reader.sha256.hexdigest() != table['sha256']:
+                    raise SnapshotError(f'Checksum {table["file"]} tidak cocok, arsip rusak.')
+
+            for sql in connection.ops.sequence_reset_sql(no_style(), [models[table['model']] for table in tables]):
+                cursor.execute(sql)
+
+            # Counters only ever grow, so no cached report matches the restored data
+            ReportVersion.objects.update(counter=F('counter') + 1)
+            bump_eskul(*Eskul.objects.values_list('pk', flat=True), lookups=True)
+
+    return manifest
@@ -0,0 +1,158 @@
+"""
+Reading and writing spreadsheets for imports and exports.
+
+CSV goes through the standard library. pandas (and NumPy with it) is only
+imported inside the Excel functions, so a web worker that never handles
+an Excel file never pays its import time or memory.
+
+CSV and NDJSON exports are streamed: rows are encoded as they come from a
+server-side cursor, gzipped on the fly for clients that accept it.
+"""
+import csv
+import io
+import json
+import re
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+EXCEL_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CSV_CONTENT_TYPE = 'text/csv; charset=utf-8'
+STREAM_FORMATS = {'csv': CSV_CONTENT_TYPE, 'ndjson': 'application/x-ndjson'}
+# Encoded rows are sent in pieces of about this many bytes
+STREAM_CHUNK_BYTES = 32 * 1024
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+class UnsupportedFormat(ValueError):
+    pass
+
+def normalize_header(name):
+    return str(name).strip().lower()
+
+def read_rows(file, filename):
+    """
+    Read an uploaded CSV or Excel file. Returns the normalized (stripped,
+    lower-case) header and the rows as dicts of stripped strings, blank
+    cells as ''. Row ``n`` of the result is spreadsheet row ``n + 2``.
+    """
+    name = filename.lower()
+    if name.endswith('.csv'):
+        return read_csv_rows(file)
+    if name.endswith(EXCEL_EXTENSIONS):
+        return read_excel_rows(file)
+    raise UnsupportedFormat('Format file tidak didukung. Gunakan CSV atau Excel.')
+
+def build_rows(header, records):
+    columns = [normalize_header(column) for column in header]
+    return columns, [dict(zip(columns, (str(value).strip() for value in values))) for values in records]
+
+def read_csv_rows(file):
+    # Uploaded files are binary; utf-8-sig drops the BOM Excel writes
+    text = io.TextIOWrapper(getattr(file, 'file', file), encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.reader(text)
+        return build_rows(next(reader, []), reader)
+    except UnicodeDecodeError:
+        raise ValueError('File CSV harus berenkoding UTF-8.')
+    finally:
+        # Keep the upload open for the caller
+        text.detach()
+
+def read_excel_rows(file):
+    import pandas as pd
+
+    df = pd.read_excel(file, dtype=str, keep_default_na=False)
+    return build_rows(df.columns, df.itertuples(index=False, name=None))
+
+def write_csv(output, columns, rows):
+    writer = csv.writer(output)
+    writer.writerow(columns)
+    writer.writerows(rows)
+
+def write_excel(output, sheet_name, columns, rows):
+    import pandas as pd
+
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        pd.DataFrame(rows, columns=columns).to_excel(writer, sheet_name=sheet_name, index=False)
+
+def spreadsheet_response(basename, sheet_name, columns, rows, file_format='xlsx'):
+    """Download response with ``rows`` (lists in ``columns`` order) as an
+    Excel sheet, or as CSV when ``file_format`` is 'csv'."""
+    timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
+    if file_format == 'csv':
+        response = HttpResponse(content_type=CSV_CONTENT_TYPE)
+        write_csv(response, columns, rows)
+    else:
+        response = HttpResponse(content_type=EXCEL_CONTENT_TYPE)
+        write_excel(response, sheet_name, columns, rows)
+    response['Content-Disposition'] = f'attachment; filename="{basename}_{timestamp}.{"csv" if file_format == "csv" else "xlsx"}"'
+    return response
+
+class LineWriter:
+    """File-like object for csv.writer that returns the line instead of
+    keeping it."""
+
+    def write(self, line):
+        return line
+
+def csv_lines(columns, rows):
+    writer = csv.writer(LineWriter())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+def ndjson_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) + '\n'
+
+def encode_chunks(lines):
+    chunk, size = [], 0
+    for line in lines:
+        data = line.encode()
+        chunk.append(data)
+        size += len(data)
+        if size >= STREAM_CHUNK_BYTES:
+            yield b''.join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield b''.join(chunk)
+
+async def iterate_in_thread(chunks):
+    """Feed a sync iterator to ASGI one chunk at a time. Django would read
+    it into a list first; thread_sensitive keeps it on the view's thread
+    and so on the connection its server-side cursor lives on."""
+    next_chunk = sync_to_async(next)
+    try:
+        while (chunk := await next_chunk(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
+
+def response_chunks(request, chunks):
+    """``chunks`` in the form the server of ``request`` can stream."""
+    if isinstance(request, ASGIRequest):
+        return iterate_in_thread(chunks)
+    return chunks
+
+def streaming_response(request, basename, columns, rows, file_format):
+    """Download response streaming ``rows`` (an iterator of lists in
+    ``columns`` order) as CSV or as NDJSON, one object per row keyed by
+    column. ``file_format`` must be one of STREAM_FORMATS."""
+    lines = csv_lines(columns, rows) if file_format == 'csv' else ndjson_lines(columns, rows)
+    chunks = encode_chunks(lines)
+    gzipped = bool(ACCEPTS_GZIP.search(request.headers.get('Accept-Encoding', '')))
+    if gzipped:
+        chunks = compress_sequence(chunks)
+
+    response = StreamingHttpResponse(response_chunks(request, chunks), content_type=STREAM_FORMATS[file_format])
+    if gzipped:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
+    response['Content-Disposition'] = f'attachment; filename="{basename}_{timestamp}.{file_format}"'
+    return response
@@ -1,3 +1,1394 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import zipfile
+from datetime import date, timedelta
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.contrib.admin.models import ADDITION, LogEntry
+from django.contrib.auth.models import Group
+from django.contrib.sessions.models import Session
+from django.db import DEFAULT_DB_ALIAS, connection, connections, IntegrityError, transaction
+from django.template import engines
+from django.db.migrations.loader import MigrationLoader
+from django.test import LiveServerTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from prometheus_client import REGISTRY
+
+from unittest import mock
+
+from accounts.models import CustomUser
+from eskul_project import prefork
+from . import loadtest, metrics, pertemuan_sync, profiling, report_pack
+from . import admin as eskul_admin
+from .matrix import build_attendance_matrix, longest_streak, attendance_trend
+from .models import Eskul, Siswa, Pertemuan, Absensi, AbsensiEditKey, FotoKegiatan, ReportVersion
+from .report_cache import ALL, LOOKUPS, bump_versions, eskul_version, report_versions
+from .db_routing import PIN_COOKIE, REPLICA, ReplicaRouter, use_replica
+from .live import CLOSE_FORBIDDEN, SOCKET_PATH, dashboard_socket
+from .partitioning import DEFAULT_PARTITION, is_partitioned, partition_name, periods, refuse_absensi_changes
+from .pertemuan_sync import upsert_absensi
+from .snapshot import SnapshotError, export_snapshot, import_snapshot
+from .spreadsheets import UnsupportedFormat, read_rows, write_excel
+
+SMALL_SIZE = 3
+LARGE_SIZE = 12
+STATUS_CYCLE = list(Absensi.Status)
+
+
+class QueryCountTestCase(TestCase):
+    """
+    Base class for query-count regression tests.
+
+    Each check runs a request against a small dataset, grows the dataset and
+    runs the request again. The number of queries must stay the same and
+    within the given budget, so per-row queries fail the suite.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        # Report versions are bumped on commit, which TestCase never reaches
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.admin = CustomUser.objects.create_user(
+                username='admin_test', role='admin',
+                nama_lengkap='Admin Test', is_staff=True, is_superuser=True
+            )
+            cls.pelatih = CustomUser.objects.create_user(
+                username='pelatih_a', role='pelatih', nama_lengkap='Pelatih A'
+            )
+            cls.pelatih_b = CustomUser.objects.create_user(
+                username='pelatih_b', role='pelatih', nama_lengkap='Pelatih B'
+            )
+            cls.eskul = Eskul.objects.create(nama_eskul='Eskul A', deskripsi='Eskul uji A', pelatih=cls.pelatih)
+            cls.eskul_b = Eskul.objects.create(nama_eskul='Eskul B', deskripsi='Eskul uji B', pelatih=cls.pelatih_b)
+
+    def setUp(self):
+        self.next_day = 0
+        self.unique_counter = 0
+
+    def unique_name(self, prefix):
+        self.unique_counter += 1
+        return f'{prefix} {self.unique_counter}'
+
+    def seed(self, size):
+        """Add ``size`` coaches, eskul, students and meetings with attendance."""
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(size):
+                coach = CustomUser.objects.create_user(
+                    username=self.unique_name('coach').replace(' ', '_'),
+                    role='pelatih', nama_lengkap=self.unique_name('PELATIH')
+                )
+                extra_eskul = Eskul.objects.create(
+                    nama_eskul=self.unique_name('ESKUL'), deskripsi='Eskul tambahan', pelatih=coach
+                )
+                Siswa.objects.create(nama_siswa=self.unique_name('SISWA'), kelas='6E', eskul=extra_eskul)
+
+            for eskul in (self.eskul, self.eskul_b):
+                Siswa.objects.bulk_create([
+                    Siswa(nama_siswa=self.unique_name('SISWA'), kelas=f'{i % 6 + 1}A', eskul=eskul)
+                    for i in range(size)
+                ])
+
+            for i in range(size):
+                tanggal = date(2025, 1, 6) + timedelta(days=self.next_day)
+                self.next_day += 1
+                for eskul in (self.eskul, self.eskul_b):
+                    pertemuan = Pertemuan.objects.create(
+                        eskul=eskul, tanggal=tanggal, materi_kegiatan='Latihan rutin', pelatih=eskul.pelatih
+                    )
+                    FotoKegiatan.objects.create(pertemuan=pertemuan, foto='kegiatan/test.jpg')
+                    Absensi.objects.bulk_create([
+                        Absensi(
+                            pertemuan=pertemuan,
+                            siswa=siswa,
+                            tanggal=tanggal,
+                            status=STATUS_CYCLE[(siswa.pk + i) % 4]
+                        )
+                        for siswa in eskul.siswa_list.all()
+                    ])
+
+    def count_queries(self, make_request, prepare=None):
+        if prepare is not None:
+            prepare()
+        with CaptureQueriesContext(connection) as context:
+            response = make_request()
+        self.assertLess(response.status_code, 400)
+        return response, len(context.captured_queries)
+
+    def assertFlatQueries(self, make_request, max_queries, prepare=None):
+        """
+        Run ``make_request`` on a small and on a large dataset and check that
+        the number of queries does not grow and stays within ``max_queries``.
+        ``prepare`` runs before each measured request and is not counted.
+        """
+        self.seed(SMALL_SIZE)
+        _, small_count = self.count_queries(make_request, prepare)
+        self.seed(LARGE_SIZE - SMALL_SIZE)
+        response, large_count = self.count_queries(make_request, prepare)
+
+        self.assertEqual(
+            small_count, large_count,
+            f'Query count grew with the data: {small_count} queries on the small '
+            f'dataset, {large_count} on the large one.'
+        )
+        self.assertLessEqual(large_count, max_queries)
+        return response
+
+
+class AdminViewQueryCountTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def test_dashboard(self):
+        self.assertFlatQueries(lambda: self.client.get(reverse('dashboard')), 8)
+
+    def test_manage_students(self):
+        self.assertFlatQueries(lambda: self.client.get(reverse('admin_manage_students')), 6)
+
+    def test_import_students_form(self):
+        self.assertFlatQueries(lambda: self.client.get(reverse('admin_import_students')), 4)
+
+    def test_import_students_preview(self):
+        def upload():
+            existing = Siswa.objects.filter(eskul=self.eskul).values_list('nama_siswa', 'kelas')
+            rows = [f'{nama},{kelas}' for nama, kelas in existing]
+            rows += [f'{self.unique_name("BARU")},1B' for _ in existing]
+            csv_file = SimpleUploadedFile(
+                'siswa.csv', ('nama_siswa,kelas\n' + '\n'.join(rows)).encode(), content_type='text/csv'
+            )
+            return self.client.post(
+                reverse('admin_import_students'), {'file': csv_file, 'eskul_id': self.eskul_b.pk}
+            )
+
+        response = self.assertFlatQueries(upload, 9)
+        self.assertEqual(response.context['total_new'], response.context['total_existing'])
+
+    def test_import_students_confirm(self):
+        def prepare():
+            jumlah = Siswa.objects.filter(eskul=self.eskul).count()
+            session = self.client.session
+            session['import_data'] = {
+                'eskul_id': self.eskul_b.pk,
+                'eskul_name': self.eskul_b.nama_eskul,
+                'new_students': [
+                    {'nama_siswa': self.unique_name('IMPORT'), 'kelas': '2C'} for _ in range(jumlah)
+                ],
+                'existing_students': [],
+            }
+            session.save()
+
+        def confirm():
+            return self.client.post(reverse('admin_import_students'), {'confirm_import': '1'})
+
+        response = self.assertFlatQueries(confirm, 12, prepare)
+        self.assertRedirects(response, reverse('admin_manage_students'), fetch_redirect_response=False)
+
+    def test_attendance_report(self):
+        self.assertFlatQueries(lambda: self.client.get(reverse('admin_attendance_report')), 7)
+
+    def test_attendance_report_filtered(self):
+        url = reverse('admin_attendance_report')
+        self.assertFlatQueries(
+            lambda: self.client.get(url, {'eskul': self.eskul.pk, 'kelas': '1A', 'attendance_filter': 'baik'}), 7
+        )
+
+    def test_pertemuan_report(self):
+        self.assertFlatQueries(lambda: self.client.get(reverse('admin_pertemuan_report')), 8)
+
+    def test_pertemuan_report_filtered(self):
+        url = reverse('admin_pertemuan_report')
+        params = {'eskul': self.eskul.pk, 'pelatih': self.pelatih.pk, 'start_date': '2025-01-01', 'end_date': '2025-12-31'}
+        self.assertFlatQueries(lambda: self.client.get(url, params), 8)
+
+    def test_export_attendance(self):
+        url = reverse('export_attendance_excel')
+        params = {'eskul': self.eskul.pk, 'start_date': '2025-01-01', 'end_date': '2025-12-31'}
+        self.assertFlatQueries(lambda: self.client.get(url, params), 3)
+
+    def test_export_pertemuan(self):
+        self.assertFlatQueries(lambda: self.client.get(reverse('export_pertemuan_excel')), 4)
+
+    def test_streamed_export_pertemuan(self):
+        def make_request():
+            response = self.client.get(reverse('export_pertemuan_excel'), {'format': 'ndjson'})
+            # The rows are only read from the cursor while the body streams
+            b''.join(response.streaming_content)
+            return response
+        self.assertFlatQueries(make_request, 4)
+
+    def test_attendance_matrix(self):
+        url = reverse('attendance_matrix')
+        response = self.assertFlatQueries(lambda: self.client.get(url, {'eskul': self.eskul.pk}), 7)
+        self.assertEqual(len(response.context['rows']), LARGE_SIZE)
+
+    def test_export_attendance_matrix(self):
+        url = reverse('export_attendance_matrix')
+        self.assertFlatQueries(lambda: self.client.get(url, {'eskul': self.eskul.pk}), 6)
+
+    def test_transfer_form(self):
+        self.assertFlatQueries(lambda: self.client.get(reverse('admin_transfer_siswa')), 5)
+
+    def test_transfer_preview(self):
+        def transfer():
+            siswa = Siswa.objects.filter(eskul=self.eskul).order_by('pk').first()
+            return self.client.post(
+                reverse('admin_transfer_siswa'), {'siswa_id': siswa.pk, 'eskul_tujuan_id': self.eskul_b.pk}
+            )
+
+        response = self.assertFlatQueries(transfer, 12)
+        self.assertGreater(response.context['bisa_dikonversi'], 0)
+
+    def test_transfer_confirm(self):
+        def prepare():
+            siswa = Siswa.objects.filter(eskul=self.eskul).order_by('pk').first()
+            self.client.post(
+                reverse('admin_transfer_siswa'), {'siswa_id': siswa.pk, 'eskul_tujuan_id': self.eskul_b.pk}
+            )
+
+        def confirm():
+            return self.client.post(reverse('admin_confirm_transfer'))
+
+        response = self.assertFlatQueries(confirm, 14, prepare)
+        self.assertRedirects(response, reverse('admin_manage_students'), fetch_redirect_response=False)
+
+
+class PelatihViewQueryCountTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.pelatih)
+
+    def test_dashboard(self):
+        self.assertFlatQueries(lambda: self.client.get(reverse('dashboard')), 7)
+
+    def test_students(self):
+        self.assertFlatQueries(lambda: self.client.get(reverse('pelatih_students')), 5)
+
+    def test_students_filtered(self):
+        url = reverse('pelatih_students')
+        self.assertFlatQueries(
+            lambda: self.client.get(url, {'kelas': '1A', 'search': 'SISWA', 'attendance_filter': 'alpha'}), 5
+        )
+
+    def test_create_pertemuan_form(self):
+        self.assertFlatQueries(lambda: self.client.get(reverse('pelatih_create_pertemuan')), 4)
+
+    def test_create_pertemuan_submit(self):
+        def submit():
+            tanggal = date(2026, 1, 5) + timedelta(days=self.unique_counter)
+            self.unique_counter += 1
+            data = {'tanggal': tanggal.isoformat(), 'materi_kegiatan': 'Latihan dasar'}
+            for siswa in Siswa.objects.filter(eskul=self.eskul):
+                data[f'absensi_{siswa.pk}'] = 'hadir'
+            return self.client.post(reverse('pelatih_create_pertemuan'), data)
+
+        response = self.assertFlatQueries(submit, 12)
+        self.assertRedirects(response, reverse('pelatih_history_pertemuan'), fetch_redirect_response=False)
+
+    def test_history_pertemuan(self):
+        self.assertFlatQueries(lambda: self.client.get(reverse('pelatih_history_pertemuan')), 8)
+
+    def test_attendance_matrix(self):
+        self.assertFlatQueries(lambda: self.client.get(reverse('attendance_matrix')), 6)
+
+
+class DjangoAdminQueryCountTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def test_changelists(self):
+        for model, budget in [('absensi', 5), ('siswa', 7), ('pertemuan', 9), ('fotokegiatan', 8), ('eskul', 5)]:
+            with self.subTest(model=model):
+                url = reverse(f'admin:eskul_{model}_changelist')
+                self.assertFlatQueries(lambda: self.client.get(url), budget)
+
+    def test_absensi_change_form(self):
+        # Siswa and pertemuan are autocomplete widgets, not full dropdowns
+        def prepare():
+            self.change_url = reverse('admin:eskul_absensi_change', args=[Absensi.objects.order_by('pk').first().pk])
+            # Content types are cached after the first visit
+            self.client.get(self.change_url)
+
+        self.assertFlatQueries(lambda: self.client.get(self.change_url), 7, prepare=prepare)
+
+    def test_estimated_count_paginator(self):
+        self.seed(SMALL_SIZE)
+        queryset = Absensi.objects.order_by('pk')
+        self.assertEqual(eskul_admin.EstimatedCountPaginator(queryset, 10).count, queryset.count())
+        with mock.patch.object(eskul_admin, 'EXACT_COUNT_LIMIT', 5), CaptureQueriesContext(connection) as context:
+            estimate = eskul_admin.EstimatedCountPaginator(queryset, 10).count
+        # Bounded count first, then the planner's estimate
+        self.assertEqual(len(context), 2)
+        self.assertTrue(context[1]['sql'].startswith('EXPLAIN'))
+        self.assertGreater(estimate, 5)
+
+
+class IndexAdvisorTests(QueryCountTestCase):
+    def counts(self):
+        return [model.objects.count() for model in (CustomUser, Eskul, Siswa, Pertemuan, Absensi)]
+
+    def test_seeded_reports_are_explained_and_rolled_back(self):
+        Eskul.objects.create(nama_eskul='Tanpa Pelatih', deskripsi='Belum ada pelatih')
+        before = self.counts()
+        output = io.StringIO()
+        call_command('index_advisor', '--seed', '4', '--pertemuan', '3', '--min-rows', '1', stdout=output)
+        output = output.getvalue()
+
+        jumlah_eskul = before[1]
+        self.assertIn(f'Data contoh: {jumlah_eskul * 4} siswa, {jumlah_eskul * 3} pertemuan.', output)
+        for label in ('Laporan kehadiran', 'Laporan pertemuan per pelatih & tanggal', 'Absensi per rentang tanggal'):
+            self.assertRegex(output, rf'{label}: [\d.]+ ms')
+        self.assertEqual(self.counts(), before)
+        self.assertFalse(CustomUser.objects.filter(username__startswith='advisor_pelatih_').exists())
+
+
+class AbsensiStatusTests(QueryCountTestCase):
+    def test_public_labels(self):
+        self.assertEqual(Absensi.Status.from_kode('sakit'), Absensi.Status.SAKIT)
+        self.assertEqual(Absensi.Status.IZIN.kode, 'izin')
+        with self.assertRaises(ValueError):
+            Absensi.Status.from_kode('bolos')
+
+    def test_check_constraint_rejects_unknown_status(self):
+        siswa = Siswa.objects.create(nama_siswa='SISWA STATUS', kelas='1A', eskul=self.eskul)
+        pertemuan = Pertemuan.objects.create(
+            eskul=self.eskul, tanggal=date(2025, 3, 3), materi_kegiatan='Latihan', pelatih=self.pelatih
+        )
+        with self.assertRaises(IntegrityError):
+            Absensi.objects.create(pertemuan=pertemuan, siswa=siswa, status=9)
+
+
+class AttendanceMatrixTests(QueryCountTestCase):
+    def test_longest_streak(self):
+        mask = np.array([
+            [1, 1, 0, 1, 1, 1, 0],
+            [0, 0, 0, 0, 0, 0, 0],
+            [1, 1, 1, 1, 1, 1, 1],
+        ], dtype=bool)
+        self.assertEqual(longest_streak(mask).tolist(), [3, 0, 7])
+
+    def test_attendance_trend(self):
+        hadir = np.array([[0, 0, 1, 1], [1, 1, 1, 1], [1, 0, 0, 0]], dtype=float)
+        recorded = np.array([[1, 1, 1, 1], [1, 1, 1, 1], [1, 1, 0, 0]], dtype=bool)
+        trend = attendance_trend(hadir, recorded)
+        self.assertAlmostEqual(trend[0], 40.0)
+        self.assertAlmostEqual(trend[1], 0.0)
+        self.assertAlmostEqual(trend[2], -100.0)
+
+    def test_invalid_eskul_parameter(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('attendance_matrix'), {'eskul': 'abc'})
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        response = self.client.get(reverse('export_attendance_matrix'), {'eskul': 'abc'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_grid_matches_records(self):
+        siswa_a = Siswa.objects.create(nama_siswa='ANI', kelas='1A', eskul=self.eskul)
+        siswa_b = Siswa.objects.create(nama_siswa='BUDI', kelas='1B', eskul=self.eskul)
+        pertemuan = [
+            Pertemuan.objects.create(eskul=self.eskul, tanggal=date(2025, 2, day), materi_kegiatan='x', pelatih=self.pelatih)
+            for day in (3, 10, 17)
+        ]
+        Absensi.objects.bulk_create([
+            Absensi(pertemuan=pertemuan[0], siswa=siswa_a, tanggal=pertemuan[0].tanggal, status=Absensi.Status.HADIR),
+            Absensi(pertemuan=pertemuan[1], siswa=siswa_a, tanggal=pertemuan[1].tanggal, status=Absensi.Status.ALPHA),
+            Absensi(pertemuan=pertemuan[2], siswa=siswa_a, tanggal=pertemuan[2].tanggal, status=Absensi.Status.ALPHA),
+            Absensi(pertemuan=pertemuan[0], siswa=siswa_b, tanggal=pertemuan[0].tanggal, status=Absensi.Status.SAKIT),
+        ])
+
+        matrix = build_attendance_matrix(self.eskul)
+
+        self.assertEqual(matrix['grid'].tolist(), [[1, 4, 4], [2, 0, 0]])
+        self.assertEqual(matrix['siswa_totals'].tolist(), [[1, 0, 0, 2], [0, 1, 0, 0]])
+        self.assertEqual(matrix['pertemuan_totals'][:, 0].tolist(), [1, 0, 0])
+        self.assertEqual(matrix['alpha_beruntun'].tolist(), [2, 0])
+
+
+class AbsensiPartitionTests(QueryCountTestCase):
+    def test_academic_year_periods(self):
+        bounds = list(periods(date(2025, 3, 1), date(2025, 8, 1), 'tahun_ajaran'))
+        self.assertEqual(bounds, [
+            (date(2024, 7, 1), date(2025, 7, 1)),
+            (date(2025, 7, 1), date(2026, 7, 1)),
+        ])
+        self.assertEqual(partition_name(bounds[0][0], 'tahun_ajaran'), 'eskul_absensi_2024_2025')
+
+    def test_semester_periods(self):
+        bounds = list(periods(date(2025, 3, 1), date(2025, 8, 1), 'semester'))
+        self.assertEqual(bounds, [
+            (date(2025, 1, 1), date(2025, 7, 1)),
+            (date(2025, 7, 1), date(2026, 1, 1)),
+        ])
+        self.assertEqual(
+            [partition_name(start, 'semester') for start, _ in bounds],
+            ['eskul_absensi_2024_2025_s2', 'eskul_absensi_2025_2026_s1']
+        )
+
+    def test_tanggal_follows_pertemuan(self):
+        pertemuan = Pertemuan.objects.create(
+            eskul=self.eskul, tanggal=date(2025, 2, 3), materi_kegiatan='x', pelatih=self.pelatih
+        )
+        siswa = Siswa.objects.create(nama_siswa='ANI', kelas='1A', eskul=self.eskul)
+        absensi = Absensi.objects.create(pertemuan=pertemuan, siswa=siswa)
+        self.assertEqual(absensi.tanggal, date(2025, 2, 3))
+
+        pertemuan.tanggal = date(2025, 8, 4)
+        pertemuan.save()
+        absensi.refresh_from_db()
+        self.assertEqual(absensi.tanggal, date(2025, 8, 4))
+
+
+@override_settings(ABSENSI_PARTITION_INTERVAL='semester')
+class AbsensiPartitionDdlTests(TransactionTestCase):
+    def setUp(self):
+        self.addCleanup(self.unpartition)
+        pelatih = CustomUser.objects.create_user(username='pelatih_partisi', role='pelatih')
+        self.eskul = Eskul.objects.create(nama_eskul='Partisi', deskripsi='Partisi', pelatih=pelatih)
+        self.siswa = [Siswa.objects.create(nama_siswa=f'SISWA {i}', kelas='1A', eskul=self.eskul) for i in range(3)]
+        for tanggal in (date(2024, 9, 2), date(2025, 2, 3), date.today()):
+            pertemuan = Pertemuan.objects.create(
+                eskul=self.eskul, tanggal=tanggal, materi_kegiatan='Latihan', pelatih=pelatih
+            )
+            Absensi.objects.bulk_create([
+                Absensi(pertemuan=pertemuan, siswa=siswa, tanggal=tanggal) for siswa in self.siswa
+            ])
+
+    def unpartition(self):
+        with connection.cursor() as cursor:
+            if is_partitioned(cursor):
+                call_command('partition_absensi', '--undo', stdout=io.StringIO())
+
+    def rows(self):
+        return sorted(Absensi.objects.values_list('id', 'pertemuan_id', 'siswa_id', 'tanggal', 'status'))
+
+    def partitioned(self):
+        with connection.cursor() as cursor:
+            return is_partitioned(cursor)
+
+    def test_partition_and_back(self):
+        before = self.rows()
+        call_command('partition_absensi', stdout=io.StringIO())
+        self.assertTrue(self.partitioned())
+        self.assertEqual(self.rows(), before)
+
+        # The id sequence continues after the copied rows
+        later = Pertemuan.objects.create(
+            eskul=self.eskul, tanggal=date.today() + timedelta(days=3 * 365), materi_kegiatan='Nanti',
+            pelatih=self.eskul.pelatih
+        )
+        absensi = Absensi.objects.create(pertemuan=later, siswa=self.siswa[0])
+        self.assertGreater(absensi.pk, max(row[0] for row in before))
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {DEFAULT_PARTITION}')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+        # Moves the row out of the default partition before attaching
+        call_command('create_absensi_partitions', '--ahead', '8', stdout=io.StringIO())
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {DEFAULT_PARTITION}')
+            self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertIn((absensi.pk, later.pk, self.siswa[0].pk, later.tanggal, absensi.status), self.rows())
+
+        # The upsert follows the table, not the setting
+        with self.settings(ABSENSI_PARTITION_INTERVAL=None):
+            result = upsert_absensi(later, {str(self.siswa[1].pk): Absensi.Status.HADIR}, self.siswa)
+        self.assertEqual(result.ditambah, 1)
+
+        after = self.rows()
+        call_command('partition_absensi', '--undo', stdout=io.StringIO())
+        self.assertFalse(self.partitioned())
+        self.assertEqual(self.rows(), after)
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Absensi._meta.db_table)
+        self.assertTrue(any(
+            info['unique'] and info['columns'] == ['pertemuan_id', 'siswa_id'] for info in constraints.values()
+        ))
+
+    def test_migrations_altering_absensi_are_refused(self):
+        migration = MigrationLoader(connection).get_migration('eskul', '0014_change_timestamps')
+        refuse_absensi_changes(plan=[(migration, True)], using=DEFAULT_DB_ALIAS)
+        call_command('partition_absensi', stdout=io.StringIO())
+        with self.assertRaisesMessage(CommandError, 'partition_absensi --undo'):
+            refuse_absensi_changes(plan=[(migration, True)], using=DEFAULT_DB_ALIAS)
+
+    def test_setting_is_required(self):
+        with self.settings(ABSENSI_PARTITION_INTERVAL=None), self.assertRaises(CommandError):
+            call_command('partition_absensi')
+        with self.assertRaisesMessage(CommandError, 'partition_absensi'):
+            call_command('create_absensi_partitions')
+
+
+class SnapshotTests(QueryCountTestCase):
+    def test_round_trip(self):
+        self.seed(SMALL_SIZE)
+        expected = sorted(Absensi.objects.values_list('pertemuan_id', 'siswa_id', 'status'))
+
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, 'snapshot.tar.gz')
+            manifest = export_snapshot(path)
+            self.assertEqual(manifest['tables'][0]['table'], 'accounts_customuser')
+
+            Absensi.objects.all().delete()
+            Siswa.objects.all().delete()
+            import_snapshot(path)
+
+        self.assertEqual(sorted(Absensi.objects.values_list('pertemuan_id', 'siswa_id', 'status')), expected)
+        # Sequences continue after the restored ids
+        siswa = Siswa.objects.create(nama_siswa='BARU', kelas='1A', eskul=self.eskul)
+        self.assertGreater(siswa.pk, max(Absensi.objects.values_list('siswa_id', flat=True)))
+
+    def test_keeps_group_links_and_admin_log(self):
+        group = Group.objects.create(name='Koordinator')
+        self.pelatih.groups.add(group)
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, 'snapshot.tar.gz')
+            manifest = export_snapshot(path)
+            self.assertIn('accounts_customuser_groups', [table['table'] for table in manifest['tables']])
+
+            self.pelatih.groups.clear()
+            import_snapshot(path)
+            self.assertEqual(list(self.pelatih.groups.all()), [group])
+
+            LogEntry.objects.log_actions(
+                self.admin.pk, [self.eskul], ADDITION, single_object=True
+            )
+            with self.assertRaisesMessage(SnapshotError, 'django_admin_log'):
+                import_snapshot(path)
+            self.assertEqual(LogEntry.objects.count(), 1)
+
+    def test_rejects_non_snapshot_archive(self):
+        with tempfile.NamedTemporaryFile(suffix='.tar.gz') as file:
+            with tarfile.open(file.name, 'w:gz'):
+                pass
+            with self.assertRaises(SnapshotError):
+                import_snapshot(file.name)
+
+
+class AsyncViewTests(QueryCountTestCase):
+    async def test_admin_dashboard_counts(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_eskul'], await Eskul.objects.acount())
+        self.assertEqual(response.context['total_pelatih'], 2)
+
+    async def test_pelatih_dashboard_lists_own_eskul(self):
+        await self.async_client.aforce_login(self.pelatih)
+        response = await self.async_client.get(reverse('dashboard'))
+        self.assertEqual(response.context['my_eskul_count'], 1)
+        self.assertEqual(response.context['my_eskul_list'][0].pk, self.eskul.pk)
+
+    async def test_reports_reject_pelatih(self):
+        await self.async_client.aforce_login(self.pelatih)
+        for name in ('admin_attendance_report', 'admin_pertemuan_report'):
+            response = await self.async_client.get(reverse(name))
+            self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+
+
+class LiveDashboardTests(QueryCountTestCase):
+    async def open_socket(self, user, origin='http://testserver'):
+        await self.async_client.aforce_login(user)
+        cookie = f'sessionid={self.async_client.cookies["sessionid"].value}'
+        scope = {
+            'type': 'websocket',
+            'path': SOCKET_PATH,
+            'headers': [(b'host', b'testserver'), (b'origin', origin.encode()), (b'cookie', cookie.encode())],
+        }
+        events = [{'type': 'websocket.connect'}, {'type': 'websocket.disconnect', 'code': 1000}]
+        sent = []
+
+        async def receive():
+            return events.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        await dashboard_socket(scope, receive, send)
+        return sent
+
+    async def test_admin_is_accepted(self):
+        sent = await self.open_socket(self.admin)
+        self.assertEqual(sent, [{'type': 'websocket.accept'}])
+
+    async def test_pelatih_is_rejected(self):
+        sent = await self.open_socket(self.pelatih)
+        self.assertEqual(sent, [{'type': 'websocket.close', 'code': CLOSE_FORBIDDEN}])
+
+    async def test_other_origin_is_rejected(self):
+        sent = await self.open_socket(self.admin, origin='http://example.com')
+        self.assertEqual(sent, [{'type': 'websocket.close', 'code': CLOSE_FORBIDDEN}])
+
+
+class ConditionalReportTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seed(SMALL_SIZE)
+
+    def revalidate(self, url):
+        # Sets the CSRF cookie, as the login page would have
+        self.client.get(url)
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('private', first['Cache-Control'])
+        with CaptureQueriesContext(connection) as context:
+            second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        return first, second, context
+
+    def test_unchanged_report_returns_304(self):
+        self.client.force_login(self.admin)
+        for name in ('admin_attendance_report', 'admin_pertemuan_report'):
+            first, second, context = self.revalidate(reverse(name))
+            self.assertEqual(second.status_code, 304)
+            self.assertEqual(second['ETag'], first['ETag'])
+            # Session, user and the version query only
+            self.assertLessEqual(len(context), 3)
+
+    def test_history_changes_with_attendance(self):
+        self.client.force_login(self.pelatih)
+        url = reverse('pelatih_history_pertemuan')
+        first, second, _ = self.revalidate(url)
+        self.assertEqual(second.status_code, 304)
+
+        absensi = Absensi.objects.filter(pertemuan__eskul=self.eskul).first()
+        absensi.status = Absensi.Status.IZIN
+        absensi.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_deleted_meeting_changes_etag(self):
+        self.client.force_login(self.admin)
+        url = reverse('admin_pertemuan_report')
+        first = self.client.get(url)
+        Pertemuan.objects.filter(eskul=self.eskul).order_by('tanggal').first().delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_redirect_has_no_etag(self):
+        self.client.force_login(self.pelatih)
+        response = self.client.get(reverse('admin_attendance_report'))
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class ReportCacheTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seed(SMALL_SIZE)
+        cache.clear()
+
+    def report_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(context)
+
+    def test_repeated_report_is_served_from_cache(self):
+        self.client.force_login(self.admin)
+        for name in ('admin_attendance_report', 'admin_pertemuan_report'):
+            url = reverse(name) + f'?eskul={self.eskul.pk}'
+            _, miss = self.report_queries(url)
+            _, hit = self.report_queries(url)
+            self.assertLess(hit, miss)
+
+    def test_attendance_change_invalidates_report(self):
+        self.client.force_login(self.admin)
+        url = reverse('admin_attendance_report') + f'?eskul={self.eskul.pk}'
+        self.report_queries(url)
+        before = report_versions(eskul_version(self.eskul.pk), ALL)
+
+        absensi = Absensi.objects.filter(pertemuan__eskul=self.eskul, status=Absensi.Status.HADIR).first()
+        absensi.status = Absensi.Status.ALPHA
+        with self.captureOnCommitCallbacks(execute=True):
+            absensi.save()
+            # Bumped on commit only
+            self.assertEqual(report_versions(ALL), {ALL: before[ALL]})
+        after = report_versions(eskul_version(self.eskul.pk), ALL)
+        self.assertEqual(after[ALL], before[ALL] + 1)
+        self.assertEqual(after[eskul_version(self.eskul.pk)], before[eskul_version(self.eskul.pk)] + 1)
+
+        response, _ = self.report_queries(url)
+        row = next(row for row in response.context['attendance_data'] if row['siswa'].pk == absensi.siswa_id)
+        self.assertEqual(
+            row['hadir'],
+            Absensi.objects.filter(siswa=absensi.siswa, status=Absensi.Status.HADIR).count()
+        )
+
+    def test_new_student_refreshes_lookups(self):
+        before = report_versions(LOOKUPS)[LOOKUPS]
+        with self.captureOnCommitCallbacks(execute=True):
+            Siswa.objects.create(nama_siswa='Baru', kelas='XII-Z', eskul=self.eskul)
+        self.assertEqual(report_versions(LOOKUPS)[LOOKUPS], before + 1)
+
+        self.client.force_login(self.admin)
+        response, _ = self.report_queries(reverse('admin_attendance_report'))
+        self.assertIn('XII-Z', response.context['kelas_list'])
+
+    def test_one_bump_per_transaction(self):
+        absensi_list = list(Absensi.objects.all()[:6])
+        before = report_versions(ALL)[ALL]
+        with CaptureQueriesContext(connection) as context:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                for absensi in absensi_list:
+                    absensi.save()
+                # Neither the meeting nor the student is fetched per row
+                self.assertEqual(len(context), len(absensi_list))
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(report_versions(ALL)[ALL], before + 1)
+        bumps = [query for query in context.captured_queries if 'eskul_reportversion' in query['sql']]
+        self.assertEqual(len(bumps), 1)
+
+    def test_rolled_back_savepoint_starts_new_bump(self):
+        before = report_versions(ALL)[ALL]
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                Siswa.objects.create(nama_siswa='Batal', kelas='1A', eskul=self.eskul)
+                raise IntegrityError
+            Siswa.objects.create(nama_siswa='Jadi', kelas='1A', eskul=self.eskul)
+        self.assertEqual(report_versions(ALL)[ALL], before + 1)
+
+    def test_bump_versions_creates_and_increments(self):
+        bump_versions('uji', 'uji-lain')
+        bump_versions('uji')
+        self.assertEqual(ReportVersion.objects.get(name='uji').counter, 2)
+        self.assertEqual(report_versions('uji-lain', 'tidak-ada'), {'uji-lain': 1, 'tidak-ada': 0})
+
+
+class SpreadsheetTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seed(SMALL_SIZE)
+        self.client.force_login(self.admin)
+
+    def test_worker_boot_does_not_import_pandas(self):
+        script = (
+            'import sys, django; django.setup(); '
+            'from django.urls import get_resolver; get_resolver().url_patterns; '
+            'print(sorted(m for m in ("pandas", "numpy") if m in sys.modules))'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', script], capture_output=True, text=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'eskul_project.settings'}
+        )
+        self.assertEqual(result.stdout.strip(), '[]', result.stderr)
+
+    def test_csv_export(self):
+        response = self.client.get(reverse('export_attendance_excel'), {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('.csv"', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith('Nama Siswa,Kelas,Eskul'))
+        self.assertEqual(len(lines) - 1, Siswa.objects.filter(is_active=True).count())
+
+    def test_ndjson_export(self):
+        response = self.client.get(reverse('export_pertemuan_excel'), {'format': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(rows), Pertemuan.objects.count())
+        latest = Pertemuan.objects.latest('tanggal')
+        self.assertEqual(rows[0]['Tanggal'], latest.tanggal.isoformat())
+        self.assertEqual(rows[0]['Jumlah Foto'], latest.foto_list.count())
+
+    def test_gzip_export(self):
+        url = reverse('export_attendance_excel')
+        plain = b''.join(self.client.get(url, {'format': 'csv'}).streaming_content)
+        response = self.client.get(url, {'format': 'csv'}, headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), plain)
+
+    async def test_asgi_export_streams_without_buffering(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(reverse('export_attendance_excel'), {'format': 'ndjson'})
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(body.splitlines()), await Siswa.objects.filter(is_active=True).acount())
+
+    def test_report_pack(self):
+        response = self.client.get(reverse('export_report_pack'), {'start_date': '2025-01-01'})
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        eskul_count = Eskul.objects.filter(is_active=True).count()
+        self.assertEqual(len(archive.namelist()), eskul_count * 2)
+
+        folder = report_pack.folder_name(self.eskul)
+        _, rows = read_rows(io.BytesIO(archive.read(f'{folder}/laporan_kehadiran.xlsx')), 'laporan.xlsx')
+        self.assertEqual(len(rows), Siswa.objects.filter(eskul=self.eskul, is_active=True).count())
+        _, rows = read_rows(io.BytesIO(archive.read(f'{folder}/laporan_pertemuan.xlsx')), 'laporan.xlsx')
+        self.assertEqual(len(rows), Pertemuan.objects.filter(eskul=self.eskul).count())
+
+    def test_report_pack_rejects_bad_dates(self):
+        response = self.client.get(reverse('export_report_pack'), {'end_date': '31-12-2025'})
+        self.assertEqual(response.status_code, 400)
+        self.client.force_login(self.pelatih)
+        self.assertEqual(self.client.get(reverse('export_report_pack')).status_code, 403)
+
+    def test_excel_round_trip(self):
+        buffer = io.BytesIO()
+        write_excel(buffer, 'Siswa', ['Nama Siswa', 'Kelas'], [['ANI', '1A'], ['BUDI', '2B']])
+        buffer.seek(0)
+        columns, rows = read_rows(buffer, 'siswa.xlsx')
+        self.assertEqual(columns, ['nama siswa', 'kelas'])
+        self.assertEqual(rows, [{'nama siswa': 'ANI', 'kelas': '1A'}, {'nama siswa': 'BUDI', 'kelas': '2B'}])
+
+    def test_csv_with_bom(self):
+        upload = SimpleUploadedFile('siswa.csv', '\ufeffNama,Kelas\n ani , 1a \n'.encode())
+        self.assertEqual(read_rows(upload, upload.name), (['nama', 'kelas'], [{'nama': 'ani', 'kelas': '1a'}]))
+        with self.assertRaises(UnsupportedFormat):
+            read_rows(upload, 'siswa.pdf')
+
+
+class ReportPackPoolTests(TransactionTestCase):
+    def test_workbooks_built_in_worker_processes(self):
+        for name in ('Basket', 'Paskibra', 'Pramuka'):
+            eskul = Eskul.objects.create(nama_eskul=name, deskripsi=name)
+            Siswa.objects.create(nama_siswa=f'SISWA {name}', kelas='7A', eskul=eskul)
+        Eskul.objects.create(nama_eskul='Lama', deskripsi='Lama', is_active=False)
+        admin = CustomUser.objects.create_user(username='admin_paket', role='admin')
+        self.client.force_login(admin)
+
+        report_pack.discard_pool()
+        self.addCleanup(report_pack.discard_pool)
+        with self.settings(REPORT_PACK_WORKERS=2), mock.patch.object(
+            report_pack, 'ProcessPoolExecutor', wraps=report_pack.ProcessPoolExecutor
+        ) as pool:
+            # A second download while the first is still streaming shares its pool
+            first = iter(self.client.get(reverse('export_report_pack')).streaming_content)
+            first_start = next(first)
+            second = b''.join(self.client.get(reverse('export_report_pack')).streaming_content)
+            archives = [
+                zipfile.ZipFile(io.BytesIO(data)) for data in (first_start + b''.join(first), second)
+            ]
+        self.assertEqual(pool.call_count, 1)
+        self.assertEqual(pool.call_args.args[0], 2)
+        for archive in archives:
+            self.assertEqual(
+                sorted(name.split('/')[0] for name in archive.namelist() if name.endswith('kehadiran.xlsx')),
+                sorted(report_pack.folder_name(eskul) for eskul in Eskul.objects.filter(is_active=True))
+            )
+
+
+class MediaGcTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings = self.settings(MEDIA_ROOT=media_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.media_root = media_root.name
+
+        pertemuan = Pertemuan.objects.create(
+            eskul=self.eskul, tanggal=date(2025, 3, 3), materi_kegiatan='Latihan', pelatih=self.pelatih
+        )
+        FotoKegiatan.objects.create(pertemuan=pertemuan, foto='kegiatan/dipakai.jpg')
+        self.pelatih.foto_profil = 'profil/pelatih.jpg'
+        self.pelatih.save()
+        self.old_files = [
+            'kegiatan/dipakai.jpg', 'kegiatan/yatim.jpg', 'kegiatan/lama/yatim.jpg',
+            'profil/pelatih.jpg', 'profil/yatim.jpg',
+        ]
+        for name in self.old_files:
+            self.write_file(name, age_hours=48)
+        self.write_file('kegiatan/baru.jpg', age_hours=1)
+
+    def write_file(self, name, age_hours):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'x' * 10)
+        mtime = time.time() - age_hours * 3600
+        os.utime(path, (mtime, mtime))
+
+    def remaining(self, root=None):
+        root = root or self.media_root
+        return sorted(
+            os.path.relpath(os.path.join(directory, name), root).replace(os.sep, '/')
+            for directory, _, files in os.walk(root) for name in files
+        )
+
+    def collect(self, *args):
+        output = io.StringIO()
+        call_command('collect_orphan_media', *args, stdout=output)
+        return output.getvalue()
+
+    def test_dry_run_only_lists(self):
+        output = self.collect('--dry-run')
+        for name in ('kegiatan/yatim.jpg', 'kegiatan/lama/yatim.jpg', 'profil/yatim.jpg'):
+            self.assertIn(name, output)
+        self.assertIn('3 dari 6 file', output)
+        self.assertEqual(len(self.remaining()), 6)
+
+    def test_removes_unreferenced_files(self):
+        self.collect()
+        self.assertEqual(self.remaining(), ['kegiatan/baru.jpg', 'kegiatan/dipakai.jpg', 'profil/pelatih.jpg'])
+
+    def test_quarantine(self):
+        quarantine = tempfile.TemporaryDirectory()
+        self.addCleanup(quarantine.cleanup)
+        self.collect('--quarantine', quarantine.name)
+        self.assertEqual(
+            self.remaining(quarantine.name), ['kegiatan/lama/yatim.jpg', 'kegiatan/yatim.jpg', 'profil/yatim.jpg']
+        )
+        with self.assertRaises(CommandError):
+            self.collect('--quarantine', os.path.join(self.media_root, 'karantina'))
+
+    def test_names_are_looked_up_in_chunks(self):
+        # One query per upload field per chunk, never one per file
+        with CaptureQueriesContext(connection) as context:
+            self.collect('--chunk-size', '2', '--dry-run')
+        self.assertLessEqual(len(context.captured_queries), 4)
+
+
+class ReplicaRoutingTests(QueryCountTestCase):
+    # The replica is a test mirror: a second connection to the test database
+    # that cannot see the uncommitted test rows, so only routing is checked
+    databases = {'default', REPLICA}
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        settings = self.settings(READ_REPLICA=True)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def queries(self, make_request):
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = make_request()
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400)
+        eskul_queries = [query['sql'] for query in primary.captured_queries if '"eskul_' in query['sql']]
+        return eskul_queries, replica.captured_queries
+
+    def test_reports_read_the_replica(self):
+        self.client.force_login(self.admin)
+        for url in (reverse('admin_attendance_report'), reverse('admin_pertemuan_report')):
+            primary, replica = self.queries(lambda: self.client.get(url))
+            self.assertEqual(primary, [])
+            self.assertTrue(any('"eskul_reportversion"' in query['sql'] for query in replica))
+
+    def test_streamed_export_stays_on_the_replica(self):
+        self.client.force_login(self.admin)
+        url = reverse('export_pertemuan_excel')
+        primary, replica = self.queries(lambda: self.client.get(url, {'format': 'csv'}))
+        self.assertEqual(primary, [])
+        self.assertTrue(any('DECLARE' in query['sql'] for query in replica))
+
+    def test_write_pins_to_primary(self):
+        self.client.force_login(self.pelatih)
+        history = reverse('pelatih_history_pertemuan')
+        self.client.post(reverse('pelatih_sync_pertemuan'), {'batch': '{}'})
+        self.assertIn(PIN_COOKIE, self.client.cookies)
+
+        primary, replica = self.queries(lambda: self.client.get(history))
+        self.assertEqual(replica, [])
+        self.assertTrue(primary)
+
+        self.client.cookies[PIN_COOKIE] = str(time.time() - 1)
+        primary, replica = self.queries(lambda: self.client.get(history))
+        self.assertEqual(primary, [])
+        self.assertTrue(replica)
+
+    def test_off_by_default(self):
+        self.client.force_login(self.admin)
+        with self.settings(READ_REPLICA=False):
+            _, replica = self.queries(lambda: self.client.get(reverse('admin_attendance_report')))
+            self.client.post(reverse('admin_profiles'), {'action': 'matikan'})
+        self.assertEqual(replica, [])
+        self.assertNotIn(PIN_COOKIE, self.client.cookies)
+
+    def test_router(self):
+        router = ReplicaRouter()
+        token = use_replica.set(True)
+        try:
+            self.assertEqual(router.db_for_read(Siswa), REPLICA)
+            self.assertIsNone(router.db_for_read(Siswa, instance=self.eskul))
+            self.assertIsNone(router.db_for_read(Session))
+            self.assertEqual(router.db_for_write(Siswa), DEFAULT_DB_ALIAS)
+        finally:
+            use_replica.reset(token)
+        self.assertIsNone(router.db_for_read(Siswa))
+        self.assertFalse(router.allow_migrate(REPLICA, 'eskul'))
+
+
+class PreforkTests(TestCase):
+    def test_warm_up_compiles_templates(self):
+        loader = engines['django'].engine.template_loaders[0]
+        loader.reset()
+        prefork.warm_up()
+        self.assertIn('base.html', loader.get_template_cache)
+        self.assertIn('admin/manage_users.html', loader.get_template_cache)
+
+    def test_worker_count_follows_cpus(self):
+        with mock.patch.object(prefork, 'cpu_count', return_value=4), mock.patch.dict(os.environ):
+            os.environ.pop('WEB_CONCURRENCY', None)
+            self.assertEqual(prefork.default_workers(), 9)
+            os.environ['WEB_CONCURRENCY'] = '3'
+            self.assertEqual(prefork.default_workers(), 3)
+
+
+class OfflineSyncTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.pelatih)
+        self.url = reverse('pelatih_sync_pertemuan')
+
+    def item(self, tanggal, **extra):
+        self.unique_counter += 1
+        return {
+            'client_id': f'00000000-0000-4000-8000-{self.unique_counter:012d}',
+            'tanggal': tanggal.isoformat(),
+            'materi_kegiatan': 'Latihan di lapangan',
+            'absensi': {str(siswa.pk): 'hadir' for siswa in Siswa.objects.filter(eskul=self.eskul)},
+            **extra,
+        }
+
+    def sync(self, *items):
+        return self.client.post(self.url, {'pertemuan': list(items)}, content_type='application/json')
+
+    def test_sync_is_flat(self):
+        def sync():
+            tanggal = date(2026, 2, 2) + timedelta(days=self.unique_counter)
+            return self.sync(self.item(tanggal))
+
+        response = self.assertFlatQueries(sync, 12)
+        self.assertEqual(response.json()['hasil'][0]['status'], 'tersimpan')
+
+    def test_retry_does_not_duplicate(self):
+        self.seed(SMALL_SIZE)
+        item = self.item(date(2026, 2, 2))
+        first = self.sync(item).json()['hasil'][0]
+        self.assertEqual((first['status'], first['hadir'], first['total']), ('tersimpan', SMALL_SIZE, SMALL_SIZE))
+
+        again = self.sync(item).json()['hasil'][0]
+        self.assertEqual(again, {'client_id': item['client_id'], 'status': 'sudah_tersimpan', 'pertemuan_id': first['pertemuan_id']})
+        self.assertEqual(Pertemuan.objects.filter(eskul=self.eskul, tanggal=date(2026, 2, 2)).count(), 1)
+        self.assertEqual(Absensi.objects.filter(pertemuan_id=first['pertemuan_id']).count(), SMALL_SIZE)
+
+    def test_rejected_items_do_not_block_the_batch(self):
+        self.seed(SMALL_SIZE)
+        taken = Pertemuan.objects.filter(eskul=self.eskul).first().tanggal
+        results = self.sync(
+            self.item(taken),
+            self.item(date(2026, 2, 3), absensi={'1': 'libur'}),
+            self.item(date(2026, 2, 4)),
+            self.item(date(2026, 2, 4)),
+        ).json()['hasil']
+        self.assertEqual([result['status'] for result in results], ['ditolak', 'ditolak', 'tersimpan', 'ditolak'])
+        self.assertIn('sudah ada', results[0]['pesan'])
+        self.assertEqual(results[1]['pesan'], 'Keterangan tidak valid: libur')
+
+    def test_multipart_with_photo(self):
+        item = self.item(date(2026, 2, 5))
+        photo = SimpleUploadedFile('foto.jpg', b'\xff\xd8\xff\xe0 foto', content_type='image/jpeg')
+        with tempfile.TemporaryDirectory() as media_root, self.settings(MEDIA_ROOT=media_root):
+            response = self.client.post(self.url, {
+                'batch': json.dumps({'pertemuan': [item]}),
+                f'foto_{item["client_id"]}': photo,
+            })
+            self.assertEqual(response.json()['hasil'][0]['status'], 'tersimpan')
+            self.assertEqual(FotoKegiatan.objects.filter(pertemuan__client_id=item['client_id']).count(), 1)
+
+    def test_errors_are_json(self):
+        self.assertEqual(self.client.post(self.url, 'bukan json', content_type='application/json').status_code, 400)
+        self.client.force_login(self.admin)
+        self.assertEqual(self.sync(self.item(date(2026, 2, 6))).status_code, 403)
+        self.client.logout()
+        response = self.sync(self.item(date(2026, 2, 6)))
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('login', response.json()['error'])
+
+    def test_service_worker(self):
+        response = self.client.get(reverse('pelatih_service_worker'))
+        self.assertEqual(response['Content-Type'], 'text/javascript')
+        self.assertIn(self.url, response.content.decode())
+
+
+class MetricsTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def sample(self, metric, **labels):
+        return REGISTRY.get_sample_value(metric, labels) or 0
+
+    def test_request_latency_and_queries_per_view(self):
+        self.seed(SMALL_SIZE)
+        before = self.sample('eskul_http_request_duration_seconds_count', view='admin_manage_students', method='GET')
+        self.client.get(reverse('admin_manage_students'))
+        self.assertEqual(
+            self.sample('eskul_http_request_duration_seconds_count', view='admin_manage_students', method='GET'), before + 1
+        )
+        self.assertGreater(self.sample('eskul_db_queries_per_request_sum', view='admin_manage_students'), 0)
+
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('eskul_http_request_duration_seconds_bucket{le="0.01",method="GET",view="admin_manage_students"}', body)
+        self.assertIn('eskul_http_requests_total{method="GET",status="200",view="admin_manage_students"}', body)
+
+    def test_reconnecting_keeps_one_query_recorder(self):
+        other = connections.create_connection(DEFAULT_DB_ALIAS)
+        self.addCleanup(other.close)
+        for _ in range(5):
+            other.close()
+            other.ensure_connection()
+        self.assertEqual(other.execute_wrappers, [metrics.record_query])
+
+        stats = metrics.QueryStats()
+        token = metrics.observe_queries(stats)
+        try:
+            with other.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        finally:
+            metrics.query_observers.reset(token)
+        self.assertEqual(stats.count, 1)
+
+    def test_export_records_duration_and_rows(self):
+        self.seed(SMALL_SIZE)
+        before = self.sample('eskul_job_rows_sum', kind='export', name='absensi')
+        response = self.client.get(reverse('export_attendance_excel'), {'format': 'csv'})
+        b''.join(response.streaming_content)
+        rows = Siswa.objects.filter(is_active=True).count()
+        self.assertEqual(self.sample('eskul_job_rows_sum', kind='export', name='absensi'), before + rows)
+
+    def test_upload_size(self):
+        before = self.sample('eskul_upload_bytes_count', view='pelatih_sync_pertemuan')
+        self.client.force_login(self.pelatih)
+        self.client.post(reverse('pelatih_sync_pertemuan'), {'batch': '{}'})
+        self.assertEqual(self.sample('eskul_upload_bytes_count', view='pelatih_sync_pertemuan'), before + 1)
+
+    def test_scrape_access(self):
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url, headers={'X-Forwarded-For': '203.0.113.5'}).status_code, 403)
+        with self.settings(METRICS_TOKEN='rahasia'):
+            self.assertEqual(self.client.get(url).status_code, 403)
+            self.assertEqual(self.client.get(url, headers={'Authorization': 'Bearer rahasia'}).status_code, 200)
+
+
+class ProfilingTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seed(SMALL_SIZE)
+        self.client.force_login(self.admin)
+        media_root = tempfile.TemporaryDirectory()
+        profile_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.addCleanup(profile_root.cleanup)
+        settings = self.settings(MEDIA_ROOT=media_root.name, PROFILE_ROOT=profile_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.media_root = media_root.name
+
+    def test_signed_link_profiles_one_request(self):
+        url = reverse('admin_manage_students')
+        self.client.get(url, {profiling.PARAM: profiling.link_token(self.admin)})
+        self.client.get(url)
+        [profile] = profiling.list_profiles()
+        self.assertEqual((profile['view'], profile['status']), ('admin_manage_students', 200))
+        self.assertGreater(profile['jumlah_query'], 0)
+        queries = profiling.load_profile(profile['id'])['queries']
+        self.assertTrue(any('"eskul_siswa"' in query['sql'] for query in queries))
+
+        detail = self.client.get(reverse('admin_profile_detail', args=[profile['id']]))
+        self.assertContains(detail, 'admin_manage_students')
+        download = self.client.get(reverse('admin_profile_file', args=[profile['id'], 'prof']))
+        self.assertEqual(download['Content-Disposition'], f'attachment; filename="{profile["id"]}.prof"')
+        collapsed = self.client.get(reverse('admin_profile_file', args=[profile['id'], 'collapsed']))
+        self.assertEqual(collapsed.status_code, 200)
+        # Never written where the media URL serves it
+        self.assertEqual(os.listdir(self.media_root), [])
+
+    def test_link_is_only_for_its_admin(self):
+        url = reverse('admin_manage_students')
+        self.client.get(url, {profiling.PARAM: 'palsu'})
+        self.client.force_login(self.pelatih)
+        self.client.get(reverse('pelatih_students'), {profiling.PARAM: profiling.link_token(self.admin)})
+        self.assertEqual(profiling.list_profiles(), [])
+
+    def test_cookie_profiles_async_views(self):
+        self.client.post(reverse('admin_profiles'), {'action': 'aktifkan'})
+        self.client.get(reverse('dashboard'))
+        self.client.get(reverse('admin_attendance_report'))
+        self.assertEqual(
+            [profile['view'] for profile in profiling.list_profiles()], ['admin_attendance_report', 'dashboard']
+        )
+        self.assertContains(self.client.get(reverse('admin_profiles')), 'Aktif di browser ini')
+
+        self.client.post(reverse('admin_profiles'), {'action': 'matikan'})
+        self.client.get(reverse('dashboard'))
+        self.assertEqual(len(profiling.list_profiles()), 2)
+
+    def test_pages_are_admin_only(self):
+        self.client.force_login(self.pelatih)
+        self.assertRedirects(self.client.get(reverse('admin_profiles')), reverse('dashboard'))
+        self.assertEqual(
+            self.client.get(reverse('admin_profile_file', args=['20260101-000000000000-0123456789abcdef', 'prof'])).status_code,
+            403
+        )
+
+
+class LoadTestHarnessTests(LiveServerTestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings = self.settings(MEDIA_ROOT=media_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(
+            [loadtest.percentile(values, p) for p in (50, 95, 99, 100)], [50, 95, 99, 100]
+        )
+        self.assertEqual(loadtest.percentile([7], 99), 7)
+
+    def test_seed_is_repeatable(self):
+        for _ in range(2):
+            loadtest.seed_load_test_data(coaches=2, admins=1, students=4, history=3, password='rahasia')
+        self.assertEqual(CustomUser.objects.filter(username__startswith=loadtest.PREFIX).count(), 3)
+        self.assertEqual(Siswa.objects.filter(eskul__nama_eskul__startswith=loadtest.ESKUL_PREFIX).count(), 8)
+        self.assertEqual(Pertemuan.objects.filter(eskul__nama_eskul__startswith=loadtest.ESKUL_PREFIX).count(), 6)
+
+    def test_run_against_live_server(self):
+        loadtest.seed_load_test_data(coaches=2, admins=1, students=4, history=2, password='rahasia')
+        results, elapsed = loadtest.run_load_test(
+            self.live_server_url, coaches=2, admins=1, password='rahasia', rounds=2, photo_kb=20
+        )
+        rows = {row['endpoint']: row for row in results.summary(elapsed)}
+        self.assertEqual(results.error_samples, {})
+        self.assertEqual(rows['pelatih_create_pertemuan POST']['requests'], 4)
+        self.assertGreaterEqual(rows['admin_attendance_report']['requests'], 1)
+        self.assertEqual(
+            FotoKegiatan.objects.filter(pertemuan__materi_kegiatan__startswith='Latihan uji beban').count(), 4
+        )
+
+
+class EditAbsensiTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seed(SMALL_SIZE)
+        self.client.force_login(self.pelatih)
+        self.pertemuan = Pertemuan.objects.filter(eskul=self.eskul).first()
+        self.url = reverse('pelatih_edit_pertemuan', args=[self.pertemuan.id])
+
+    def statuses(self):
+        return dict(Absensi.objects.filter(pertemuan=self.pertemuan).values_list('siswa_id', 'status'))
+
+    def post(self, changes, key='00000000-0000-4000-8000-000000000001'):
+        data = {f'absensi_{siswa_id}': Absensi.Status(status).kode for siswa_id, status in self.statuses().items()}
+        data.update({f'absensi_{siswa_id}': kode for siswa_id, kode in changes.items()})
+        return self.client.post(self.url, {**data, 'idempotency_key': key})
+
+    def absensi_writes(self, context):
+        return [query['sql'] for query in context.captured_queries if '"eskul_absensi"' in query['sql'] and 'INSERT' in query['sql']]
+
+    def test_only_changed_rows_are_written(self):
+        siswa_id, status = next(iter(self.statuses().items()))
+        kode = 'izin' if status != Absensi.Status.IZIN else 'sakit'
+        untouched = Absensi.objects.exclude(siswa_id=siswa_id).filter(pertemuan=self.pertemuan)
+        updated_at = dict(untouched.values_list('pk', 'updated_at'))
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.post({siswa_id: kode})
+        self.assertEqual(len(self.absensi_writes(context)), 1)
+        self.assertContains(self.client.get(response.url), '1 siswa berubah')
+        self.assertEqual(self.statuses()[siswa_id], Absensi.Status.from_kode(kode))
+        self.assertEqual(dict(untouched.values_list('pk', 'updated_at')), updated_at)
+
+    def test_double_tap_is_applied_once(self):
+        siswa_id = next(iter(self.statuses()))
+        self.post({siswa_id: 'sakit'})
+        with CaptureQueriesContext(connection) as context:
+            # The same key with other statuses: a stale retry must not overwrite
+            response = self.post({siswa_id: 'hadir'})
+        self.assertEqual(len(self.absensi_writes(context)), 1)
+        self.assertContains(self.client.get(response.url), 'sudah tersimpan')
+        self.assertEqual(self.statuses()[siswa_id], Absensi.Status.SAKIT)
+
+    def test_without_key_no_key_is_stored(self):
+        siswa_id = next(iter(self.statuses()))
+        self.post({siswa_id: 'sakit'}, key='')
+        self.post({siswa_id: 'hadir'}, key='')
+        self.assertEqual(self.statuses()[siswa_id], Absensi.Status.HADIR)
+        self.assertFalse(AbsensiEditKey.objects.exists())
+
+    def test_old_keys_are_pruned(self):
+        old, recent = (
+            AbsensiEditKey.objects.create(key=f'00000000-0000-4000-8000-00000000010{i}', pertemuan=self.pertemuan)
+            for i in range(2)
+        )
+        AbsensiEditKey.objects.filter(pk=old.pk).update(
+            created_at=timezone.now() - timedelta(days=pertemuan_sync.EDIT_KEY_DAYS, hours=1)
+        )
+        self.post({next(iter(self.statuses())): 'izin'})
+        self.assertEqual(
+            {str(key) for key in AbsensiEditKey.objects.values_list('key', flat=True)},
+            {str(recent.key), '00000000-0000-4000-8000-000000000001'}
+        )
+
+    def test_conflict_target_follows_the_table(self):
+        # The table is plain, whatever the setting says
+        siswa_id = next(iter(self.statuses()))
+        with self.settings(ABSENSI_PARTITION_INTERVAL='semester'):
+            response = self.post({siswa_id: 'izin'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.statuses()[siswa_id], Absensi.Status.IZIN)
+
+    def test_new_student_is_inserted(self):
+        siswa = Siswa.objects.create(nama_siswa='SISWA BARU', kelas='1A', eskul=self.eskul)
+        self.assertContains(self.client.get(self.url), 'belum tercatat')
+        self.post({siswa.id: 'hadir'})
+        self.assertEqual(self.statuses()[siswa.id], Absensi.Status.HADIR)
+
+    def test_edit_is_flat(self):
+        def edit():
+            self.unique_counter += 1
+            return self.post({}, key=f'00000000-0000-4000-8000-{self.unique_counter:012d}')
+
+        self.assertFlatQueries(edit, 12)
+
+    def test_edit_changes_report_version(self):
+        history = reverse('pelatih_history_pertemuan')
+        # Sets the CSRF cookie, as the login page would have
+        self.client.get(history)
+        etag = self.client.get(history)['ETag']
+        siswa_id, status = next(iter(self.statuses().items()))
+        self.post({siswa_id: 'izin' if status != Absensi.Status.IZIN else 'sakit'})
+        response = self.client.get(history, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'siswa berubah')
+
+    def test_other_coach_cannot_edit(self):
+        self.client.force_login(self.pelatih_b)
+        self.assertRedirects(self.client.get(self.url), reverse('pelatih_history_pertemuan'), fetch_redirect_response=False)
+
+    def test_create_for_taken_date(self):
+        create = reverse('pelatih_create_pertemuan')
+        key = '00000000-0000-4000-8000-000000000009'
+        data = {'tanggal': '2026-03-02', 'materi_kegiatan': 'Latihan', 'idempotency_key': key}
+        self.assertRedirects(self.client.post(create, data), reverse('pelatih_history_pertemuan'), fetch_redirect_response=False)
+        self.assertTrue(AbsensiEditKey.objects.filter(key=key).exists())
+
+        again = self.client.post(create, data)
+        self.assertRedirects(again, reverse('pelatih_history_pertemuan'), fetch_redirect_response=False)
+        self.assertContains(self.client.get(again.url), 'sudah tersimpan')
+
+        other = self.client.post(create, {**data, 'idempotency_key': '00000000-0000-4000-8000-000000000010'})
+        pertemuan = Pertemuan.objects.get(eskul=self.eskul, tanggal=date(2026, 3, 2))
+        self.assertRedirects(
+            other, reverse('pelatih_edit_pertemuan', args=[pertemuan.id]), fetch_redirect_response=False
+        )
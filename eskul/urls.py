@@ -16,9 +16,22 @@ urlpatterns = [
     path('admin/reports/pertemuan/', views.admin_pertemuan_report_view, name='admin_pertemuan_report'),
     path('admin/export/attendance/', views.export_attendance_excel, name='export_attendance_excel'),
     path('admin/export/pertemuan/', views.export_pertemuan_excel, name='export_pertemuan_excel'),
+    path('admin/export/paket/', views.export_report_pack, name='export_report_pack'),
+
+    # Request profiles (eskul/profiling.py)
+    path('admin/profil/', views.admin_profiles_view, name='admin_profiles'),
+    path('admin/profil/<str:profile_id>/', views.admin_profile_detail_view, name='admin_profile_detail'),
+    path('admin/profil/<str:profile_id>/<str:kind>/', views.admin_profile_file_view, name='admin_profile_file'),
+    
+    # Attendance matrix (admin: any eskul, pelatih: own eskul)
+    path('matrix/', views.attendance_matrix_view, name='attendance_matrix'),
+    path('matrix/export/', views.export_attendance_matrix_excel, name='export_attendance_matrix'),
     
     # Pelatih URLs
     path('pelatih/students/', views.pelatih_students_view, name='pelatih_students'),
     path('pelatih/pertemuan/create/', views.pelatih_create_pertemuan_view, name='pelatih_create_pertemuan'),
     path('pelatih/pertemuan/history/', views.pelatih_history_pertemuan_view, name='pelatih_history_pertemuan'),
+    path('pelatih/pertemuan/<int:pertemuan_id>/edit/', views.pelatih_edit_pertemuan_view, name='pelatih_edit_pertemuan'),
+    path('pelatih/pertemuan/sync/', views.pelatih_sync_pertemuan_view, name='pelatih_sync_pertemuan'),
+    path('pelatih/sw.js', views.pelatih_service_worker_view, name='pelatih_service_worker'),
 ]
\ No newline at end of file
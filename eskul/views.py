@@ -1,43 +1,77 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, JsonResponse, HttpResponse
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.db.models import Count, Q, Avg
-import pandas as pd
-import io
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_POST
+import uuid
+from collections import Counter
 from datetime import datetime, timedelta, date
 
-from .models import Eskul, Siswa, Pertemuan, Absensi, FotoKegiatan
+from .models import Eskul, Siswa, Pertemuan, Absensi
+from .reports import (
+    attendance_report_queryset, pertemuan_report_queryset, pelatih_students_queryset,
+    ATTENDANCE_EXPORT_COLUMNS, PERTEMUAN_EXPORT_COLUMNS, attendance_export_rows, pertemuan_export_rows,
+    attendance_report_scopes, pertemuan_report_scopes, pelatih_history_scopes,
+)
+from .async_utils import gather_queries, request_user
+from .live import notify_absensi_created, SOCKET_PATH
+from .metrics import JobTimer
+from .profiling import (
+    COOKIE as PROFILE_COOKIE, COOKIE_AGE as PROFILE_COOKIE_AGE, PARAM as PROFILE_PARAM, cookie_active,
+    delete_profile, link_token, list_profiles, load_profile, profile_path, set_profiling_cookie, top_functions,
+)
+from .conditional import conditional_report
+from .db_routing import replica_reads
+from .pertemuan_sync import (
+    BatchError, create_pertemuan, key_used, parse_batch, parse_key, save_batch, upsert_absensi,
+)
+from .report_pack import report_pack_response
+from .spreadsheets import STREAM_FORMATS, UnsupportedFormat, read_rows, spreadsheet_response, streaming_response
+from .report_cache import LOOKUPS, bump_eskul, cached_lookup, cached_report, eskul_scope, report_versions
 from accounts.models import CustomUser
 
 @login_required
-def dashboard_view(request):
+async def dashboard_view(request):
+    user = await request_user(request)
     today = timezone.now().date()
     context = {
         'today': today,
-        'user': request.user
+        'user': user
     }
     
-    if request.user.role == 'admin':
-        context.update({
-            'total_pelatih': CustomUser.objects.filter(role='pelatih').count(),
-            'total_eskul': Eskul.objects.count(),
-            'total_siswa': Siswa.objects.count(),
-            'pertemuan_hari_ini': Pertemuan.objects.filter(tanggal=today).count(),
-        })
-    elif request.user.role == 'pelatih':
-        my_eskul = Eskul.objects.filter(pelatih=request.user)
+    if user.role == 'admin':
+        context.update(await gather_queries(
+            total_pelatih=lambda: CustomUser.objects.filter(role='pelatih').count(),
+            total_eskul=lambda: Eskul.objects.count(),
+            total_siswa=lambda: Siswa.objects.count(),
+            pertemuan_hari_ini=lambda: Pertemuan.objects.filter(tanggal=today).count(),
+            absensi_hari_ini=lambda: Absensi.objects.filter(tanggal=today).aggregate(
+                total=Count('id'), hadir=Count('id', filter=Q(status=Absensi.Status.HADIR))
+            ),
+        ))
         context.update({
-            'my_eskul_count': my_eskul.count(),
-            'my_eskul_list': my_eskul,
-            'my_siswa_count': Siswa.objects.filter(eskul__pelatih=request.user).count(),
-            'my_pertemuan_count': Pertemuan.objects.filter(pelatih=request.user).count(),
+            'hadir_hari_ini': context['absensi_hari_ini']['hadir'],
+            'absensi_hari_ini': context['absensi_hari_ini']['total'],
+            'dashboard_socket_path': SOCKET_PATH,
         })
+    elif user.role == 'pelatih':
+        results = await gather_queries(
+            my_eskul_list=lambda: list(
+                Eskul.objects.filter(pelatih=user).annotate(jumlah_siswa=Count('siswa_list'))
+            ),
+            my_siswa_count=lambda: Siswa.objects.filter(eskul__pelatih=user).count(),
+            my_pertemuan_count=lambda: Pertemuan.objects.filter(pelatih=user).count(),
+        )
+        results['my_eskul_count'] = len(results['my_eskul_list'])
+        context.update(results)
     
-    return render(request, 'dashboard.html', context)
+    return await sync_to_async(render)(request, 'dashboard.html', context)
 
 @login_required
 def admin_manage_students_view(request):
@@ -46,7 +80,7 @@ def admin_manage_students_view(request):
         return redirect('dashboard')
     
     eskul_list = Eskul.objects.all().select_related('pelatih')
-    siswa_list = Siswa.objects.all().select_related('eskul')
+    siswa_list = Siswa.objects.all().select_related('eskul__pelatih')
     
     # Get unique kelas list
     kelas_list = sorted(set(siswa.kelas for siswa in siswa_list))
@@ -102,52 +136,49 @@ def handle_file_upload(request):
     
     try:
         # Read file
-        if file.name.endswith('.csv'):
-            df = pd.read_csv(file)
-        elif file.name.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(file)
-        else:
-            messages.error(request, 'Format file tidak didukung. Gunakan CSV atau Excel.')
+        timer = JobTimer('import', 'siswa')
+        try:
+            columns, rows = read_rows(file, file.name)
+        except UnsupportedFormat as e:
+            messages.error(request, str(e))
             return redirect('admin_import_students')
         
-        # Validate columns
+        # Validate columns, accepting alternative column names
         expected_columns = ['nama_siswa', 'kelas']
-        if not all(col in df.columns for col in expected_columns):
-            # Try alternative column names
-            df.columns = df.columns.str.lower().str.strip()
-            column_mapping = {
-                'nama': 'nama_siswa',
-                'nama siswa': 'nama_siswa',
-                'name': 'nama_siswa',
-                'class': 'kelas',
-                'kelas siswa': 'kelas'
-            }
-            
-            for old_col, new_col in column_mapping.items():
-                if old_col in df.columns:
-                    df.rename(columns={old_col: new_col}, inplace=True)
-            
-            if not all(col in df.columns for col in expected_columns):
-                messages.error(request, f'File harus memiliki kolom: {", ".join(expected_columns)}')
-                return redirect('admin_import_students')
+        column_mapping = {
+            'nama': 'nama_siswa',
+            'nama siswa': 'nama_siswa',
+            'name': 'nama_siswa',
+            'class': 'kelas',
+            'kelas siswa': 'kelas'
+        }
+        columns = [column_mapping.get(column, column) for column in columns]
+        if not all(col in columns for col in expected_columns):
+            messages.error(request, f'File harus memiliki kolom: {", ".join(expected_columns)}')
+            return redirect('admin_import_students')
+        rows = [
+            {column_mapping.get(column, column): value for column, value in row.items()}
+            for row in rows
+        ]
         
         # Clean and validate data
-        df = df.dropna(subset=expected_columns)
-        df['nama_siswa'] = df['nama_siswa'].str.strip().str.upper()
-        df['kelas'] = df['kelas'].str.strip().str.upper()
+        students = [
+            {'nama_siswa': row['nama_siswa'].upper(), 'kelas': row['kelas'].upper()}
+            for row in rows
+            if row.get('nama_siswa') and row.get('kelas')
+        ]
         
         # Validate kelas format (1A-6E)
-        valid_kelas = [f"{i}{j}" for i in range(1, 7) for j in ['A', 'B', 'C', 'D', 'E']]
-        invalid_kelas = df[~df['kelas'].isin(valid_kelas)]
+        valid_kelas = {f"{i}{j}" for i in range(1, 7) for j in ['A', 'B', 'C', 'D', 'E']}
+        invalid_list = sorted({student['kelas'] for student in students} - valid_kelas)
         
-        if not invalid_kelas.empty:
-            invalid_list = invalid_kelas['kelas'].unique()
+        if invalid_list:
             messages.error(request, f'Format kelas tidak valid: {", ".join(invalid_list)}. Gunakan format 1A-6E.')
             return redirect('admin_import_students')
         
         # Check for duplicates in file
-        file_duplicates = df[df.duplicated(subset=['nama_siswa', 'kelas'], keep=False)]
-        if not file_duplicates.empty:
+        keys = [(student['nama_siswa'], student['kelas']) for student in students]
+        if len(set(keys)) != len(keys):
             messages.error(request, 'Ada siswa duplikat dalam file yang diupload.')
             return redirect('admin_import_students')
         
@@ -155,24 +186,28 @@ def handle_file_upload(request):
         existing_students = []
         new_students = []
         
-        for _, row in df.iterrows():
-            existing = Siswa.objects.filter(
-                nama_siswa=row['nama_siswa'], 
-                kelas=row['kelas']
-            ).first()
+        existing_lookup = {
+            (siswa.nama_siswa, siswa.kelas): siswa
+            for siswa in Siswa.objects.filter(
+                nama_siswa__in={student['nama_siswa'] for student in students},
+                kelas__in={student['kelas'] for student in students}
+            ).select_related('eskul')
+        }
+        
+        for student in students:
+            existing = existing_lookup.get((student['nama_siswa'], student['kelas']))
             
             if existing:
                 existing_students.append({
-                    'nama_siswa': row['nama_siswa'],
-                    'kelas': row['kelas'],
+                    'nama_siswa': student['nama_siswa'],
+                    'kelas': student['kelas'],
                     'current_eskul': existing.eskul.nama_eskul
                 })
             else:
-                new_students.append({
-                    'nama_siswa': row['nama_siswa'],
-                    'kelas': row['kelas']
-                })
+                new_students.append(student)
         
+        timer.finish(len(students))
+
         # Store data in session for confirmation
         request.session['import_data'] = {
             'eskul_id': eskul_id,
@@ -204,14 +239,17 @@ def handle_confirm_import(request):
         new_students = import_data['new_students']
         
         # Create new students
-        created_count = 0
-        for student_data in new_students:
-            Siswa.objects.create(
+        created = Siswa.objects.bulk_create([
+            Siswa(
                 nama_siswa=student_data['nama_siswa'],
                 kelas=student_data['kelas'],
                 eskul=eskul
             )
-            created_count += 1
+            for student_data in new_students
+        ])
+        created_count = len(created)
+        # bulk_create sends no signals
+        bump_eskul(eskul.id, lookups=True)
         
         # Clear session data
         del request.session['import_data']
@@ -260,29 +298,17 @@ def pelatih_students_view(request):
     siswa_base = Siswa.objects.filter(eskul=eskul, is_active=True).order_by('nama_siswa')
     kelas_list = sorted(siswa_base.values_list('kelas', flat=True).distinct())
 
-    siswa_list = siswa_base
-    absensi_query = Absensi.objects.filter(siswa__eskul=eskul).select_related('siswa', 'pertemuan')
-
-    # Apply search filter
     search_query = request.GET.get('search', '').strip()
-    if search_query:
-        siswa_list = siswa_list.filter(nama_siswa__icontains=search_query)
-        absensi_query = absensi_query.filter(siswa__nama_siswa__icontains=search_query)
-
-    # Apply kelas filter
-    if kelas:
-        siswa_list = siswa_list.filter(kelas=kelas)
-        absensi_query = absensi_query.filter(siswa__kelas=kelas)
+    siswa_list = pelatih_students_queryset(eskul, kelas=kelas, search_query=search_query)
 
     # Calculate attendance statistics
     attendance_data = []
     for siswa in siswa_list:
-        siswa_absensi = absensi_query.filter(siswa=siswa)
-        total_pertemuan = siswa_absensi.count()
-        hadir = siswa_absensi.filter(keterangan='hadir').count()
-        sakit = siswa_absensi.filter(keterangan='sakit').count()
-        izin = siswa_absensi.filter(keterangan='izin').count()
-        alpha = siswa_absensi.filter(keterangan='alpha').count()
+        total_pertemuan = siswa.total_absensi
+        hadir = siswa.jumlah_hadir
+        sakit = siswa.jumlah_sakit
+        izin = siswa.jumlah_izin
+        alpha = siswa.jumlah_alpha
 
         persentase_hadir = (hadir / total_pertemuan * 100) if total_pertemuan > 0 else 0
 
@@ -368,76 +394,161 @@ def pelatih_create_pertemuan_view(request):
     context = {
         'eskul': eskul,
         'siswa_list': siswa_list,
-        'today': timezone.now().date()
+        'today': timezone.now().date(),
+        'idempotency_key': uuid.uuid4(),
     }
     return render(request, 'pelatih/create_pertemuan.html', context)
 
+def existing_pertemuan_response(request, pertemuan, key):
+    # The same form sent again (double tap, retry) was already saved;
+    # another submission for the date is a correction, made on the edit page
+    if key_used(key, pertemuan):
+        messages.success(request, 'Pertemuan ini sudah tersimpan.')
+        return redirect('pelatih_history_pertemuan')
+    messages.error(
+        request,
+        f'Pertemuan untuk tanggal {pertemuan.tanggal} sudah ada. Satu eskul hanya bisa satu pertemuan per hari. '
+        'Ubah absensinya di sini.'
+    )
+    return redirect('pelatih_edit_pertemuan', pertemuan_id=pertemuan.id)
+
 def handle_create_pertemuan(request, eskul, siswa_list):
+    # Get form data
+    tanggal = request.POST.get('tanggal')
+    materi = request.POST.get('materi_kegiatan') or ''
+    key = parse_key(request.POST.get('idempotency_key'))
+
+    if not tanggal or not materi.strip():
+        messages.error(request, 'Tanggal dan materi kegiatan harus diisi.')
+        return redirect('pelatih_create_pertemuan')
+
     try:
+        existing = Pertemuan.objects.filter(eskul=eskul, tanggal=tanggal).first()
+        if existing:
+            return existing_pertemuan_response(request, existing, key)
+
+        statuses = {
+            str(siswa.id): Absensi.Status.from_kode(request.POST.get(f'absensi_{siswa.id}', 'alpha'))
+            for siswa in siswa_list
+        }
         with transaction.atomic():
-            # Get form data
-            tanggal = request.POST.get('tanggal')
-            materi = request.POST.get('materi_kegiatan')
-            
-            if not tanggal or not materi.strip():
-                messages.error(request, 'Tanggal dan materi kegiatan harus diisi.')
-                return redirect('pelatih_create_pertemuan')
-            
-            # Check if pertemuan already exists for this date
-            if Pertemuan.objects.filter(eskul=eskul, tanggal=tanggal).exists():
-                messages.error(request, f'Pertemuan untuk tanggal {tanggal} sudah ada. Satu eskul hanya bisa satu pertemuan per hari.')
-                return redirect('pelatih_create_pertemuan')
-            
-            # Create pertemuan
-            pertemuan = Pertemuan.objects.create(
-                eskul=eskul,
-                tanggal=tanggal,
-                materi_kegiatan=materi.strip(),
-                pelatih=request.user
+            pertemuan, absensi_baru = create_pertemuan(
+                eskul, request.user, tanggal, materi.strip(), statuses, siswa_list,
+                foto=request.FILES.get('foto_kegiatan'), key=key
             )
-            
-            # Handle single photo upload
-            if request.FILES.get('foto_kegiatan'):
-                foto = request.FILES.get('foto_kegiatan')
-                FotoKegiatan.objects.create(
-                    pertemuan=pertemuan,
-                    foto=foto
-                )
-            
-            # Handle attendance
-            hadir_count = 0
-            total_siswa = siswa_list.count()
-            
-            for siswa in siswa_list:
-                keterangan = request.POST.get(f'absensi_{siswa.id}', 'alpha')
-                hadir = keterangan == 'hadir'
-                
-                Absensi.objects.create(
-                    pertemuan=pertemuan,
-                    siswa=siswa,
-                    hadir=hadir,
-                    keterangan=keterangan
-                )
-                
-                if hadir:
-                    hadir_count += 1
-            
-            messages.success(request, 
-                f'Pertemuan berhasil disimpan! {hadir_count}/{total_siswa} siswa hadir.')
-            return redirect('pelatih_history_pertemuan')
-            
+    except IntegrityError:
+        # Saved in the meantime by a concurrent submission
+        existing = Pertemuan.objects.filter(eskul=eskul, tanggal=tanggal).first()
+        if existing:
+            return existing_pertemuan_response(request, existing, key)
+        messages.error(request, 'Pertemuan gagal disimpan. Silakan coba lagi.')
+        return redirect('pelatih_create_pertemuan')
     except Exception as e:
         messages.error(request, f'Error menyimpan pertemuan: {str(e)}')
         return redirect('pelatih_create_pertemuan')
 
+    hadir_count = sum(1 for absensi in absensi_baru if absensi.hadir)
+    total_siswa = len(absensi_baru)
+
+    messages.success(request,
+        f'Pertemuan berhasil disimpan! {hadir_count}/{total_siswa} siswa hadir.')
+    return redirect('pelatih_history_pertemuan')
+
 @login_required
+def pelatih_edit_pertemuan_view(request, pertemuan_id):
+    if request.user.role != 'pelatih':
+        messages.error(request, 'Akses ditolak. Anda bukan pelatih.')
+        return redirect('dashboard')
+
+    pertemuan = Pertemuan.objects.select_related('eskul').filter(
+        id=pertemuan_id, eskul__pelatih=request.user
+    ).first()
+    if pertemuan is None:
+        messages.error(request, 'Pertemuan tidak ditemukan.')
+        return redirect('pelatih_history_pertemuan')
+
+    # The active roster, and students who left since but were recorded
+    siswa_list = list(
+        Siswa.objects.filter(Q(eskul=pertemuan.eskul, is_active=True) | Q(absensi__pertemuan=pertemuan))
+        .distinct().order_by('nama_siswa')
+    )
+
+    if request.method == 'POST':
+        try:
+            statuses = {
+                str(siswa.id): Absensi.Status.from_kode(request.POST[f'absensi_{siswa.id}'])
+                for siswa in siswa_list if f'absensi_{siswa.id}' in request.POST
+            }
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect('pelatih_edit_pertemuan', pertemuan_id=pertemuan.id)
+
+        result = upsert_absensi(
+            pertemuan, statuses, siswa_list, key=parse_key(request.POST.get('idempotency_key'))
+        )
+        if result.duplikat:
+            messages.success(request, 'Perubahan ini sudah tersimpan.')
+        elif result.ditambah or result.diubah:
+            messages.success(
+                request, f'Absensi {pertemuan.tanggal} diperbarui: {result.diubah + result.ditambah} siswa berubah.'
+            )
+        else:
+            messages.success(request, 'Tidak ada perubahan absensi.')
+        return redirect('pelatih_history_pertemuan')
+
+    current = dict(Absensi.objects.filter(pertemuan=pertemuan).values_list('siswa_id', 'status'))
+    context = {
+        'pertemuan': pertemuan,
+        'rows': [
+            {'siswa': siswa, 'keterangan': Absensi.Status(current[siswa.id]).kode if siswa.id in current else None}
+            for siswa in siswa_list
+        ],
+        'status_list': list(Absensi.Status),
+        'idempotency_key': uuid.uuid4(),
+    }
+    return render(request, 'pelatih/edit_pertemuan.html', context)
+
+@require_POST
+@never_cache
+def pelatih_sync_pertemuan_view(request):
+    # Called by the offline queue script, so errors are JSON, not redirects
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Sesi login berakhir. Silakan login kembali.'}, status=401)
+    if request.user.role != 'pelatih':
+        return JsonResponse({'error': 'Akses ditolak. Anda bukan pelatih.'}, status=403)
+    eskul = Eskul.objects.filter(pelatih=request.user).first()
+    if eskul is None:
+        return JsonResponse({'error': 'Anda belum ditugaskan ke eskul manapun.'}, status=403)
+
+    try:
+        items = parse_batch(request)
+    except BatchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    siswa_list = Siswa.objects.filter(eskul=eskul, is_active=True).order_by('nama_siswa')
+    return JsonResponse({'hasil': save_batch(items, request.FILES, eskul, request.user, siswa_list)})
+
+def pelatih_service_worker_view(request):
+    # Served from under /dashboard/pelatih/ so that it may control the pelatih pages
+    response = render(request, 'pelatih/service_worker.js', content_type='text/javascript')
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+def pelatih_history_version(request):
+    if request.user.role != 'pelatih':
+        return None
+    return pelatih_history_scopes(request.user)
+
+@login_required
+@replica_reads
+@conditional_report(pelatih_history_version)
 def pelatih_history_pertemuan_view(request):
     if request.user.role != 'pelatih':
         messages.error(request, 'Akses ditolak. Anda bukan pelatih.')
         return redirect('dashboard')
     
     try:
-        eskul = Eskul.objects.get(pelatih=request.user)
+        eskul = Eskul.objects.select_related('pelatih').get(pelatih=request.user)
     except Eskul.DoesNotExist:
         messages.error(request, 'Anda belum ditugaskan ke eskul manapun.')
         return redirect('dashboard')
@@ -453,9 +564,17 @@ def pelatih_history_pertemuan_view(request):
     return render(request, 'pelatih/history_pertemuan.html', context)
 
 # ADMIN REPORT VIEWS
-@login_required
-def admin_attendance_report_view(request):
+def attendance_report_version(request):
     if request.user.role != 'admin':
+        return None
+    return attendance_report_scopes(eskul_id=request.GET.get('eskul'), kelas=request.GET.get('kelas'))
+
+@login_required
+@replica_reads
+@conditional_report(attendance_report_version)
+async def admin_attendance_report_view(request):
+    user = await request_user(request)
+    if user.role != 'admin':
         messages.error(request, 'Akses ditolak. Anda bukan admin.')
         return redirect('dashboard')
 
@@ -464,28 +583,27 @@ def admin_attendance_report_view(request):
     kelas = request.GET.get('kelas')
     attendance_filter = request.GET.get('attendance_filter')
 
-    # Base queryset
-    siswa_list = Siswa.objects.filter(is_active=True).select_related('eskul')
-    absensi_query = Absensi.objects.select_related('siswa', 'pertemuan')
-
-    # Apply filters
-    if eskul_id:
-        siswa_list = siswa_list.filter(eskul_id=eskul_id)
-        absensi_query = absensi_query.filter(siswa__eskul_id=eskul_id)
-
-    if kelas:
-        siswa_list = siswa_list.filter(kelas=kelas)
-        absensi_query = absensi_query.filter(siswa__kelas=kelas)
+    scope = eskul_scope(eskul_id)
+    versions = await sync_to_async(report_versions)(scope, LOOKUPS)
+    results = await gather_queries(
+        siswa_list=lambda: cached_report(
+            'admin_attendance_report', {'eskul': eskul_id, 'kelas': kelas}, {scope: versions[scope]},
+            lambda: list(attendance_report_queryset(eskul_id=eskul_id, kelas=kelas))
+        ),
+        eskul_list=lambda: cached_lookup('eskul_list', versions, lambda: list(Eskul.objects.all())),
+        kelas_list=lambda: cached_lookup(
+            'kelas_list', versions, lambda: sorted(set(Siswa.objects.values_list('kelas', flat=True)))
+        ),
+    )
 
     # Calculate attendance statistics
     attendance_data = []
-    for siswa in siswa_list:
-        siswa_absensi = absensi_query.filter(siswa=siswa)
-        total_pertemuan = siswa_absensi.count()
-        hadir = siswa_absensi.filter(keterangan='hadir').count()
-        sakit = siswa_absensi.filter(keterangan='sakit').count()
-        izin = siswa_absensi.filter(keterangan='izin').count()
-        alpha = siswa_absensi.filter(keterangan='alpha').count()
+    for siswa in results['siswa_list']:
+        total_pertemuan = siswa.total_absensi
+        hadir = siswa.jumlah_hadir
+        sakit = siswa.jumlah_sakit
+        izin = siswa.jumlah_izin
+        alpha = siswa.jumlah_alpha
 
         persentase_hadir = (hadir / total_pertemuan * 100) if total_pertemuan > 0 else 0
 
@@ -530,8 +648,8 @@ def admin_attendance_report_view(request):
         'good_attendance_count': good_attendance_count,
         'medium_attendance_count': medium_attendance_count,
         'poor_attendance_count': poor_attendance_count,
-        'eskul_list': Eskul.objects.all(),
-        'kelas_list': sorted(set(Siswa.objects.values_list('kelas', flat=True))),
+        'eskul_list': results['eskul_list'],
+        'kelas_list': results['kelas_list'],
         'filters': {
             'eskul_id': eskul_id,
             'kelas': kelas,
@@ -539,11 +657,22 @@ def admin_attendance_report_view(request):
         }
     }
     
-    return render(request, 'admin/attendance_report.html', context)
+    return await sync_to_async(render)(request, 'admin/attendance_report.html', context)
 
-@login_required
-def admin_pertemuan_report_view(request):
+def pertemuan_report_version(request):
     if request.user.role != 'admin':
+        return None
+    return pertemuan_report_scopes(
+        pelatih_id=request.GET.get('pelatih'), eskul_id=request.GET.get('eskul'),
+        start_date=request.GET.get('start_date'), end_date=request.GET.get('end_date')
+    )
+
+@login_required
+@replica_reads
+@conditional_report(pertemuan_report_version)
+async def admin_pertemuan_report_view(request):
+    user = await request_user(request)
+    if user.role != 'admin':
         messages.error(request, 'Akses ditolak. Anda bukan admin.')
         return redirect('dashboard')
     
@@ -553,34 +682,33 @@ def admin_pertemuan_report_view(request):
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
     
-    # Base queryset
-    pertemuan_list = Pertemuan.objects.select_related('eskul', 'pelatih').prefetch_related('foto_list', 'absensi_list')
-    
-    # Apply filters
-    if pelatih_id:
-        pertemuan_list = pertemuan_list.filter(pelatih_id=pelatih_id)
-    
-    if eskul_id:
-        pertemuan_list = pertemuan_list.filter(eskul_id=eskul_id)
-        
-    if start_date:
-        pertemuan_list = pertemuan_list.filter(tanggal__gte=start_date)
-        
-    if end_date:
-        pertemuan_list = pertemuan_list.filter(tanggal__lte=end_date)
-    
-    pertemuan_list = pertemuan_list.order_by('-tanggal')
+    scope = eskul_scope(eskul_id)
+    versions = await sync_to_async(report_versions)(scope, LOOKUPS)
+    results = await gather_queries(
+        pertemuan_list=lambda: cached_report(
+            'admin_pertemuan_report',
+            {'pelatih': pelatih_id, 'eskul': eskul_id, 'start_date': start_date, 'end_date': end_date},
+            {scope: versions[scope]},
+            lambda: list(pertemuan_report_queryset(
+                pelatih_id=pelatih_id, eskul_id=eskul_id, start_date=start_date, end_date=end_date
+            ))
+        ),
+        pelatih_list=lambda: cached_lookup(
+            'pelatih_list', versions, lambda: list(CustomUser.objects.filter(role='pelatih'))
+        ),
+        eskul_list=lambda: cached_lookup('eskul_list', versions, lambda: list(Eskul.objects.all())),
+    )
     
     # Calculate statistics for each pertemuan
     pertemuan_data = []
-    for pertemuan in pertemuan_list:
-        absensi_stats = pertemuan.absensi_list.aggregate(
-            total=Count('id'),
-            hadir=Count('id', filter=Q(keterangan='hadir')),
-            sakit=Count('id', filter=Q(keterangan='sakit')),
-            izin=Count('id', filter=Q(keterangan='izin')),
-            alpha=Count('id', filter=Q(keterangan='alpha'))
-        )
+    for pertemuan in results['pertemuan_list']:
+        absensi_stats = {
+            'total': pertemuan.total_absensi,
+            'hadir': pertemuan.jumlah_hadir,
+            'sakit': pertemuan.jumlah_sakit,
+            'izin': pertemuan.jumlah_izin,
+            'alpha': pertemuan.jumlah_alpha,
+        }
         
         persentase_hadir = (absensi_stats['hadir'] / absensi_stats['total'] * 100) if absensi_stats['total'] > 0 else 0
         
@@ -588,7 +716,7 @@ def admin_pertemuan_report_view(request):
             'pertemuan': pertemuan,
             'stats': absensi_stats,
             'persentase_hadir': round(persentase_hadir, 2),
-            'foto_count': pertemuan.foto_list.count()
+            'foto_count': len(pertemuan.foto_list.all())
         })
     
     # Calculate aggregate statistics
@@ -599,8 +727,8 @@ def admin_pertemuan_report_view(request):
         'pertemuan_data': pertemuan_data,
         'total_foto_count': total_foto_count,
         'rata_rata_kehadiran': rata_rata_kehadiran,
-        'pelatih_list': CustomUser.objects.filter(role='pelatih'),
-        'eskul_list': Eskul.objects.all(),
+        'pelatih_list': results['pelatih_list'],
+        'eskul_list': results['eskul_list'],
         'filters': {
             'pelatih_id': pelatih_id,
             'eskul_id': eskul_id,
@@ -609,9 +737,28 @@ def admin_pertemuan_report_view(request):
         }
     }
     
-    return render(request, 'admin/pertemuan_report.html', context)
+    return await sync_to_async(render)(request, 'admin/pertemuan_report.html', context)
+
+# Rows per fetch from the server-side cursor of streamed exports
+EXPORT_CHUNK_SIZE = 2000
+
+def export_response(request, timer, basename, sheet_name, columns, queryset, make_rows):
+    """``format=csv`` and ``format=ndjson`` stream the rows from a server-side
+    cursor as they are read; Excel needs all rows before it can write."""
+    file_format = request.GET.get('format')
+    if file_format in STREAM_FORMATS:
+        # Read after the view returns: keep the database it would use now
+        queryset = queryset.using(queryset.db)
+        rows = timer.track(make_rows(queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE)))
+        return streaming_response(request, basename, columns, rows, file_format)
+
+    rows = list(make_rows(queryset))
+    response = spreadsheet_response(basename, sheet_name, columns, rows, file_format=file_format)
+    timer.finish(len(rows))
+    return response
 
 @login_required
+@replica_reads
 def export_attendance_excel(request):
     if request.user.role != 'admin':
         return HttpResponse('Akses ditolak', status=403)
@@ -622,64 +769,18 @@ def export_attendance_excel(request):
     end_date = request.GET.get('end_date')
     kelas = request.GET.get('kelas')
     
+    timer = JobTimer('export', 'absensi')
     # Apply same filters as in report view
-    siswa_list = Siswa.objects.filter(is_active=True).select_related('eskul')
-    absensi_query = Absensi.objects.select_related('siswa', 'pertemuan')
-    
-    if eskul_id:
-        siswa_list = siswa_list.filter(eskul_id=eskul_id)
-        absensi_query = absensi_query.filter(siswa__eskul_id=eskul_id)
-    
-    if kelas:
-        siswa_list = siswa_list.filter(kelas=kelas)
-        absensi_query = absensi_query.filter(siswa__kelas=kelas)
-        
-    if start_date:
-        absensi_query = absensi_query.filter(pertemuan__tanggal__gte=start_date)
-        
-    if end_date:
-        absensi_query = absensi_query.filter(pertemuan__tanggal__lte=end_date)
-    
-    # Prepare data for Excel
-    data = []
-    for siswa in siswa_list:
-        siswa_absensi = absensi_query.filter(siswa=siswa)
-        total_pertemuan = siswa_absensi.count()
-        hadir = siswa_absensi.filter(keterangan='hadir').count()
-        sakit = siswa_absensi.filter(keterangan='sakit').count()
-        izin = siswa_absensi.filter(keterangan='izin').count()
-        alpha = siswa_absensi.filter(keterangan='alpha').count()
-        
-        persentase_hadir = (hadir / total_pertemuan * 100) if total_pertemuan > 0 else 0
-        
-        data.append({
-            'Nama Siswa': siswa.nama_siswa,
-            'Kelas': siswa.kelas,
-            'Eskul': siswa.eskul.nama_eskul,
-            'Pelatih': siswa.eskul.pelatih.nama_lengkap,
-            'Total Pertemuan': total_pertemuan,
-            'Hadir': hadir,
-            'Sakit': sakit,
-            'Izin': izin,
-            'Alpha': alpha,
-            'Persentase Kehadiran (%)': round(persentase_hadir, 2)
-        })
-    
-    # Create Excel file
-    df = pd.DataFrame(data)
-    
-    # Create HTTP response
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    filename = f'laporan_kehadiran_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    # Write to Excel
-    with pd.ExcelWriter(response, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Laporan Kehadiran', index=False)
-    
-    return response
+    siswa_list = attendance_report_queryset(
+        eskul_id=eskul_id, kelas=kelas, start_date=start_date, end_date=end_date
+    )
+    return export_response(
+        request, timer, 'laporan_kehadiran', 'Laporan Kehadiran', ATTENDANCE_EXPORT_COLUMNS,
+        siswa_list, attendance_export_rows
+    )
 
 @login_required
+@replica_reads
 def export_pertemuan_excel(request):
     if request.user.role != 'admin':
         return HttpResponse('Akses ditolak', status=403)
@@ -690,58 +791,123 @@ def export_pertemuan_excel(request):
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
     
+    timer = JobTimer('export', 'pertemuan')
     # Apply filters
-    pertemuan_list = Pertemuan.objects.select_related('eskul', 'pelatih').prefetch_related('absensi_list')
-    
-    if pelatih_id:
-        pertemuan_list = pertemuan_list.filter(pelatih_id=pelatih_id)
-    
-    if eskul_id:
-        pertemuan_list = pertemuan_list.filter(eskul_id=eskul_id)
-        
-    if start_date:
-        pertemuan_list = pertemuan_list.filter(tanggal__gte=start_date)
-        
-    if end_date:
-        pertemuan_list = pertemuan_list.filter(tanggal__lte=end_date)
-    
-    # Prepare data
-    data = []
-    for pertemuan in pertemuan_list:
-        absensi_stats = pertemuan.absensi_list.aggregate(
-            total=Count('id'),
-            hadir=Count('id', filter=Q(keterangan='hadir')),
-            sakit=Count('id', filter=Q(keterangan='sakit')),
-            izin=Count('id', filter=Q(keterangan='izin')),
-            alpha=Count('id', filter=Q(keterangan='alpha'))
+    pertemuan_list = pertemuan_report_queryset(
+        pelatih_id=pelatih_id, eskul_id=eskul_id, start_date=start_date, end_date=end_date
+    )
+    return export_response(
+        request, timer, 'laporan_pertemuan', 'Laporan Pertemuan', PERTEMUAN_EXPORT_COLUMNS,
+        pertemuan_list, pertemuan_export_rows
+    )
+
+@login_required
+@replica_reads
+def export_report_pack(request):
+    if request.user.role != 'admin':
+        return HttpResponse('Akses ditolak', status=403)
+
+    try:
+        start_date, end_date = (
+            date.fromisoformat(value) if value else None
+            for value in (request.GET.get('start_date'), request.GET.get('end_date'))
         )
-        
-        persentase_hadir = (absensi_stats['hadir'] / absensi_stats['total'] * 100) if absensi_stats['total'] > 0 else 0
-        
-        data.append({
-            'Tanggal': pertemuan.tanggal.strftime('%Y-%m-%d'),
-            'Eskul': pertemuan.eskul.nama_eskul,
-            'Pelatih': pertemuan.pelatih.nama_lengkap,
-            'Materi Kegiatan': pertemuan.materi_kegiatan[:100] + '...' if len(pertemuan.materi_kegiatan) > 100 else pertemuan.materi_kegiatan,
-            'Total Siswa': absensi_stats['total'],
-            'Hadir': absensi_stats['hadir'],
-            'Sakit': absensi_stats['sakit'],
-            'Izin': absensi_stats['izin'],
-            'Alpha': absensi_stats['alpha'],
-            'Persentase Kehadiran (%)': round(persentase_hadir, 2),
-            'Jumlah Foto': pertemuan.foto_list.count()
-        })
-    
-    # Create Excel file
-    df = pd.DataFrame(data)
-    
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    filename = f'laporan_pertemuan_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    with pd.ExcelWriter(response, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Laporan Pertemuan', index=False)
+    except ValueError:
+        return HttpResponse('Format tanggal tidak valid', status=400)
 
+    timer = JobTimer('export', 'paket')
+    eskul_list = Eskul.objects.filter(is_active=True).order_by('nama_eskul')
+    return report_pack_response(request, list(eskul_list), start_date, end_date, timer, using=eskul_list.db)
+
+# ATTENDANCE MATRIX VIEWS
+def get_matrix_eskul(request):
+    """Admins pick any eskul (default: first by name), pelatih get their own."""
+    if request.user.role == 'admin':
+        eskul_list = Eskul.objects.order_by('nama_eskul')
+        eskul_id = request.GET.get('eskul')
+        if not eskul_id:
+            return eskul_list.first()
+        try:
+            return eskul_list.filter(id=int(eskul_id)).first()
+        except ValueError:
+            # Not an id, so no eskul; the callers answer as for an unknown one
+            return None
+    if request.user.role == 'pelatih':
+        return Eskul.objects.filter(pelatih=request.user).first()
+    return None
+
+def matrix_pertemuan_columns(matrix):
+    from .matrix import STATUS_LIST
+
+    return [
+        {
+            'tanggal': tanggal,
+            'totals': dict(zip((status.kode for status in STATUS_LIST), totals)),
+            'persentase': persentase,
+        }
+        for (_, tanggal), totals, persentase in zip(
+            matrix['pertemuan'], matrix['pertemuan_totals'].tolist(), matrix['pertemuan_persentase'].tolist()
+        )
+    ]
+
+@login_required
+@replica_reads
+def attendance_matrix_view(request):
+    eskul = get_matrix_eskul(request)
+    if eskul is None:
+        messages.error(request, 'Eskul tidak ditemukan atau Anda belum ditugaskan ke eskul manapun.')
+        return redirect('dashboard')
+
+    # Imported here, not at module level: NumPy is only needed by the matrix pages
+    from .matrix import build_attendance_matrix, matrix_rows
+
+    matrix = build_attendance_matrix(eskul)
+
+    context = {
+        'eskul': eskul,
+        'eskul_list': Eskul.objects.order_by('nama_eskul') if request.user.role == 'admin' else None,
+        'pertemuan_columns': matrix_pertemuan_columns(matrix),
+        'rows': matrix_rows(matrix),
+    }
+    return render(request, 'attendance_matrix.html', context)
+
+@login_required
+@replica_reads
+def export_attendance_matrix_excel(request):
+    eskul = get_matrix_eskul(request)
+    if eskul is None:
+        return HttpResponse('Eskul tidak ditemukan', status=404)
+
+    timer = JobTimer('export', 'matriks')
+    from .matrix import STATUS_LIST, build_attendance_matrix, matrix_rows
+
+    matrix = build_attendance_matrix(eskul)
+    rows = matrix_rows(matrix)
+    tanggal_labels = [tanggal.strftime('%Y-%m-%d') for _, tanggal in matrix['pertemuan']]
+
+    status_labels = [status.label for status in STATUS_LIST]
+    columns = (
+        ['Nama Siswa', 'Kelas'] + tanggal_labels + status_labels
+        + ['Persentase Kehadiran (%)', 'Alpha Beruntun Terpanjang', 'Tren Kehadiran (%/pertemuan)']
+    )
+    summaries = zip(
+        matrix['siswa_totals'].tolist(), matrix['siswa_persentase'].tolist(),
+        matrix['alpha_beruntun'].tolist(), matrix['tren'].tolist()
+    )
+    data = [
+        [row['nama_siswa'], row['kelas'], *row['cells'], *totals, persentase, alpha_beruntun, tren]
+        for row, (totals, persentase, alpha_beruntun, tren) in zip(rows, summaries)
+    ]
+    data.append(
+        ['Total Hadir', None, *matrix['pertemuan_totals'][:, 0].tolist()]
+        + [None] * (len(status_labels) + 3)
+    )
+
+    response = spreadsheet_response(
+        f'matriks_kehadiran_{eskul.nama_eskul}', 'Matriks Kehadiran', columns, data,
+        file_format=request.GET.get('format')
+    )
+    timer.finish(len(rows))
     return response
 
 @login_required
@@ -773,9 +939,9 @@ def handle_transfer_siswa(request):
                 messages.error(request, 'Pilih siswa dan eskul tujuan.')
                 return redirect('admin_transfer_siswa')
 
-            siswa = get_object_or_404(Siswa, id=siswa_id)
+            siswa = get_object_or_404(Siswa.objects.select_related('eskul__pelatih'), id=siswa_id)
             eskul_lama = siswa.eskul
-            eskul_baru = get_object_or_404(Eskul, id=eskul_tujuan_id)
+            eskul_baru = get_object_or_404(Eskul.objects.select_related('pelatih'), id=eskul_tujuan_id)
 
             if eskul_lama == eskul_baru:
                 messages.error(request, 'Siswa sudah berada di eskul tersebut.')
@@ -787,6 +953,15 @@ def handle_transfer_siswa(request):
                 pertemuan__eskul=eskul_lama
             ).select_related('pertemuan')
 
+            # Matching pertemuan in new eskul, looked up by date in one query
+            pertemuan_baru_by_tanggal = {
+                pertemuan.tanggal: pertemuan
+                for pertemuan in Pertemuan.objects.filter(
+                    eskul=eskul_baru,
+                    tanggal__in=absensi_lama.values('pertemuan__tanggal')
+                )
+            }
+
             # Prepare conversion summary
             converted_count = 0
             not_found_count = 0
@@ -795,10 +970,7 @@ def handle_transfer_siswa(request):
             conversion_preview = []
             for absen in absensi_lama:
                 # Find matching pertemuan in new eskul by date
-                pertemuan_baru = Pertemuan.objects.filter(
-                    eskul=eskul_baru,
-                    tanggal=absen.pertemuan.tanggal
-                ).first()
+                pertemuan_baru = pertemuan_baru_by_tanggal.get(absen.pertemuan.tanggal)
 
                 if pertemuan_baru:
                     conversion_preview.append({
@@ -857,7 +1029,7 @@ def handle_transfer_siswa(request):
                 'eskul_lama_nama': eskul_lama.nama_eskul,
                 'eskul_baru_nama': eskul_baru.nama_eskul,
                 'conversion_preview': serializable_preview,
-                'total_absensi': absensi_lama.count(),
+                'total_absensi': len(conversion_preview),
                 'bisa_dikonversi': converted_count,
                 'tidak_bisa_dikonversi': not_found_count
             }
@@ -867,7 +1039,7 @@ def handle_transfer_siswa(request):
                 'eskul_lama': eskul_lama,
                 'eskul_baru': eskul_baru,
                 'conversion_preview': template_preview,
-                'total_absensi': absensi_lama.count(),
+                'total_absensi': len(conversion_preview),
                 'bisa_dikonversi': converted_count,
                 'tidak_bisa_dikonversi': not_found_count
             })
@@ -899,17 +1071,18 @@ def admin_confirm_transfer_view(request):
                 siswa.save()
 
                 # Convert attendance records
-                converted_count = 0
-                for conversion in transfer_data['conversion_preview']:
-                    if conversion['bisa_dikonversi']:
-                        # Create new absensi in new eskul
-                        Absensi.objects.create(
-                            pertemuan_id=conversion['pertemuan_baru_id'],
-                            siswa=siswa,
-                            hadir=conversion['keterangan_lama'] == 'hadir',
-                            keterangan=conversion['keterangan_lama']
-                        )
-                        converted_count += 1
+                absensi_baru = Absensi.objects.bulk_create([
+                    Absensi(
+                        pertemuan_id=conversion['pertemuan_baru_id'],
+                        siswa=siswa,
+                        tanggal=conversion['tanggal'],
+                        status=Absensi.Status.from_kode(conversion['keterangan_lama'])
+                    )
+                    for conversion in transfer_data['conversion_preview']
+                    if conversion['bisa_dikonversi']
+                ])
+                converted_count = len(absensi_baru)
+                notify_absensi_created(absensi_baru)
 
                 # Clear session data
                 del request.session['transfer_data']
@@ -925,3 +1098,63 @@ def admin_confirm_transfer_view(request):
 
     # If not POST, redirect to transfer page
     return redirect('admin_transfer_siswa')
+
+# REQUEST PROFILES
+@login_required
+def admin_profiles_view(request):
+    if request.user.role != 'admin':
+        messages.error(request, 'Akses ditolak. Anda bukan admin.')
+        return redirect('dashboard')
+
+    if request.method == 'POST':
+        response = redirect('admin_profiles')
+        action = request.POST.get('action')
+        if action == 'aktifkan':
+            set_profiling_cookie(response, request.user)
+            messages.success(request, f'Profiling aktif di browser ini selama {PROFILE_COOKIE_AGE // 60} menit.')
+        elif action == 'matikan':
+            response.delete_cookie(PROFILE_COOKIE)
+            messages.success(request, 'Profiling dimatikan.')
+        elif action == 'hapus':
+            delete_profile(request.POST.get('profile_id', ''))
+            messages.success(request, 'Profil berhasil dihapus.')
+        return response
+
+    context = {
+        'profiles': list_profiles(),
+        'profiling_aktif': cookie_active(request, request.user),
+        'profile_query': f'{PROFILE_PARAM}={link_token(request.user)}',
+        'cookie_menit': PROFILE_COOKIE_AGE // 60,
+    }
+    return render(request, 'admin/profiles.html', context)
+
+@login_required
+def admin_profile_detail_view(request, profile_id):
+    if request.user.role != 'admin':
+        messages.error(request, 'Akses ditolak. Anda bukan admin.')
+        return redirect('dashboard')
+
+    profile = load_profile(profile_id)
+    if profile is None:
+        messages.error(request, 'Profil tidak ditemukan.')
+        return redirect('admin_profiles')
+
+    queries = profile.pop('queries')
+    repeated = Counter(query['sql'] for query in queries)
+    context = {
+        'profile': profile,
+        'functions': top_functions(profile_id),
+        'slowest_queries': sorted(queries, key=lambda query: query['ms'], reverse=True)[:50],
+        'repeated_queries': [(sql, count) for sql, count in repeated.most_common(20) if count > 1],
+    }
+    return render(request, 'admin/profile_detail.html', context)
+
+@login_required
+def admin_profile_file_view(request, profile_id, kind):
+    if request.user.role != 'admin':
+        return HttpResponse('Akses ditolak', status=403)
+
+    path = profile_path(profile_id, kind)
+    if path is None or kind not in ('prof', 'collapsed') or not path.is_file():
+        return HttpResponse('Profil tidak ditemukan', status=404)
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
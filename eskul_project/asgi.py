@@ -13,4 +13,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eskul_project.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up
+from eskul.live import SOCKET_PATH, dashboard_socket, reject_socket  # noqa: E402
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        handler = dashboard_socket if scope['path'] == SOCKET_PATH else reject_socket
+        return await handler(scope, receive, send)
+    return await django_application(scope, receive, send)
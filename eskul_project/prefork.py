@@ -0,0 +1,95 @@
+"""
+Loading the project in a server's master process before it forks workers
+(gunicorn.conf.py for WSGI, asgi_server.py for ASGI).
+
+Django builds the URL resolver, compiled templates, model metadata and the
+translation catalog lazily, so without this each worker pays for them on
+its first requests and keeps a private copy. Built once in the master and
+frozen out of the garbage collector, they stay on pages the workers share
+copy-on-write.
+"""
+import gc
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+from django.urls import get_resolver
+from django.utils import translation
+
+TEMPLATE_SUFFIXES = ('.html', '.txt', '.xml')
+
+def cpu_count():
+    # CPUs this process may run on, which a container can limit below os.cpu_count()
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def default_workers():
+    """Worker processes: two per CPU plus one, so a core stays busy while
+    another worker waits on the database."""
+    return int(os.environ.get('WEB_CONCURRENCY', 2 * cpu_count() + 1))
+
+def default_threads():
+    """Threads per WSGI worker. Views hold the GIL between queries, so a
+    second thread only overlaps database waits; more processes scale better."""
+    return int(os.environ.get('WEB_THREADS', 2))
+
+def prepare_metrics_dir():
+    """Empty directory for the workers' Prometheus metrics (eskul/metrics.py).
+    Must run before prometheus_client is imported, which reads the variable
+    once; emptied so counters restart with the server."""
+    directory = os.environ.setdefault(
+        'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'eskul-metrics')
+    )
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+def template_names(engine):
+    dirs = list(engine.dirs)
+    if engine.app_dirs:
+        dirs.extend(get_app_template_dirs('templates'))
+    for directory in dirs:
+        for path in Path(directory).rglob('*'):
+            if path.suffix in TEMPLATE_SUFFIXES:
+                yield path.relative_to(directory).as_posix()
+
+def warm_up():
+    """Build what Django would otherwise build on the first requests. Opens
+    no database connection, which a forked worker must not inherit."""
+    # Imports every view module and compiles every URL pattern
+    get_resolver().reverse_dict
+
+    for model in apps.get_models(include_auto_created=True):
+        opts = model._meta
+        opts.get_fields()
+        opts.fields_map
+        opts.concrete_fields
+        opts.related_objects
+
+    # Parsed into the cached template loader, which workers then keep
+    for engine in engines.all():
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError):
+                # Templates of optional contrib features that are not configured
+                pass
+
+    if settings.USE_I18N:
+        with translation.override(settings.LANGUAGE_CODE):
+            translation.gettext('')
+
+    connections.close_all()
+
+def freeze():
+    """Move everything loaded so far out of the collector's reach: a collection
+    in a worker would otherwise write to (and so copy) every shared page."""
+    gc.freeze()
+    gc.enable()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -34,6 +35,7 @@ CSRF_TRUSTED_ORIGINS = [
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -45,11 +47,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'eskul.metrics.metrics_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'eskul.db_routing.replica_pin_middleware',
+    'eskul.profiling.profiling_middleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -73,6 +78,9 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'eskul_project.wsgi.application'
+# Also serves the live dashboard WebSocket; `runserver` uses it through daphne,
+# production through asgi_server.py (WSGI only: gunicorn with gunicorn.conf.py)
+ASGI_APPLICATION = 'eskul_project.asgi.application'
 
 
 # Database
@@ -89,6 +97,24 @@ DATABASES = {
     }
 }
 
+# Read replica (eskul/db_routing.py): a streaming standby of default. Point
+# HOST/PORT at it and set READ_REPLICA = True to move the report, export and
+# history reads there. As is, it is a second connection to the same
+# database, enough to try the routing locally.
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'TEST': {'MIRROR': 'default'},
+}
+DATABASE_ROUTERS = ['eskul.db_routing.ReplicaRouter']
+READ_REPLICA = False
+# Seconds a browser reads from default after a write request, so it sees
+# its own changes before the replica has them
+REPLICA_PIN_SECONDS = 10
+
+# Report cache (eskul/report_cache.py): seconds a cached report stays
+# valid; writes invalidate it sooner through the ReportVersion counters
+REPORT_CACHE_TIMEOUT = 60 * 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -132,6 +158,11 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Request profiles of eskul/profiling.py. They hold SQL with session keys and
+# password hashes, so keep this outside MEDIA_ROOT and never serve it; admins
+# download the files through the profiles page.
+PROFILE_ROOT = BASE_DIR / 'request_profiles'
+
 # File Upload Settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 25 * 1024 * 1024  # 25MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024   # 50MB
@@ -148,3 +179,25 @@ LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = '/accounts/login/'
 
+
+# Partition the attendance table by date on PostgreSQL: None (off),
+# 'tahun_ajaran' (academic year starting 1 July) or 'semester'.
+# Applied by migration eskul 0013; run create_absensi_partitions each term.
+ABSENSI_PARTITION_INTERVAL = None
+
+# Async views (dashboard, reports) can run their independent queries in
+# parallel worker threads, each on its own connection. Off by default: without
+# CONN_MAX_AGE (and CONN_HEALTH_CHECKS) every request then opens and closes a
+# connection per query, which costs more than the queries it overlaps.
+# Enable only together with persistent connections.
+CONCURRENT_VIEW_QUERIES = False
+
+# Worker processes building the per-eskul workbooks of the report pack
+# (eskul/report_pack.py); 0 builds them one by one in the web process. Each
+# web worker process keeps one pool of this size, shared by its downloads,
+# so at most (web workers x REPORT_PACK_WORKERS) build processes run at once.
+REPORT_PACK_WORKERS = min(4, os.cpu_count() or 1)
+
+# Bearer token Prometheus sends to scrape /metrics. Without one, /metrics
+# only answers requests from this machine that did not pass a proxy.
+METRICS_TOKEN = None
@@ -0,0 +1,34 @@
+# Production WSGI server: `gunicorn` run from this directory reads this file.
+# The live dashboard WebSocket needs ASGI; `python asgi_server.py` serves both.
+import gc
+import os
+import sys
+
+# Importable from this directory, as for manage.py
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from eskul_project.prefork import (  # noqa: E402
+    default_threads, default_workers, freeze, prepare_metrics_dir, warm_up,
+)
+
+# Before the app, and with it prometheus_client, is loaded
+prepare_metrics_dir()
+
+wsgi_app = 'eskul_project.wsgi:application'
+
+# Load the project once in the master and fork the workers from it
+preload_app = True
+# No collections while the master loads: they would leave freed gaps that
+# workers fill later, copying the shared pages (see eskul_project/prefork.py)
+gc.disable()
+
+worker_class = 'gthread'
+workers = default_workers()
+threads = default_threads()
+
+
+def when_ready(server):
+    # The app is preloaded and no worker is forked yet
+    warm_up()
+    freeze()
+    server.log.info('Project warmed up and frozen before forking %s workers', server.num_workers)
@@ -0,0 +1,90 @@
+// Offline queue for new meetings (pertemuan), used by the create page and
+// by the service worker (templates/pelatih/service_worker.js).
+// Meetings wait in IndexedDB until the sync endpoint confirms them; each
+// carries a UUID so sending one twice never creates it twice.
+(function (global) {
+    const DB_NAME = 'eskul-offline';
+    const STORE = 'pertemuan';
+    const BATCH_SIZE = 10;
+
+    function openDb() {
+        return new Promise((resolve, reject) => {
+            const request = indexedDB.open(DB_NAME, 1);
+            request.onupgradeneeded = () => request.result.createObjectStore(STORE, { keyPath: 'client_id' });
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    }
+
+    async function run(mode, action) {
+        const db = await openDb();
+        return new Promise((resolve, reject) => {
+            const transaction = db.transaction(STORE, mode);
+            const request = action(transaction.objectStore(STORE));
+            transaction.oncomplete = () => { db.close(); resolve(request.result); };
+            transaction.onerror = () => { db.close(); reject(transaction.error); };
+        });
+    }
+
+    function newClientId() {
+        if (global.crypto.randomUUID) {
+            return global.crypto.randomUUID();
+        }
+        // randomUUID needs a secure context; plain http on a LAN has none
+        const bytes = global.crypto.getRandomValues(new Uint8Array(16));
+        bytes[6] = (bytes[6] & 0x0f) | 0x40;
+        bytes[8] = (bytes[8] & 0x3f) | 0x80;
+        const hex = Array.from(bytes, byte => byte.toString(16).padStart(2, '0')).join('');
+        return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`;
+    }
+
+    const PertemuanQueue = {
+        newClientId,
+        add: item => run('readwrite', store => store.put(item)),
+        all: () => run('readonly', store => store.getAll()),
+        remove: clientId => run('readwrite', store => store.delete(clientId)),
+
+        // Send the waiting meetings in batches and return the server's result
+        // for each. Confirmed meetings leave the queue; rejected ones stay,
+        // marked with the reason, until the coach discards them. Throws on
+        // network or server errors, leaving the rest queued for the next try.
+        async flush(syncUrl, csrfToken) {
+            const waiting = (await this.all()).filter(item => !item.ditolak);
+            const results = [];
+            for (let start = 0; start < waiting.length; start += BATCH_SIZE) {
+                const batch = waiting.slice(start, start + BATCH_SIZE);
+                const body = new FormData();
+                body.append('batch', JSON.stringify({
+                    pertemuan: batch.map(({ foto, foto_nama, csrf_token, ...item }) => item)
+                }));
+                batch.filter(item => item.foto).forEach(item => {
+                    body.append('foto_' + item.client_id, item.foto, item.foto_nama);
+                });
+
+                const response = await fetch(syncUrl, {
+                    method: 'POST',
+                    body,
+                    credentials: 'same-origin',
+                    headers: { 'X-CSRFToken': csrfToken || batch[0].csrf_token },
+                });
+                // A redirect to the login page is not a result either
+                if (!response.ok || !(response.headers.get('Content-Type') || '').startsWith('application/json')) {
+                    throw new Error('Sinkronisasi gagal (HTTP ' + response.status + ')');
+                }
+
+                for (const result of (await response.json()).hasil) {
+                    const item = batch.find(entry => entry.client_id === result.client_id);
+                    if (item && result.status === 'ditolak') {
+                        await this.add({ ...item, ditolak: result.pesan });
+                    } else if (item) {
+                        await this.remove(item.client_id);
+                    }
+                    results.push(result);
+                }
+            }
+            return results;
+        },
+    };
+
+    global.PertemuanQueue = PertemuanQueue;
+})(self);
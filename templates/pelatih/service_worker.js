@@ -0,0 +1,71 @@
+// Service worker for the pelatih pages: opens the create-meeting page
+// without a connection and sends the offline queue in the background.
+importScripts('/static/js/pertemuan-queue.js');
+
+const CACHE = 'eskul-pelatih-v1';
+const SYNC_TAG = 'pertemuan-sync';
+const SYNC_URL = '{% url "pelatih_sync_pertemuan" %}';
+const OFFLINE_PAGES = ['{% url "pelatih_create_pertemuan" %}'];
+const PRECACHE = [
+    '/static/css/tailwind-output.css',
+    '/static/css/fontawesome.css',
+    '/static/js/app.bundle.js',
+    '/static/js/pertemuan-queue.js',
+    '/static/images/logo_sdn_ciporeat.png',
+];
+
+self.addEventListener('install', event => {
+    event.waitUntil(caches.open(CACHE).then(cache => cache.addAll(PRECACHE)).then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(keys.filter(key => key !== CACHE).map(key => caches.delete(key))))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', event => {
+    const url = new URL(event.request.url);
+    if (event.request.method !== 'GET' || url.origin !== self.location.origin) {
+        return;
+    }
+    if (OFFLINE_PAGES.includes(url.pathname)) {
+        // Network first, so the roster is current whenever there is a connection
+        event.respondWith(
+            fetch(event.request)
+                .then(response => {
+                    if (response.ok && !response.redirected) {
+                        const copy = response.clone();
+                        caches.open(CACHE).then(cache => cache.put(url.pathname, copy));
+                    }
+                    return response;
+                })
+                .catch(() => caches.match(url.pathname).then(cached => cached || Response.error()))
+        );
+    } else if (url.pathname.startsWith('/static/')) {
+        event.respondWith(
+            caches.match(event.request).then(cached => cached || fetch(event.request).then(response => {
+                if (response.ok) {
+                    const copy = response.clone();
+                    caches.open(CACHE).then(cache => cache.put(event.request, copy));
+                }
+                return response;
+            }))
+        );
+    }
+});
+
+async function syncQueue() {
+    const results = await PertemuanQueue.flush(SYNC_URL);
+    const pages = await self.clients.matchAll({ type: 'window' });
+    pages.forEach(page => page.postMessage({ type: SYNC_TAG, results }));
+}
+
+// Background Sync: fires once the browser is back online, even with the page closed
+self.addEventListener('sync', event => {
+    if (event.tag === SYNC_TAG) {
+        event.waitUntil(syncQueue());
+    }
+});